@@ -1,48 +1,196 @@
+import hmac
 import logging
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+import threading
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pathlib import Path
+from typing import List, Optional, Tuple
 from app.models.schemas import (
     TranscriptionRequest, 
     TranscriptionResult,
     JobStatusResponse,
-    TranscriptionStatus
+    TranscriptionStatus,
+    TranscriptionMode,
+    BatchTranscriptionRequest,
+    BatchStatusResponse,
+    BulkStatusRequest,
+    JobListResponse
 )
 from app.services.job_manager import JobManager
-from app.services.worker import TranscriptionWorker
+from app.services.audio_processor import AudioProcessor
+from app.services.scheduler import FairScheduler
+from app.services.lifecycle import (
+    LifecycleManager,
+    metrics as lifecycle_metrics,
+    remove_intermediates,
+    touch_outputs
+)
+from app.services.instrumentation import QUEUE_DEPTH, RUNNING_JOBS, record_cache
+from app.services.profiler import PROFILE_FILENAME, PROFILE_STACKS_FILENAME
+from app.services.upload import AudioUpload, UploadError, UploadLimitError
+from app.services.artifacts import (
+    ARTIFACTS,
+    BUNDLE_ARTIFACTS,
+    MANIFEST_FILENAME,
+    PROVISIONAL_FILENAME,
+    get_artifact_etag,
+    is_provisional,
+    iter_bundle,
+    list_bundle_files
+)
+from app.services.storage import ArtifactCache, create_artifact_store
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Job outputs never change once written, except previews awaiting an upgrade
+ARTIFACT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PROVISIONAL_CACHE_CONTROL = "no-cache"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
 router = APIRouter()
 job_manager = JobManager(settings.REDIS_URL)
-worker = TranscriptionWorker()
+audio_processor = AudioProcessor(settings.UPLOAD_DIR)
+scheduler = FairScheduler(settings.MAX_CONCURRENT_JOBS)
+QUEUE_DEPTH.set_function(lambda: scheduler.queue_depth)
+RUNNING_JOBS.set_function(lambda: scheduler.running)
+artifact_store = create_artifact_store()
+artifact_cache = ArtifactCache(
+    artifact_store,
+    settings.ARTIFACT_CACHE_DIR,
+    max_bytes=settings.ARTIFACT_CACHE_BYTES,
+    revalidate_after=settings.ARTIFACT_CACHE_REVALIDATE
+)
+lifecycle = LifecycleManager(
+    job_manager,
+    settings.UPLOAD_DIR,
+    settings.OUTPUT_DIR,
+    quota_bytes=settings.STORAGE_QUOTA_BYTES,
+    interval=settings.LIFECYCLE_INTERVAL,
+    grace_period=settings.ORPHAN_GRACE_PERIOD,
+    artifact_store=artifact_store
+)
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_worker():
+    """
+    Get the transcription worker, creating it on first use.
+    
+    Importing the worker loads TensorFlow, Basic Pitch, librosa and
+    music21, so it happens on a scheduler thread when the first job runs
+    (or during warm-up) instead of when the API starts.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            from app.services.worker import TranscriptionWorker
+            _worker = TranscriptionWorker()
+        return _worker
+
+def _run_on_worker(method: str, job_id: str, *args):
+    """
+    Run a job on the worker, failing the job if the worker cannot be loaded.
+    
+    The scheduler only logs exceptions, so without this a job whose
+    worker fails to import or initialize would stay pending forever.
+    """
+    try:
+        worker = get_worker()
+    except Exception as e:
+        logger.error(f"Could not load the transcription worker for job {job_id}: {e}",
+                     exc_info=True)
+        job_manager.set_error(job_id, f"Transcription worker unavailable: {e}")
+        remove_intermediates(settings.UPLOAD_DIR, job_id)
+        return
+    getattr(worker, method)(job_id, *args)
+
+def _process_job(*args):
+    """Scheduler task running a YouTube job on the worker."""
+    _run_on_worker('process_job', *args)
+
+def _upgrade_job(*args):
+    """Scheduler task turning a preview into a full transcription on the worker."""
+    _run_on_worker('upgrade_job', *args)
+
+def _process_upload(*args):
+    """Scheduler task running an upload job on the worker."""
+    _run_on_worker('process_upload', *args)
+
+def _client_id(http_request: Request) -> str:
+    """
+    Identify the client of a request for fair scheduling.
+    
+    Clients are keyed by address (as resolved by the server's trusted
+    proxy settings), never by request headers, so a client cannot claim
+    extra round-robin turns by inventing tenant IDs.
+    """
+    return http_request.client.host if http_request.client else "anonymous"
+
+def _tenant_id(http_request: Request) -> str:
+    """
+    Label the tenant of a request on its jobs.
+    
+    X-Tenant-ID only names a tenant under the client address
+    (e.g. "10.0.0.5/team-a"); scheduling uses the address alone.
+    """
+    client = _client_id(http_request)
+    label = http_request.headers.get("x-tenant-id")
+    return f"{client}/{label}" if label else client
+
+def _require_admin(http_request: Request):
+    """
+    Reject requests without a valid admin token.
+    
+    Raises:
+        HTTPException: 403 if admin access is disabled or the token is wrong
+    """
+    token = http_request.headers.get("x-admin-token", "")
+    if not settings.ADMIN_TOKEN or not hmac.compare_digest(token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
 
 @router.post("/transcribe", response_model=TranscriptionResult)
 async def create_transcription(
     request: TranscriptionRequest,
-    background_tasks: BackgroundTasks
+    http_request: Request
 ):
     """
     Create a new transcription job.
     
+    With `mode` set to "preview" only the start of the video is
+    transcribed, quickly and without a PDF; upgrade the job with
+    POST /transcribe/{job_id}/upgrade to get the full transcription.
+    
     Args:
         request: Transcription request with YouTube URL
-        background_tasks: FastAPI background tasks
+        http_request: Incoming HTTP request (for the tenant ID)
         
     Returns:
         TranscriptionResult with job ID and status
     """
+    if request.profile:
+        _require_admin(http_request)
+    
     try:
+        tenant = _tenant_id(http_request)
+        
         # Create job
-        job_id = job_manager.create_job(str(request.youtube_url))
+        job_id = job_manager.create_job(str(request.youtube_url), tenant=tenant,
+                                        mode=request.mode,
+                                        isolate_piano=request.isolate_piano)
         
-        # Start processing in background
-        background_tasks.add_task(
-            worker.process_job,
+        # Queue processing behind other clients' jobs
+        scheduler.submit(
+            _client_id(http_request),
+            _process_job,
             job_id,
             str(request.youtube_url),
-            request.isolate_piano
+            request.isolate_piano,
+            request.profile,
+            request.mode == TranscriptionMode.PREVIEW
         )
         
         # Return initial result
@@ -53,6 +201,201 @@ async def create_transcription(
         logger.error(f"Error creating transcription: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/transcribe/{job_id}/upgrade", response_model=TranscriptionResult)
+async def upgrade_transcription(
+    job_id: str,
+    http_request: Request,
+    isolate_piano: Optional[bool] = Query(
+        None,
+        description="Attempt to isolate piano from mix (defaults to the preview's setting)"
+    ),
+    profile: bool = Query(False, description="Capture a CPU and allocation profile (admin only)")
+):
+    """
+    Turn a completed preview into a full transcription.
+    
+    The job keeps its ID and preview outputs until the full run replaces
+    them; the audio already downloaded for the preview is reused.
+    
+    Args:
+        job_id: Job ID of a completed preview
+        http_request: Incoming HTTP request (for the tenant ID)
+        isolate_piano: Whether to isolate piano from mix, or None to
+            keep the setting the preview was requested with
+        profile: Whether to capture a profile of the full run
+        
+    Returns:
+        TranscriptionResult with the job's new status
+    """
+    if profile:
+        _require_admin(http_request)
+    
+    job = job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if isolate_piano is None:
+        isolate_piano = job.get('isolate_piano', False)
+    
+    # Check and claim in one transaction so concurrent upgrades of the
+    # same preview schedule only one full run
+    if not job_manager.claim_upgrade(job_id):
+        raise HTTPException(status_code=409, detail="Only completed previews can be upgraded")
+    
+    scheduler.submit(
+        _client_id(http_request),
+        _upgrade_job,
+        job_id,
+        isolate_piano,
+        profile
+    )
+    
+    return job_manager.get_result(job_id)
+
+@router.post("/transcribe/upload", response_model=TranscriptionResult)
+async def create_upload_transcription(http_request: Request):
+    """
+    Create a transcription job from an uploaded audio file.
+    
+    Expects multipart/form-data with the audio in a `file` field and
+    optional `isolate_piano` and `profile` (admin only) fields. The body is streamed to disk and
+    decoded with ffmpeg while it arrives, so size and duration limits are
+    enforced without buffering the whole file.
+    
+    Args:
+        http_request: Incoming HTTP request with the multipart body
+        
+    Returns:
+        TranscriptionResult with job ID and status
+    """
+    tenant = _tenant_id(http_request)
+    job_id = job_manager.create_job(None, tenant=tenant)
+    
+    upload_dir = Path(settings.UPLOAD_DIR) / job_id
+    audio_path = upload_dir / "audio.wav"
+    upload = AudioUpload(
+        audio_path,
+        upload_dir / "upload",
+        max_bytes=settings.MAX_UPLOAD_SIZE,
+        max_seconds=settings.MAX_VIDEO_LENGTH
+    )
+    
+    try:
+        await upload.receive(http_request.headers.get("content-type", ""), http_request.stream())
+    except UploadLimitError as e:
+        job_manager.set_error(job_id, str(e))
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadError as e:
+        job_manager.set_error(job_id, str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error receiving upload for job {job_id}: {e}")
+        job_manager.set_error(job_id, str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    isolate_piano = _form_flag(upload.fields, "isolate_piano")
+    job_manager.update_job(
+        job_id,
+        video_title=upload.filename,
+        video_duration=round(upload.decoded_seconds, 2),
+        isolate_piano=isolate_piano
+    )
+    
+    profile = _form_flag(upload.fields, "profile")
+    if profile:
+        try:
+            _require_admin(http_request)
+        except HTTPException:
+            job_manager.set_error(job_id, "Admin token required")
+            remove_intermediates(settings.UPLOAD_DIR, job_id)
+            raise
+    
+    scheduler.submit(_client_id(http_request), _process_upload, job_id, str(audio_path),
+                     isolate_piano, profile)
+    
+    return job_manager.get_result(job_id)
+
+def _form_flag(fields: dict, name: str) -> bool:
+    """Read a boolean form field."""
+    return fields.get(name, "").lower() in ("1", "true", "on")
+
+@router.post("/transcribe/batch", response_model=BatchStatusResponse)
+async def create_batch_transcription(
+    request: BatchTranscriptionRequest,
+    http_request: Request
+):
+    """
+    Create a batch of transcription jobs from a list of URLs or a playlist.
+    
+    Playlists are expanded with yt-dlp flat extraction (no downloads).
+    Batches and playlists longer than MAX_BATCH_SIZE are rejected rather
+    than cut short. Child jobs are queued fairly against other tenants' jobs.
+    
+    Args:
+        request: Batch request with YouTube URLs or a playlist URL
+        http_request: Incoming HTTP request (for the tenant ID)
+        
+    Returns:
+        BatchStatusResponse with the batch ID and child jobs
+    """
+    tenant = _tenant_id(http_request)
+    
+    if request.playlist_url:
+        source_url = str(request.playlist_url)
+        try:
+            # One video over the limit tells a long playlist from a full one
+            videos = await run_in_threadpool(
+                audio_processor.expand_playlist,
+                source_url,
+                settings.MAX_BATCH_SIZE + 1
+            )
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not expand playlist: {e}")
+        urls = [video['url'] for video in videos]
+    else:
+        source_url = None
+        urls = [str(url) for url in request.youtube_urls]
+    
+    if not urls:
+        raise HTTPException(status_code=400, detail="No videos to transcribe")
+    if len(urls) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batches and playlists are limited to {settings.MAX_BATCH_SIZE} videos"
+        )
+    
+    try:
+        batch_id, job_ids = job_manager.create_batch(urls, tenant=tenant, source_url=source_url,
+                                                     isolate_piano=request.isolate_piano)
+        
+        for job_id, url in zip(job_ids, urls):
+            scheduler.submit(_client_id(http_request), _process_job, job_id, url,
+                             request.isolate_piano)
+        
+        return job_manager.get_batch_status(batch_id)
+        
+    except Exception as e:
+        logger.error(f"Error creating batch transcription: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/batch/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_status(batch_id: str):
+    """
+    Get the aggregate status of a batch and all of its jobs.
+    
+    Args:
+        batch_id: Batch ID
+        
+    Returns:
+        BatchStatusResponse with overall progress and per-job status
+    """
+    status = job_manager.get_batch_status(batch_id)
+    
+    if not status:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    return status
+
 @router.get("/status/{job_id}", response_model=JobStatusResponse)
 async def get_job_status(job_id: str):
     """
@@ -69,11 +412,70 @@ async def get_job_status(job_id: str):
     if not result:
         raise HTTPException(status_code=404, detail="Job not found")
     
+    return _job_status_response(result)
+
+@router.post("/status", response_model=List[JobStatusResponse])
+async def get_bulk_job_status(request: BulkStatusRequest):
+    """
+    Get the status of many jobs with a single Redis round trip.
+    
+    Args:
+        request: Job IDs to look up
+        
+    Returns:
+        JobStatusResponse for each job that exists, in request order
+    """
+    if len(request.job_ids) > settings.MAX_BULK_STATUS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.MAX_BULK_STATUS} jobs per request"
+        )
+    
+    results = job_manager.get_results(request.job_ids)
+    return [_job_status_response(result) for result in results if result is not None]
+
+@router.get("/jobs", response_model=JobListResponse)
+async def list_jobs(
+    status: Optional[str] = Query(
+        default=None,
+        description="A job status, 'active' for unfinished jobs, or omitted for all recent jobs"
+    ),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=200)
+):
+    """
+    List active or recent jobs, newest first.
+    
+    Args:
+        status: Status filter
+        offset: Number of jobs to skip
+        limit: Page size
+        
+    Returns:
+        JobListResponse with the total and one page of jobs
+    """
+    valid = {s.value for s in TranscriptionStatus} | {"active"}
+    if status is not None and status not in valid:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {status}")
+    
+    total, results = job_manager.list_jobs(status, offset, limit)
+    return JobListResponse(
+        total=total,
+        offset=offset,
+        limit=limit,
+        jobs=[_job_status_response(result) for result in results]
+    )
+
+def _job_status_response(result: TranscriptionResult) -> JobStatusResponse:
+    """Build a status response, including partial results once transcription has produced notes."""
+    has_result = (result.status == TranscriptionStatus.COMPLETED
+                  or result.transcribed_seconds is not None)
+    
     return JobStatusResponse(
-        job_id=job_id,
+        job_id=result.job_id,
         status=result.status,
         progress=result.progress,
-        result=result if result.status == TranscriptionStatus.COMPLETED else None
+        result=result if has_result else None
     )
 
 @router.get("/result/{job_id}", response_model=TranscriptionResult)
@@ -94,66 +496,307 @@ async def get_transcription_result(job_id: str):
     
     return result
 
-@router.get("/download/{job_id}/midi")
-async def download_midi(job_id: str):
-    """Download MIDI file for a job."""
-    output_dir = Path(settings.OUTPUT_DIR) / job_id
-    midi_path = output_dir / "transcription_processed.mid"
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range `Range: bytes=...` header.
     
-    if not midi_path.exists():
-        raise HTTPException(status_code=404, detail="MIDI file not found")
+    Args:
+        range_header: Range header value
+        size: File size in bytes
+        
+    Returns:
+        Inclusive (start, end) byte positions, or None to send the whole file
+        
+    Raises:
+        HTTPException: 416 if the range cannot be satisfied
+    """
+    unit, _, spec = range_header.partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return None  # Multiple ranges are answered with the full file
     
-    return FileResponse(
-        path=midi_path,
-        media_type="audio/midi",
-        filename=f"transcription_{job_id}.mid"
-    )
+    first, _, last = spec.strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, min(end, size - 1)
 
-@router.get("/download/{job_id}/musicxml")
-async def download_musicxml(job_id: str):
-    """Download MusicXML file for a job."""
-    output_dir = Path(settings.OUTPUT_DIR) / job_id
-    xml_path = output_dir / "transcription.musicxml"
+def _iter_file_range(path: Path, start: int, length: int):
+    """Read `length` bytes from `start` in chunks."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+async def _artifact_response(request: Request, job_id: str, name: str, detail: str) -> Response:
+    """
+    Serve a job artifact with its stored ETag, conditional GET and Range support.
     
-    if not xml_path.exists():
-        raise HTTPException(status_code=404, detail="MusicXML file not found")
+    The artifact is read from the artifact store through this node's cache.
+    
+    Args:
+        request: Incoming request
+        job_id: Job ID
+        name: Artifact name from ARTIFACTS
+        detail: Error message if the artifact does not exist
+        
+    Returns:
+        304, 206 or full file response
+    """
+    artifact = ARTIFACTS[name]
+    # Marker and manifest first: workers publish them after the files
+    output_dir = await run_in_threadpool(
+        artifact_cache.fetch,
+        job_id,
+        [PROVISIONAL_FILENAME, MANIFEST_FILENAME, artifact.filename]
+    )
+    path = output_dir / artifact.filename
+    
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=detail)
+    
+    touch_outputs(output_dir)
+    etag = get_artifact_etag(output_dir, name)
+    filename = artifact.download_name.format(job_id=job_id)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": (PROVISIONAL_CACHE_CONTROL if is_provisional(output_dir)
+                          else ARTIFACT_CACHE_CONTROL),
+        "Accept-Ranges": "bytes",
+    }
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Conditional requests measure how often clients reuse their copy
+        record_cache("http", hit=_etag_matches(if_none_match, etag))
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        size = path.stat().st_size
+        byte_range = _parse_range(range_header, size)
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            headers.update({
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(length),
+                "Content-Disposition": f'attachment; filename="{filename}"',
+            })
+            return StreamingResponse(
+                _iter_file_range(path, start, length),
+                status_code=206,
+                media_type=artifact.media_type,
+                headers=headers
+            )
     
     return FileResponse(
-        path=xml_path,
-        media_type="application/vnd.recordare.musicxml+xml",
-        filename=f"transcription_{job_id}.musicxml"
+        path=path,
+        media_type=artifact.media_type,
+        filename=filename,
+        headers=headers
     )
 
+@router.get("/download/{job_id}/midi")
+async def download_midi(job_id: str, request: Request):
+    """Download MIDI file for a job."""
+    return await _artifact_response(request, job_id, 'midi', "MIDI file not found")
+
+@router.get("/download/{job_id}/preview")
+async def download_preview(job_id: str, request: Request):
+    """Download the preview MIDI published while a job is transcribing."""
+    return await _artifact_response(request, job_id, 'preview', "Preview MIDI not available yet")
+
+@router.get("/download/{job_id}/musicxml")
+async def download_musicxml(job_id: str, request: Request):
+    """Download MusicXML file for a job."""
+    return await _artifact_response(request, job_id, 'musicxml', "MusicXML file not found")
+
+@router.get("/download/{job_id}/mxl")
+async def download_mxl(job_id: str, request: Request):
+    """Download compressed MusicXML (.mxl) file for a job."""
+    return await _artifact_response(request, job_id, 'mxl', "MXL file not found")
+
 @router.get("/download/{job_id}/pdf")
-async def download_pdf(job_id: str):
+async def download_pdf(job_id: str, request: Request):
     """Download PDF file for a job."""
-    output_dir = Path(settings.OUTPUT_DIR) / job_id
-    pdf_path = output_dir / "transcription.pdf"
+    return await _artifact_response(request, job_id, 'pdf', "PDF file not found")
+
+@router.get("/download/{job_id}/bundle")
+async def download_bundle(job_id: str):
+    """
+    Download all artifacts of a job as one streamed zip archive.
     
-    if not pdf_path.exists():
-        raise HTTPException(status_code=404, detail="PDF file not found")
+    Contains the MIDI, MusicXML and PDF files that exist for the job plus
+    the piano roll data as JSON. The archive, including the JSON, is
+    generated on the fly in chunks, without temporary files.
+    """
+    from app.services.piano_roll import PianoRoll, PIANO_ROLL_FILENAME
     
-    return FileResponse(
-        path=pdf_path,
-        media_type="application/pdf",
-        filename=f"transcription_{job_id}.pdf"
+    output_dir = await run_in_threadpool(
+        artifact_cache.fetch,
+        job_id,
+        [ARTIFACTS[name].filename for name in BUNDLE_ARTIFACTS] + [PIANO_ROLL_FILENAME]
+    )
+    files = list_bundle_files(output_dir)
+    
+    if not files:
+        raise HTTPException(status_code=404, detail="No artifacts found")
+    
+    touch_outputs(output_dir)
+    
+    extra = {}
+    piano_roll_path = output_dir / PIANO_ROLL_FILENAME
+    if piano_roll_path.exists():
+        extra["piano_roll.json"] = PianoRoll.load(piano_roll_path).iter_json()
+    
+    return StreamingResponse(
+        iter_bundle(files, extra),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="transcription_{job_id}.zip"'
+        }
     )
 
 @router.get("/piano-roll/{job_id}")
-async def get_piano_roll_data(job_id: str):
-    """Get piano roll data for visualization."""
-    from app.services.converter import MusicConverter
+async def get_piano_roll_data(
+    job_id: str,
+    start: Optional[float] = Query(default=None, ge=0, description="Window start in seconds"),
+    end: Optional[float] = Query(default=None, ge=0, description="Window end in seconds")
+):
+    """
+    Get piano roll data for visualization.
+    
+    Args:
+        job_id: Job ID
+        start: Only return notes sounding after this time
+        end: Only return notes starting before this time
+        
+    Returns:
+        Piano roll data with notes in the requested window
+    """
+    from app.services.note_store import NoteStore, NOTES_FILENAME, PARTIAL_NOTES_FILENAME
+    from app.services.piano_roll import PianoRoll, PIANO_ROLL_FILENAME
+    
+    if start is not None and end is not None and end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
     
-    output_dir = Path(settings.OUTPUT_DIR) / job_id
-    midi_path = output_dir / "transcription_processed.mid"
+    output_dir = await run_in_threadpool(artifact_cache.fetch, job_id, [PIANO_ROLL_FILENAME])
+    if not (output_dir / PIANO_ROLL_FILENAME).exists():
+        output_dir = await run_in_threadpool(
+            artifact_cache.fetch,
+            job_id,
+            [NOTES_FILENAME, ARTIFACTS['midi'].filename, PARTIAL_NOTES_FILENAME]
+        )
+    piano_roll_path = output_dir / PIANO_ROLL_FILENAME
+    notes_path = output_dir / NOTES_FILENAME
+    partial_path = output_dir / PARTIAL_NOTES_FILENAME
+    midi_path = output_dir / ARTIFACTS['midi'].filename
     
-    if not midi_path.exists():
+    # Fall back to older artifacts for jobs created before precomputation,
+    # and to the notes transcribed so far for jobs still transcribing
+    record_cache("piano_roll", hit=piano_roll_path.exists())
+    if piano_roll_path.exists():
+        piano_roll = PianoRoll.load(piano_roll_path)
+    elif notes_path.exists():
+        piano_roll = PianoRoll.from_notes(NoteStore.load(notes_path))
+    elif midi_path.exists():
+        piano_roll = PianoRoll.from_midi(str(midi_path))
+    elif partial_path.exists():
+        piano_roll = PianoRoll.from_notes(NoteStore.load(partial_path))
+    else:
         raise HTTPException(status_code=404, detail="MIDI file not found")
     
-    converter = MusicConverter()
-    piano_roll_data = converter.create_piano_roll_data(str(midi_path))
+    return piano_roll.query(start, end)
+
+@router.get("/storage")
+async def get_storage_usage(http_request: Request):
+    """
+    Get disk usage of job storage and space reclaimed by cleanup (admin only).
     
-    return piano_roll_data
+    Args:
+        http_request: Incoming HTTP request (for the admin token)
+        
+    Returns:
+        Usage per directory, the quota and reclaimed-space counters
+    """
+    _require_admin(http_request)
+    
+    usage = await run_in_threadpool(lifecycle.usage)
+    return {
+        "usage_bytes": usage,
+        "quota_bytes": settings.STORAGE_QUOTA_BYTES,
+        **lifecycle_metrics.snapshot()
+    }
+
+@router.get("/admin/profile/{job_id}")
+async def get_job_profile(job_id: str, http_request: Request):
+    """
+    Get the profile summary of a profiled job.
+    
+    Per stage: sample counts, hottest functions and top allocation sites.
+    
+    Args:
+        job_id: Job ID
+        http_request: Incoming HTTP request (for the admin token)
+        
+    Returns:
+        Profile summary
+    """
+    _require_admin(http_request)
+    
+    output_dir = await run_in_threadpool(artifact_cache.fetch, job_id, [PROFILE_FILENAME])
+    path = output_dir / PROFILE_FILENAME
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return FileResponse(path=path, media_type="application/json")
+
+@router.get("/admin/profile/{job_id}/stacks")
+async def download_job_profile_stacks(job_id: str, http_request: Request):
+    """Download a profiled job's sampled stacks in collapsed format for flame graphs."""
+    _require_admin(http_request)
+    
+    output_dir = await run_in_threadpool(artifact_cache.fetch, job_id, [PROFILE_STACKS_FILENAME])
+    path = output_dir / PROFILE_STACKS_FILENAME
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return FileResponse(
+        path=path,
+        media_type="text/plain",
+        filename=f"profile_{job_id}.folded"
+    )
+
+@router.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: stage timings, throughput, queue depth and cache hit rates."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 @router.get("/health")
 async def health_check():
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 
 class Settings(BaseSettings):
@@ -19,8 +19,46 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "./uploads"
     OUTPUT_DIR: str = "./outputs"
     
+    # Artifact Store
+    ARTIFACT_STORE: str = "local"  # "local" serves OUTPUT_DIR; "s3" shares outputs between nodes
+    S3_BUCKET: Optional[str] = None
+    S3_PREFIX: str = "outputs"  # key prefix for job outputs
+    S3_ENDPOINT_URL: Optional[str] = None  # S3-compatible server (MinIO, local stand-in); None for AWS
+    ARTIFACT_CACHE_DIR: str = "./artifact_cache"  # read-through cache of a remote store on API nodes
+    ARTIFACT_CACHE_BYTES: int = 2 * 1024 ** 3
+    ARTIFACT_CACHE_REVALIDATE: float = 5.0  # seconds a cached file is served without checking the store
+    
+    # Storage Lifecycle
+    STORAGE_QUOTA_BYTES: int = 10 * 1024 ** 3  # uploads + outputs; 0 disables eviction
+    LIFECYCLE_INTERVAL: float = 600.0  # seconds between cleanup sweeps; 0 disables
+    ORPHAN_GRACE_PERIOD: float = 3600.0  # min age before a directory without a job is removed
+    
     # Processing Limits
     MAX_VIDEO_LENGTH: int = 600  # seconds
+    MAX_BATCH_SIZE: int = 50  # videos per batch or playlist
+    MAX_BULK_STATUS: int = 500  # job IDs per bulk status request
+    MAX_UPLOAD_SIZE: int = 200 * 1024 * 1024  # bytes per direct audio upload
+    
+    # Admin
+    ADMIN_TOKEN: Optional[str] = None  # X-Admin-Token for admin endpoints; None disables them
+    
+    # Job Scheduling
+    MAX_CONCURRENT_JOBS: int = 2  # jobs processed at the same time
+    PRELOAD_WORKER: bool = False  # load the ML stack at startup instead of on the first job
+    
+    # Progressive Results
+    PREVIEW_SECONDS: float = 20.0  # length of the preview MIDI and first chunk
+    TRANSCRIBE_CHUNK_SECONDS: float = 30.0  # chunk length after the first one
+    PARTIAL_PUBLISH_INTERVAL: float = 15.0  # min seconds between partial publishes
+    PREVIEW_MODE_SECONDS: float = 20.0  # audio downloaded and transcribed in preview mode
+    
+    # Notation
+    DETECT_KEY_CHANGES: bool = False  # write key changes found over sliding windows
+    DETECT_METER: bool = False  # estimate 3/4 vs 4/4 (assumes 120 BPM) instead of always 4/4
+    
+    # PDF Rendering
+    MUSESCORE_BATCH_WINDOW: float = 0.0  # seconds to collect PDF jobs; 0 disables batching
+    MUSESCORE_BATCH_SIZE: int = 8  # max scores per MuseScore batch run
     
     class Config:
         env_file = ".env"
@@ -1,8 +1,9 @@
 import logging
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.routes import router
+from app.api.routes import router, lifecycle, get_worker
 
 # Configure logging
 logging.basicConfig(
@@ -39,6 +40,11 @@ async def startup_event():
     logger.info(f"Starting {settings.PROJECT_NAME}")
     logger.info(f"Upload directory: {settings.UPLOAD_DIR}")
     logger.info(f"Output directory: {settings.OUTPUT_DIR}")
+    lifecycle.start()
+    
+    # Load the ML stack off the event loop so /health is served immediately
+    if settings.PRELOAD_WORKER:
+        threading.Thread(target=get_worker, name='worker-preload', daemon=True).start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
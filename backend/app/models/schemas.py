@@ -1,5 +1,5 @@
-from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional, List
+from pydantic import BaseModel, HttpUrl, Field, model_validator
+from typing import Optional, List, Dict
 from enum import Enum
 
 class TranscriptionStatus(str, Enum):
@@ -12,10 +12,17 @@ class TranscriptionStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class TranscriptionMode(str, Enum):
+    """How much of a video to transcribe."""
+    FULL = "full"
+    PREVIEW = "preview"  # leading segment only, cheaper model settings, no PDF
+
 class TranscriptionRequest(BaseModel):
     """Request to transcribe a YouTube video."""
     youtube_url: HttpUrl
     isolate_piano: bool = Field(default=False, description="Attempt to isolate piano from mix")
+    mode: TranscriptionMode = Field(default=TranscriptionMode.FULL, description="'preview' quickly transcribes only the start of the video")
+    profile: bool = Field(default=False, description="Capture a CPU and allocation profile (admin only)")
 
 class NoteEvent(BaseModel):
     """A single note event."""
@@ -31,17 +38,28 @@ class TranscriptionQuality(BaseModel):
     duration: float
     polyphony_avg: float
     
+class StageMetrics(BaseModel):
+    """Resource usage of one pipeline stage."""
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_bytes: Optional[int] = None
+
 class TranscriptionResult(BaseModel):
     """Result of a transcription job."""
     job_id: str
     status: TranscriptionStatus
+    mode: TranscriptionMode = TranscriptionMode.FULL
     progress: int = Field(default=0, ge=0, le=100)
     video_title: Optional[str] = None
     video_duration: Optional[float] = None
     quality: Optional[TranscriptionQuality] = None
     midi_url: Optional[str] = None
     musicxml_url: Optional[str] = None
+    mxl_url: Optional[str] = None
     pdf_url: Optional[str] = None
+    preview_midi_url: Optional[str] = None
+    transcribed_seconds: Optional[float] = Field(default=None, description="Audio transcribed so far")
+    stage_metrics: Optional[Dict[str, StageMetrics]] = Field(default=None, description="Timing and resource usage per stage")
     error: Optional[str] = None
     created_at: str
     completed_at: Optional[str] = None
@@ -52,3 +70,38 @@ class JobStatusResponse(BaseModel):
     status: TranscriptionStatus
     progress: int
     result: Optional[TranscriptionResult] = None
+
+class BulkStatusRequest(BaseModel):
+    """Request for the status of many jobs at once."""
+    job_ids: List[str] = Field(..., min_length=1, description="Jobs to look up")
+
+class JobListResponse(BaseModel):
+    """A page of jobs, newest first."""
+    total: int = Field(..., description="Number of jobs matching the filter")
+    offset: int
+    limit: int
+    jobs: List[JobStatusResponse] = Field(default_factory=list)
+
+class BatchTranscriptionRequest(BaseModel):
+    """Request to transcribe several YouTube videos or a playlist."""
+    youtube_urls: List[HttpUrl] = Field(default_factory=list, description="Videos to transcribe")
+    playlist_url: Optional[HttpUrl] = Field(default=None, description="Playlist to expand into videos")
+    isolate_piano: bool = Field(default=False, description="Attempt to isolate piano from mix")
+
+    @model_validator(mode='after')
+    def check_source(self):
+        """Require exactly one of youtube_urls or playlist_url."""
+        if bool(self.youtube_urls) == bool(self.playlist_url):
+            raise ValueError("Provide either youtube_urls or playlist_url")
+        return self
+
+class BatchStatusResponse(BaseModel):
+    """Aggregate status of a batch of transcription jobs."""
+    batch_id: str
+    status: TranscriptionStatus
+    progress: int = Field(default=0, ge=0, le=100)
+    total: int
+    counts: Dict[str, int] = Field(default_factory=dict, description="Number of jobs per status")
+    source_url: Optional[str] = None
+    jobs: List[JobStatusResponse] = Field(default_factory=list)
+    created_at: str
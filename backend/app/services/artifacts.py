@@ -0,0 +1,232 @@
+import hashlib
+import json
+import logging
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from app.services.files import atomic_write
+from app.services.note_store import PREVIEW_MIDI_FILENAME
+from app.services.instrumentation import record_cache
+
+logger = logging.getLogger(__name__)
+
+# Per-job manifest with the ETag and size of every downloadable artifact
+MANIFEST_FILENAME = "manifest.json"
+
+# Present while a job's outputs are a preview that a full run will replace
+PROVISIONAL_FILENAME = "provisional"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+BUNDLE_CHUNK_SIZE = 64 * 1024
+
+# Artifacts included in the download bundle, in archive order
+BUNDLE_ARTIFACTS = ['midi', 'musicxml', 'pdf']
+
+# Already-compressed formats are stored in the bundle without deflating
+STORED_MEDIA_TYPES = {'application/pdf', 'application/vnd.recordare.musicxml'}
+
+
+class Artifact(NamedTuple):
+    """A downloadable job output."""
+    filename: str
+    media_type: str
+    download_name: str  # formatted with the job ID
+
+
+ARTIFACTS: Dict[str, Artifact] = {
+    'midi': Artifact('transcription_processed.mid', 'audio/midi',
+                     'transcription_{job_id}.mid'),
+    'musicxml': Artifact('transcription.musicxml', 'application/vnd.recordare.musicxml+xml',
+                         'transcription_{job_id}.musicxml'),
+    'mxl': Artifact('transcription.mxl', 'application/vnd.recordare.musicxml',
+                    'transcription_{job_id}.mxl'),
+    'pdf': Artifact('transcription.pdf', 'application/pdf',
+                    'transcription_{job_id}.pdf'),
+    'preview': Artifact(PREVIEW_MIDI_FILENAME, 'audio/midi', 'preview_{job_id}.mid'),
+}
+
+
+def compute_etag(path: Path) -> str:
+    """
+    Compute a strong ETag from the SHA-256 of a file's content.
+
+    Args:
+        path: File to hash
+
+    Returns:
+        Quoted ETag value
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _read_manifest(output_dir: Path) -> Dict[str, dict]:
+    """Read a job's manifest, or an empty one if it does not exist."""
+    try:
+        with open(output_dir / MANIFEST_FILENAME) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_manifest(output_dir: Path, manifest: Dict[str, dict]):
+    """Atomically replace a job's manifest."""
+    with atomic_write(output_dir / MANIFEST_FILENAME) as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+
+
+def register_artifacts(output_dir: Path, names: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+    """
+    Hash freshly written artifacts and record them in the job manifest.
+
+    Job outputs never change once written, so this runs once per artifact
+    and downloads reuse the stored ETag. Provisional (preview) outputs are
+    the exception: the full run rewrites them and registers them again.
+
+    Args:
+        output_dir: Job output directory
+        names: Artifact names to register (defaults to every existing artifact)
+
+    Returns:
+        Updated manifest
+    """
+    output_dir = Path(output_dir)
+    manifest = _read_manifest(output_dir)
+
+    for name in names if names is not None else ARTIFACTS:
+        path = output_dir / ARTIFACTS[name].filename
+        if path.exists():
+            manifest[name] = {'etag': compute_etag(path), 'size': path.stat().st_size}
+
+    _write_manifest(output_dir, manifest)
+    return manifest
+
+
+def set_provisional(output_dir: Path, provisional: bool):
+    """
+    Mark or unmark a job's outputs as a preview that may still be replaced.
+
+    Args:
+        output_dir: Job output directory
+        provisional: Whether the outputs are provisional
+    """
+    marker = Path(output_dir) / PROVISIONAL_FILENAME
+    if provisional:
+        marker.touch()
+    else:
+        marker.unlink(missing_ok=True)
+
+
+def is_provisional(output_dir: Path) -> bool:
+    """Whether a job's outputs are a preview that may still be replaced."""
+    return (Path(output_dir) / PROVISIONAL_FILENAME).exists()
+
+
+def get_artifact_etag(output_dir: Path, name: str) -> str:
+    """
+    Get the ETag of an artifact, registering it first if needed.
+
+    Artifacts written before manifests existed are hashed on first access.
+
+    Args:
+        output_dir: Job output directory
+        name: Artifact name
+
+    Returns:
+        Quoted ETag value
+    """
+    output_dir = Path(output_dir)
+    entry = _read_manifest(output_dir).get(name)
+    record_cache('etag', hit=entry is not None)
+    if entry is None:
+        entry = register_artifacts(output_dir, [name])[name]
+    return entry['etag']
+
+
+class _ZipStream:
+    """Write-only sink that lets a ZipFile stream into a response.
+
+    ZipFile writes local headers and data descriptors sequentially when
+    the target cannot seek, so the archive can be drained piece by piece.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        """Return and forget everything written since the last drain."""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def list_bundle_files(output_dir: Path) -> List[Tuple[str, Path, int]]:
+    """
+    List the artifacts of a job that go into its download bundle.
+
+    Args:
+        output_dir: Job output directory
+
+    Returns:
+        List of (archive_name, path, compress_type) for existing artifacts
+    """
+    files = []
+    for name in BUNDLE_ARTIFACTS:
+        artifact = ARTIFACTS[name]
+        path = Path(output_dir) / artifact.filename
+        if path.exists():
+            compress_type = (zipfile.ZIP_STORED if artifact.media_type in STORED_MEDIA_TYPES
+                             else zipfile.ZIP_DEFLATED)
+            files.append((artifact.filename, path, compress_type))
+    return files
+
+
+def iter_bundle(files: List[Tuple[str, Path, int]],
+                extra: Optional[Dict[str, Iterable[bytes]]] = None) -> Iterator[bytes]:
+    """
+    Stream a zip archive of job files without temporary files.
+
+    Files are read and compressed in BUNDLE_CHUNK_SIZE pieces, so memory
+    use does not grow with the size of the archive.
+
+    Args:
+        files: (archive_name, path, compress_type) entries from list_bundle_files
+        extra: Optional {archive_name: chunks} entries generated on the fly
+
+    Yields:
+        Chunks of the zip archive
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w') as bundle:
+        for archive_name, path, compress_type in files:
+            info = zipfile.ZipInfo.from_file(path, archive_name)
+            info.compress_type = compress_type
+            with open(path, 'rb') as src, bundle.open(info, 'w') as dst:
+                for chunk in iter(lambda: src.read(BUNDLE_CHUNK_SIZE), b''):
+                    dst.write(chunk)
+                    data = stream.drain()
+                    if data:
+                        yield data
+
+        for archive_name, chunks in (extra or {}).items():
+            info = zipfile.ZipInfo(archive_name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with bundle.open(info, 'w') as dst:
+                for chunk in chunks:
+                    dst.write(chunk)
+                    data = stream.drain()
+                    if data:
+                        yield data
+
+    yield stream.drain()
@@ -1,51 +1,71 @@
+import json
 import os
 import subprocess
 import logging
 from pathlib import Path
-from typing import Tuple, Optional
-import yt_dlp
-from pydub import AudioSegment
-import librosa
-import soundfile as sf
+from typing import List, Tuple, Optional
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Files of a partial (segment) download inside uploads/<job_id>/
+SEGMENT_NAME = 'segment'
+REMAINDER_NAME = 'remainder'
+INFO_FILENAME = 'info.json'  # cached yt-dlp video info
+
+# Upper bound for the remainder when the video duration is unknown
+MAX_REMAINDER_SECONDS = 24 * 3600
+
+
 class AudioProcessor:
-    """Handle audio download and processing."""
+    """Handle audio download and processing.
+    
+    yt-dlp, librosa and pydub are imported by the methods that use them,
+    so the API process can create an AudioProcessor (e.g. to expand
+    playlists) without loading the audio stack.
+    """
     
     def __init__(self, output_dir: str):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
-    def download_youtube_audio(self, url: str, job_id: str) -> Tuple[str, dict]:
+    def download_youtube_audio(self, url: str, job_id: str,
+                               max_seconds: Optional[float] = None) -> Tuple[str, dict]:
         """
         Download audio from YouTube video.
         
+        With `max_seconds` only the leading segment is downloaded, to
+        `segment.wav`, and the extracted video info is cached in the job
+        directory so download_remainder can finish the download later
+        without probing the video again.
+        
         Args:
             url: YouTube video URL
             job_id: Unique job identifier
+            max_seconds: Only download this many seconds from the start
             
         Returns:
             Tuple of (audio_path, video_info)
         """
+        import yt_dlp
+        
         output_path = self.output_dir / job_id
         output_path.mkdir(exist_ok=True)
         
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': str(output_path / 'audio.%(ext)s'),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'wav',
-            }],
-            'quiet': True,
-            'no_warnings': True,
-        }
+        if max_seconds is None:
+            name, section = 'audio', None
+        else:
+            name, section = SEGMENT_NAME, (0, max_seconds)
+        ydl_opts = self._ydl_options(output_path, name, section)
         
         try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=True)
-                audio_file = output_path / 'audio.wav'
+                audio_file = output_path / f'{name}.wav'
+                
+                if max_seconds is not None:
+                    with open(output_path / INFO_FILENAME, 'w') as f:
+                        json.dump(ydl.sanitize_info(info), f)
                 
                 video_info = {
                     'title': info.get('title', 'Unknown'),
@@ -60,6 +80,141 @@ class AudioProcessor:
             logger.error(f"Error downloading audio: {e}")
             raise
     
+    def download_remainder(self, job_id: str) -> Optional[str]:
+        """
+        Complete a segment download into the full audio file.
+        
+        Reuses the video info cached by a segment download, so only the
+        audio after the segment is fetched and the video is not probed
+        again, then joins it to the segment.
+        
+        Args:
+            job_id: Job whose segment was downloaded
+            
+        Returns:
+            Path to the full audio file, or None if there is no cached
+            segment to complete
+        """
+        import soundfile as sf
+        import yt_dlp
+        
+        output_path = self.output_dir / job_id
+        segment_file = output_path / f"{SEGMENT_NAME}.wav"
+        info_file = output_path / INFO_FILENAME
+        if not segment_file.exists() or not info_file.exists():
+            return None
+        
+        with open(info_file) as f:
+            duration = json.load(f).get('duration')
+        start = sf.info(str(segment_file)).duration
+        
+        audio_file = output_path / 'audio.wav'
+        if duration and duration <= start + 1:
+            # The segment already holds the whole video
+            os.replace(segment_file, audio_file)
+            return str(audio_file)
+        
+        end = duration or start + MAX_REMAINDER_SECONDS
+        ydl_opts = self._ydl_options(output_path, REMAINDER_NAME, (start, end))
+        
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                ydl.download_with_info_file(str(info_file))
+            
+            self.concatenate_audio(
+                [str(segment_file), str(output_path / f"{REMAINDER_NAME}.wav")],
+                str(audio_file)
+            )
+            logger.info(f"Completed audio download for job {job_id} from {start:.0f}s")
+            return str(audio_file)
+            
+        except Exception as e:
+            logger.error(f"Error downloading remaining audio: {e}")
+            raise
+    
+    def _ydl_options(self, output_path: Path, name: str,
+                     section: Optional[Tuple[float, float]] = None) -> dict:
+        """Build yt-dlp options extracting WAV audio to `name`.wav, optionally for a time section."""
+        ydl_opts = {
+            'format': 'bestaudio/best',
+            'outtmpl': str(output_path / f'{name}.%(ext)s'),
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'wav',
+            }],
+            'quiet': True,
+            'no_warnings': True,
+        }
+        if section is not None:
+            from yt_dlp.utils import download_range_func
+            
+            ydl_opts['download_ranges'] = download_range_func(None, [section])
+            ydl_opts['force_keyframes_at_cuts'] = True
+        return ydl_opts
+    
+    def concatenate_audio(self, input_paths: List[str], output_path: str) -> str:
+        """
+        Join audio files end to end into a mono WAV file.
+        
+        Args:
+            input_paths: Audio files in playback order
+            output_path: Output WAV file path
+            
+        Returns:
+            Path to joined audio file
+        """
+        import librosa
+        import numpy as np
+        import soundfile as sf
+        
+        sample_rate = librosa.get_samplerate(input_paths[0])
+        parts = [librosa.load(path, sr=sample_rate, mono=True)[0] for path in input_paths]
+        sf.write(output_path, np.concatenate(parts), sample_rate)
+        return output_path
+    
+    def expand_playlist(self, url: str, limit: int) -> List[dict]:
+        """
+        List the videos of a playlist without downloading anything.
+        
+        Args:
+            url: YouTube playlist URL
+            limit: Maximum number of videos to return
+            
+        Returns:
+            List of {'url', 'title'} dictionaries in playlist order
+        """
+        import yt_dlp
+        
+        ydl_opts = {
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+            'playlistend': limit,
+            'quiet': True,
+            'no_warnings': True,
+        }
+        
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+            
+            entries = info.get('entries') or [info]
+            videos = []
+            for entry in entries:
+                if not entry:
+                    continue
+                video_url = entry.get('webpage_url') or entry.get('url')
+                if entry.get('ie_key') == 'Youtube' and entry.get('id'):
+                    video_url = f"https://www.youtube.com/watch?v={entry['id']}"
+                if video_url:
+                    videos.append({'url': video_url, 'title': entry.get('title', 'Unknown')})
+            
+            logger.info(f"Expanded playlist {url} into {len(videos)} videos")
+            return videos[:limit]
+            
+        except Exception as e:
+            logger.error(f"Error expanding playlist: {e}")
+            raise
+    
     def convert_to_mono_wav(self, input_path: str, output_path: str, 
                            sample_rate: int = 16000) -> str:
         """
@@ -73,12 +228,48 @@ class AudioProcessor:
         Returns:
             Path to converted audio file
         """
+        y, sr = self.decode_audio(input_path)
+        return self.resample_to_wav(y, sr, output_path, sample_rate)
+    
+    def decode_audio(self, input_path: str) -> Tuple[np.ndarray, int]:
+        """
+        Decode audio to mono samples at the file's own sample rate.
+        
+        Args:
+            input_path: Input audio file path
+            
+        Returns:
+            Tuple of (samples, sample_rate)
+        """
+        import librosa
+        
         try:
-            # Load audio with librosa
-            y, sr = librosa.load(input_path, sr=sample_rate, mono=True)
+            return librosa.load(input_path, sr=None, mono=True)
+        except Exception as e:
+            logger.error(f"Error decoding audio: {e}")
+            raise
+    
+    def resample_to_wav(self, y: np.ndarray, sr: int, output_path: str,
+                        sample_rate: int = 16000) -> str:
+        """
+        Resample decoded audio and save it as WAV.
+        
+        Args:
+            y: Mono samples
+            sr: Sample rate of `y` (Hz)
+            output_path: Output WAV file path
+            sample_rate: Target sample rate (Hz)
             
-            # Save as WAV
-            sf.write(output_path, y, sr)
+        Returns:
+            Path to converted audio file
+        """
+        import librosa
+        import soundfile as sf
+        
+        try:
+            if sr != sample_rate:
+                y = librosa.resample(y, orig_sr=sr, target_sr=sample_rate)
+            sf.write(output_path, y, sample_rate)
             
             logger.info(f"Converted audio to mono WAV: {output_path}")
             return output_path
@@ -97,6 +288,8 @@ class AudioProcessor:
         Returns:
             Path to normalized audio file
         """
+        from pydub import AudioSegment
+        
         try:
             audio = AudioSegment.from_wav(audio_path)
             
@@ -136,6 +329,8 @@ class AudioProcessor:
     
     def get_audio_duration(self, audio_path: str) -> float:
         """Get duration of audio file in seconds."""
+        import librosa
+        
         try:
             y, sr = librosa.load(audio_path, sr=None, duration=1)
             duration = librosa.get_duration(path=audio_path)
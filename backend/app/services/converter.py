@@ -1,9 +1,22 @@
-import os
 import logging
 from pathlib import Path
 from typing import Optional
 import subprocess
+import zipfile
+import numpy as np
 import music21
+from app.core.config import settings
+from app.services.files import atomic_write
+from app.services.musescore import find_musescore, get_batch_renderer, RENDER_TIMEOUT
+from app.services.note_store import NoteStore, RIGHT_HAND, LEFT_HAND, MIDI_TEMPO
+from app.services.piano_roll import PianoRoll
+from app.services.musicxml_writer import MusicXMLWriter, UnsupportedNotesError
+from app.services.key_detection import (
+    KeyEstimate,
+    estimate_key,
+    estimate_keys,
+    estimate_time_signature
+)
 
 logger = logging.getLogger(__name__)
 
@@ -29,26 +42,200 @@ class MusicConverter:
             # Parse MIDI with music21
             score = music21.converter.parse(midi_path)
             
-            # Add metadata
-            score.metadata = music21.metadata.Metadata()
-            score.metadata.title = "Piano Transcription"
-            score.metadata.composer = "Transcribed by YouTube2Sheets"
+            # Estimate the key from note arrays rather than the score graph
+            piano_roll = PianoRoll.from_midi(midi_path)
+            key = estimate_key(piano_roll.pitch, piano_roll.start, piano_roll.end)
             
-            # Analyze and add key signature
-            try:
-                key = score.analyze('key')
-                score.insert(0, key)
-            except:
-                pass  # Skip if key analysis fails
+            return self._write_musicxml(score, output_path, key)
             
-            # Write MusicXML
-            score.write('musicxml', fp=output_path)
+        except Exception as e:
+            logger.error(f"Error converting MIDI to MusicXML: {e}")
+            raise
+    
+    def notes_to_musicxml(self, notes: NoteStore, output_path: str,
+                          detect_modulations: bool = False,
+                          detect_meter: bool = False) -> str:
+        """
+        Convert a note store to MusicXML format without a MIDI round trip.
+        
+        Uses the direct MusicXML writer and falls back to music21 for
+        input the writer cannot represent.
+        
+        Args:
+            notes: Note store for the job
+            output_path: Path for output MusicXML file
+            detect_modulations: Add key changes found over sliding windows
+            detect_meter: Estimate 3/4 vs 4/4 instead of always using 4/4
+            
+        Returns:
+            Path to MusicXML file
+        """
+        key = estimate_key(notes.pitch, notes.onset, notes.offset)
+        beats, beat_type = (estimate_time_signature(notes.onset, notes.velocity)
+                            if detect_meter else (4, 4))
+        
+        key_changes = None
+        if detect_modulations:
+            measure_seconds = beats * 4 / beat_type * MIDI_TEMPO / 1_000_000
+            key_changes = {}
+            for start, region_key in estimate_keys(notes.pitch, notes.onset, notes.offset):
+                measure = int(round(start / measure_seconds))
+                if measure == 0:
+                    key = region_key  # The opening region sets the key signature
+                else:
+                    key_changes[measure] = (region_key.fifths, region_key.mode)
+        
+        try:
+            writer = MusicXMLWriter(
+                fifths=key.fifths if key else 0,
+                mode=key.mode if key else 'major',
+                beats=beats,
+                beat_type=beat_type,
+                key_changes=key_changes,
+            )
+            return writer.write(notes, output_path)
+        except UnsupportedNotesError as e:
+            logger.warning(f"Falling back to music21 for MusicXML: {e}")
+        
+        return self.notes_to_musicxml_music21(notes, output_path, key)
+    
+    def notes_to_musicxml_music21(self, notes: NoteStore, output_path: str,
+                                  key: Optional[KeyEstimate] = None) -> str:
+        """
+        Convert a note store to MusicXML format using music21.
+        
+        Args:
+            notes: Note store for the job
+            output_path: Path for output MusicXML file
+            key: Key to write (estimated from the notes if not given)
+            
+        Returns:
+            Path to MusicXML file
+        """
+        try:
+            if key is None:
+                key = estimate_key(notes.pitch, notes.onset, notes.offset)
+            score = self._notes_to_score(notes)
+            return self._write_musicxml(score, output_path, key)
+            
+        except Exception as e:
+            logger.error(f"Error converting notes to MusicXML: {e}")
+            raise
+    
+    def _write_musicxml(self, score, output_path: str,
+                        key: Optional[KeyEstimate]) -> str:
+        """Add metadata and key signature to a score and write MusicXML."""
+        # Add metadata
+        score.metadata = music21.metadata.Metadata()
+        score.metadata.title = "Piano Transcription"
+        score.metadata.composer = "Transcribed by YouTube2Sheets"
+        
+        # Add key signature
+        if key is not None:
+            score.insert(0, music21.key.Key(key.tonic_name, key.mode))
+        else:
+            logger.warning("No notes to estimate key from, skipping key signature")
+        
+        # Write MusicXML
+        score.write('musicxml', fp=output_path)
+        
+        logger.info(f"Converted to MusicXML: {output_path}")
+        return output_path
+    
+    def _notes_to_score(self, notes: NoteStore):
+        """
+        Build a two-staff piano score from a note store.
+        
+        Mirrors what music21 does when importing a MIDI track: notes sharing
+        an onset and offset become chords, the part is quantized, then
+        measures, voices, ties and rests are added.
+        """
+        quarters_per_second = 1_000_000 / MIDI_TEMPO
+        onsets = np.round(notes.onset * quarters_per_second * 48) / 48
+        offsets = np.round(notes.offset * quarters_per_second * 48) / 48
+        offsets = np.maximum(offsets, onsets + 1 / 48)
+        
+        score = music21.stream.Score()
+        for hand, clef in ((RIGHT_HAND, music21.clef.TrebleClef()),
+                           (LEFT_HAND, music21.clef.BassClef())):
+            part = music21.stream.Part()
+            part.insert(0, music21.instrument.Piano())
+            part.insert(0, clef)
+            
+            idx = np.flatnonzero(notes.hand == hand)
+            if len(idx):
+                # Group notes with identical onset and offset into chords
+                keys = np.stack([onsets[idx], offsets[idx]], axis=1)
+                _, group_ids = np.unique(keys, axis=0, return_inverse=True)
+                group_ids = group_ids.reshape(-1)
+                order = np.argsort(group_ids, kind='stable')
+                boundaries = np.flatnonzero(np.diff(group_ids[order])) + 1
+                
+                for members in np.split(idx[order], boundaries):
+                    start = float(onsets[members[0]])
+                    length = float(offsets[members[0]]) - start
+                    pitches = notes.pitch[members].tolist()
+                    velocity = int(notes.velocity[members].max())
+                    if len(pitches) == 1:
+                        element = music21.note.Note(pitches[0])
+                    else:
+                        element = music21.chord.Chord(pitches)
+                    element.quarterLength = length
+                    element.volume.velocity = velocity
+                    part.coreInsert(start, element)
+                
+                part.sort(force=True)
+                part.quantize(quarterLengthDivisors=(4, 3),
+                              processOffsets=True,
+                              processDurations=True,
+                              inPlace=True,
+                              recurse=False)
+            
+            part.makeMeasures(inPlace=True)
+            for measure in part.getElementsByClass(music21.stream.Measure):
+                if measure.getOverlaps():
+                    measure.makeVoices(inPlace=True, fillGaps=False)
+            part.makeTies(inPlace=True)
+            part.makeRests(inPlace=True, fillGaps=True,
+                           timeRangeFromBarDuration=True)
+            score.insert(0, part)
+        
+        return score
+    
+    def musicxml_to_mxl(self, musicxml_path: str, output_path: str) -> str:
+        """
+        Package MusicXML as compressed MusicXML (.mxl).
+        
+        Args:
+            musicxml_path: Path to input MusicXML file
+            output_path: Path for output .mxl file
             
-            logger.info(f"Converted MIDI to MusicXML: {output_path}")
+        Returns:
+            Path to .mxl file
+        """
+        try:
+            score_name = Path(musicxml_path).name
+            container = (
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<container><rootfiles>'
+                f'<rootfile full-path="{score_name}" '
+                'media-type="application/vnd.recordare.musicxml+xml"/>'
+                '</rootfiles></container>\n'
+            )
+            
+            # The mimetype entry must come first and be stored uncompressed
+            with atomic_write(output_path) as tmp_path, \
+                    zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as mxl:
+                mxl.writestr(zipfile.ZipInfo('mimetype'), 'application/vnd.recordare.musicxml',
+                             compress_type=zipfile.ZIP_STORED)
+                mxl.writestr('META-INF/container.xml', container)
+                mxl.write(musicxml_path, arcname=score_name)
+            
+            logger.info(f"Compressed MusicXML to MXL: {output_path}")
             return output_path
             
         except Exception as e:
-            logger.error(f"Error converting MIDI to MusicXML: {e}")
+            logger.error(f"Error compressing MusicXML: {e}")
             raise
     
     def musicxml_to_pdf(self, musicxml_path: str, output_path: str) -> Optional[str]:
@@ -63,19 +250,33 @@ class MusicConverter:
             Path to PDF file, or None if MuseScore not available
         """
         try:
-            # Check if MuseScore is available
-            musescore_cmd = self._find_musescore()
+            # Check if MuseScore is available (cached per process)
+            musescore_cmd = find_musescore()
             
             if not musescore_cmd:
                 logger.warning("MuseScore not found, skipping PDF generation")
                 return None
             
+            # Share one MuseScore run with other jobs rendering at the same time
+            if settings.MUSESCORE_BATCH_WINDOW > 0:
+                renderer = get_batch_renderer(
+                    musescore_cmd,
+                    settings.MUSESCORE_BATCH_WINDOW,
+                    settings.MUSESCORE_BATCH_SIZE
+                )
+                result = renderer.render(musicxml_path, output_path)
+                if result:
+                    logger.info(f"Converted MusicXML to PDF: {output_path}")
+                else:
+                    logger.error(f"MuseScore batch conversion failed for {musicxml_path}")
+                return result
+            
             # Convert using MuseScore CLI
             subprocess.run(
                 [musescore_cmd, musicxml_path, '-o', output_path],
                 check=True,
                 capture_output=True,
-                timeout=60
+                timeout=RENDER_TIMEOUT
             )
             
             logger.info(f"Converted MusicXML to PDF: {output_path}")
@@ -91,32 +292,6 @@ class MusicConverter:
             logger.error(f"Error converting to PDF: {e}")
             return None
     
-    def _find_musescore(self) -> Optional[str]:
-        """Find MuseScore executable."""
-        # Common MuseScore paths
-        possible_paths = [
-            'musescore',
-            'mscore',
-            '/usr/bin/musescore',
-            '/usr/local/bin/musescore',
-            'C:\\Program Files\\MuseScore 3\\bin\\MuseScore3.exe',
-            'C:\\Program Files\\MuseScore 4\\bin\\MuseScore4.exe',
-        ]
-        
-        for path in possible_paths:
-            try:
-                result = subprocess.run(
-                    [path, '--version'],
-                    capture_output=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    return path
-            except:
-                continue
-        
-        return None
-    
     def create_piano_roll_data(self, midi_path: str) -> dict:
         """
         Extract piano roll data from MIDI for visualization.
@@ -128,54 +303,7 @@ class MusicConverter:
             Dictionary with piano roll data
         """
         try:
-            import mido
-            
-            midi = mido.MidiFile(midi_path)
-            
-            notes = []
-            current_time = 0
-            tempo = 500000  # Default tempo (120 BPM)
-            
-            for track in midi.tracks:
-                track_time = 0
-                active_notes = {}
-                
-                for msg in track:
-                    track_time += msg.time
-                    
-                    if msg.type == 'set_tempo':
-                        tempo = msg.tempo
-                    elif msg.type == 'note_on' and msg.velocity > 0:
-                        # Note starts
-                        active_notes[msg.note] = {
-                            'start': track_time,
-                            'velocity': msg.velocity
-                        }
-                    elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                        # Note ends
-                        if msg.note in active_notes:
-                            note_info = active_notes.pop(msg.note)
-                            notes.append({
-                                'pitch': msg.note,
-                                'start': note_info['start'],
-                                'end': track_time,
-                                'velocity': note_info['velocity']
-                            })
-            
-            # Convert ticks to seconds
-            ticks_per_beat = midi.ticks_per_beat
-            seconds_per_tick = (tempo / 1000000) / ticks_per_beat
-            
-            for note in notes:
-                note['start'] = note['start'] * seconds_per_tick
-                note['end'] = note['end'] * seconds_per_tick
-                note['duration'] = note['end'] - note['start']
-            
-            return {
-                'notes': notes,
-                'tempo': 60000000 / tempo,  # BPM
-                'duration': max([n['end'] for n in notes]) if notes else 0
-            }
+            return PianoRoll.from_midi(midi_path).query()
             
         except Exception as e:
             logger.error(f"Error creating piano roll data: {e}")
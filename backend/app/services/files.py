@@ -0,0 +1,33 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+
+@contextmanager
+def atomic_write(path: Union[str, Path]) -> Iterator[str]:
+    """
+    Write a file under a temporary name and rename it into place.
+
+    Yields a unique, hidden path in the same directory as `path`; once
+    the block completes it replaces `path`, so readers see either the old
+    file or the complete new one. If the block fails the temporary file
+    is removed. Concurrent writers of the same path do not share a
+    temporary file; the last one to finish wins.
+
+    Args:
+        path: Final path of the file
+
+    Yields:
+        Temporary path to write to
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
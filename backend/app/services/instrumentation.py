@@ -0,0 +1,185 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Interval between resident-memory samples while a stage runs
+MEMORY_SAMPLE_INTERVAL = 0.05  # seconds
+
+STAGE_SECONDS = Histogram(
+    'y2s_stage_duration_seconds',
+    'Wall-clock time spent in a pipeline stage',
+    ['stage'],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+STAGE_CPU_SECONDS = Histogram(
+    'y2s_stage_cpu_seconds',
+    'Process CPU time (including child processes) spent in a pipeline stage',
+    ['stage'],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+STAGE_PEAK_MEMORY = Histogram(
+    'y2s_stage_peak_memory_bytes',
+    'Peak resident memory of the process during a pipeline stage',
+    ['stage'],
+    buckets=tuple(mb * 1024 * 1024 for mb in (128, 256, 512, 1024, 2048, 4096, 8192)),
+)
+
+JOBS_TOTAL = Counter('y2s_jobs_total', 'Finished jobs', ['status'])
+AUDIO_SECONDS_TOTAL = Counter('y2s_audio_seconds_total', 'Seconds of audio transcribed')
+JOB_SECONDS_TOTAL = Counter('y2s_job_seconds_total', 'Wall-clock seconds spent on completed jobs')
+REALTIME_FACTOR = Histogram(
+    'y2s_job_realtime_factor',
+    'Seconds of audio transcribed per second of processing, per job',
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16),
+)
+
+QUEUE_DEPTH = Gauge('y2s_queue_depth', 'Jobs waiting to start')
+RUNNING_JOBS = Gauge('y2s_running_jobs', 'Jobs currently being processed')
+
+RECLAIMED_BYTES = Counter('y2s_reclaimed_bytes_total', 'Disk space freed by cleanup', ['reason'])
+
+CACHE_REQUESTS = Counter('y2s_cache_requests_total', 'Cache lookups', ['cache', 'result'])
+
+
+def record_cache(cache: str, hit: bool):
+    """
+    Count a cache lookup.
+
+    Args:
+        cache: Cache name (e.g. 'model', 'etag', 'piano_roll')
+        hit: Whether the lookup was served from the cache
+    """
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+def _current_rss() -> Optional[int]:
+    """Resident memory of this process in bytes, or None if unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _cpu_seconds() -> float:
+    """CPU time of this process and its finished child processes."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class _MemorySampler:
+    """Track peak resident memory on a background thread."""
+
+    def __init__(self):
+        self.peak = _current_rss()
+        self._stop = threading.Event()
+        self._thread = None
+        if self.peak is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(MEMORY_SAMPLE_INTERVAL):
+            rss = _current_rss()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def stop(self) -> Optional[int]:
+        """Stop sampling and return the peak, or None if unavailable."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            rss = _current_rss()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+        return self.peak
+
+
+class StageRecorder:
+    """Measure the stages of one job.
+
+    Each stage records wall-clock time, CPU time and peak resident memory,
+    both into the Prometheus histograms and into a per-job summary stored
+    with the job record. CPU time and memory are process-wide, so stages of
+    jobs running concurrently include each other's usage.
+
+    Stages may be nested (e.g. 'inference' inside 'transcribe') and may
+    run more than once per job (e.g. once per transcribed chunk); repeated
+    stages add up their times and keep the highest peak memory.
+
+    An optional profiler (see app.services.profiler) is notified when each
+    stage begins and ends.
+    """
+
+    def __init__(self, profiler=None):
+        self.profiler = profiler
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Measure the enclosed block as a pipeline stage.
+
+        Args:
+            name: Stage name
+        """
+        if self.profiler is not None:
+            self.profiler.begin_stage(name)
+        sampler = _MemorySampler()
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_seconds()
+        try:
+            yield
+        finally:
+            if self.profiler is not None:
+                self.profiler.end_stage(name)
+            wall = time.perf_counter() - wall_start
+            cpu = _cpu_seconds() - cpu_start
+            peak = sampler.stop()
+
+            STAGE_SECONDS.labels(stage=name).observe(wall)
+            STAGE_CPU_SECONDS.labels(stage=name).observe(cpu)
+            if peak is not None:
+                STAGE_PEAK_MEMORY.labels(stage=name).observe(peak)
+
+            with self._lock:
+                entry = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+                entry['wall_seconds'] = round(entry['wall_seconds'] + wall, 3)
+                entry['cpu_seconds'] = round(entry['cpu_seconds'] + cpu, 3)
+                if peak is not None:
+                    entry['peak_rss_bytes'] = max(peak, entry.get('peak_rss_bytes', 0))
+            logger.info(f"Stage {name}: {wall:.2f}s wall, {cpu:.2f}s CPU")
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the recorder was created."""
+        return time.perf_counter() - self._started
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """Copy of the per-stage measurements."""
+        with self._lock:
+            return {name: dict(entry) for name, entry in self.stages.items()}
+
+
+def record_job(status: str, audio_seconds: float = 0.0, elapsed: float = 0.0):
+    """
+    Count a finished job and its throughput.
+
+    Args:
+        status: Final job status
+        audio_seconds: Length of the transcribed audio
+        elapsed: Wall-clock seconds the job took
+    """
+    JOBS_TOTAL.labels(status=status).inc()
+    if status == 'completed' and elapsed > 0:
+        AUDIO_SECONDS_TOTAL.inc(audio_seconds)
+        JOB_SECONDS_TOTAL.inc(elapsed)
+        REALTIME_FACTOR.observe(audio_seconds / elapsed)
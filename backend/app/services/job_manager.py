@@ -1,13 +1,31 @@
 import logging
 import json
+import time
 import uuid
-from datetime import datetime
-from typing import Optional, Dict
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Tuple
 from redis import Redis
-from app.models.schemas import TranscriptionStatus, TranscriptionResult
+from redis.exceptions import WatchError
+from app.models.schemas import (
+    TranscriptionStatus,
+    TranscriptionMode,
+    TranscriptionResult,
+    JobStatusResponse,
+    BatchStatusResponse
+)
 
 logger = logging.getLogger(__name__)
 
+# Job records expire after 24 hours
+JOB_TTL = 86400
+
+# Secondary indexes, all sorted sets of job IDs scored by creation time
+CREATED_INDEX = "jobs:created"
+ACTIVE_INDEX = "jobs:active"
+STATUS_INDEX = "jobs:status:{status}"
+
+TERMINAL_STATUSES = {TranscriptionStatus.COMPLETED, TranscriptionStatus.FAILED}
+
 class JobManager:
     """Manage transcription jobs using Redis."""
     
@@ -16,12 +34,20 @@ class JobManager:
         self.redis = Redis.from_url(redis_url, decode_responses=True)
         logger.info(f"Initialized JobManager with Redis at {redis_url}")
     
-    def create_job(self, youtube_url: str) -> str:
+    def create_job(self, youtube_url: Optional[str], tenant: Optional[str] = None,
+                   batch_id: Optional[str] = None,
+                   mode: TranscriptionMode = TranscriptionMode.FULL,
+                   isolate_piano: bool = False) -> str:
         """
         Create a new transcription job.
         
         Args:
-            youtube_url: YouTube video URL
+            youtube_url: YouTube video URL, or None for an uploaded file
+            tenant: Tenant that submitted the job
+            batch_id: Parent batch job, if the job is part of a batch
+            mode: Whether to transcribe the whole video or only a preview
+            isolate_piano: Whether piano isolation was requested, kept so
+                upgrading a preview uses the same setting
             
         Returns:
             Job ID
@@ -32,19 +58,204 @@ class JobManager:
             'job_id': job_id,
             'youtube_url': youtube_url,
             'status': TranscriptionStatus.PENDING,
+            'mode': TranscriptionMode(mode),
+            'isolate_piano': isolate_piano,
             'progress': 0,
             'created_at': datetime.utcnow().isoformat(),
         }
+        if tenant:
+            job_data['tenant'] = tenant
+        if batch_id:
+            job_data['batch_id'] = batch_id
+        
+        # Store the record and index it in one round trip
+        created = self._created_timestamp(job_data)
+        pipeline = self.redis.pipeline()
+        pipeline.setex(f"job:{job_id}", JOB_TTL, json.dumps(job_data))
+        pipeline.zadd(CREATED_INDEX, {job_id: created})
+        pipeline.zadd(ACTIVE_INDEX, {job_id: created})
+        pipeline.zadd(STATUS_INDEX.format(status=TranscriptionStatus.PENDING.value), {job_id: created})
+        self._trim_indexes(pipeline, time.time())
+        pipeline.execute()
+        
+        logger.info(f"Created job {job_id} for {youtube_url or 'uploaded audio'}")
+        return job_id
+    
+    def create_batch(self, youtube_urls: List[str], tenant: Optional[str] = None,
+                     source_url: Optional[str] = None,
+                     isolate_piano: bool = False) -> Tuple[str, List[str]]:
+        """
+        Create a parent batch job with one child job per URL.
+        
+        Args:
+            youtube_urls: YouTube video URLs
+            tenant: Tenant that submitted the batch
+            source_url: Playlist URL the videos came from, if any
+            isolate_piano: Whether piano isolation was requested
+            
+        Returns:
+            Tuple of (batch_id, child job IDs)
+        """
+        batch_id = str(uuid.uuid4())
+        job_ids = [self.create_job(url, tenant=tenant, batch_id=batch_id,
+                                   isolate_piano=isolate_piano)
+                   for url in youtube_urls]
+        
+        batch_data = {
+            'batch_id': batch_id,
+            'source_url': source_url,
+            'job_ids': job_ids,
+            'created_at': datetime.utcnow().isoformat(),
+        }
+        if tenant:
+            batch_data['tenant'] = tenant
         
-        # Store in Redis with 24 hour expiry
         self.redis.setex(
-            f"job:{job_id}",
-            86400,  # 24 hours
-            json.dumps(job_data)
+            f"batch:{batch_id}",
+            JOB_TTL,  # same as its jobs
+            json.dumps(batch_data)
         )
         
-        logger.info(f"Created job {job_id} for URL: {youtube_url}")
-        return job_id
+        logger.info(f"Created batch {batch_id} with {len(job_ids)} jobs")
+        return batch_id, job_ids
+    
+    def get_batch(self, batch_id: str) -> Optional[Dict]:
+        """
+        Get batch data.
+        
+        Args:
+            batch_id: Batch ID
+            
+        Returns:
+            Batch data dictionary or None if not found
+        """
+        data = self.redis.get(f"batch:{batch_id}")
+        if data:
+            return json.loads(data)
+        return None
+    
+    def get_batch_status(self, batch_id: str) -> Optional[BatchStatusResponse]:
+        """
+        Get aggregate status of a batch, fetching all child jobs at once.
+        
+        Args:
+            batch_id: Batch ID
+            
+        Returns:
+            BatchStatusResponse or None if the batch does not exist
+        """
+        batch = self.get_batch(batch_id)
+        if not batch:
+            return None
+        
+        results = [r for r in self.get_results(batch['job_ids']) if r is not None]
+        counts: Dict[str, int] = {}
+        for result in results:
+            counts[result.status.value] = counts.get(result.status.value, 0) + 1
+        
+        terminal = {TranscriptionStatus.COMPLETED, TranscriptionStatus.FAILED}
+        statuses = {result.status for result in results}
+        if not results or statuses == {TranscriptionStatus.PENDING}:
+            status = TranscriptionStatus.PENDING
+        elif statuses == {TranscriptionStatus.FAILED}:
+            status = TranscriptionStatus.FAILED
+        elif statuses <= terminal:
+            status = TranscriptionStatus.COMPLETED
+        else:
+            status = TranscriptionStatus.PROCESSING
+        
+        total = len(batch['job_ids'])
+        progress = sum(result.progress for result in results) // max(total, 1)
+        
+        return BatchStatusResponse(
+            batch_id=batch_id,
+            status=status,
+            progress=progress,
+            total=total,
+            counts=counts,
+            source_url=batch.get('source_url'),
+            jobs=[
+                JobStatusResponse(
+                    job_id=result.job_id,
+                    status=result.status,
+                    progress=result.progress,
+                    result=result if result.status == TranscriptionStatus.COMPLETED else None
+                )
+                for result in results
+            ],
+            created_at=batch['created_at'],
+        )
+    
+    def get_results(self, job_ids: List[str]) -> List[Optional[TranscriptionResult]]:
+        """
+        Get results for many jobs with a single MGET.
+        
+        Args:
+            job_ids: Job IDs
+            
+        Returns:
+            TranscriptionResult (or None if not found) for each job ID
+        """
+        if not job_ids:
+            return []
+        
+        results = []
+        for data in self.redis.mget([f"job:{job_id}" for job_id in job_ids]):
+            try:
+                results.append(TranscriptionResult(**json.loads(data)) if data else None)
+            except Exception as e:
+                logger.error(f"Error creating TranscriptionResult: {e}")
+                results.append(None)
+        return results
+    
+    def list_jobs(self, status: Optional[str] = None, offset: int = 0,
+                  limit: int = 50) -> Tuple[int, List[TranscriptionResult]]:
+        """
+        List jobs, newest first, from the secondary indexes.
+        
+        Args:
+            status: A TranscriptionStatus value, 'active' for unfinished
+                jobs, or None for all recent jobs
+            offset: Number of jobs to skip
+            limit: Maximum number of jobs to return
+            
+        Returns:
+            Tuple of (total jobs in the index, jobs on this page)
+        """
+        if status is None:
+            key = CREATED_INDEX
+        elif status == 'active':
+            key = ACTIVE_INDEX
+        else:
+            key = STATUS_INDEX.format(status=TranscriptionStatus(status).value)
+        
+        pipeline = self.redis.pipeline(transaction=False)
+        self._trim_indexes(pipeline, time.time())
+        pipeline.zcard(key)
+        pipeline.zrevrange(key, offset, offset + limit - 1)
+        *_, total, job_ids = pipeline.execute()
+        
+        # Skip records that expired but are still within the trim window
+        results = [r for r in self.get_results(job_ids) if r is not None]
+        return total, results
+    
+    def _trim_indexes(self, pipeline, now: float):
+        """Queue removal of index entries for jobs older than the record TTL."""
+        cutoff = now - JOB_TTL
+        for key in [CREATED_INDEX, ACTIVE_INDEX] + [
+            STATUS_INDEX.format(status=status.value) for status in TranscriptionStatus
+        ]:
+            pipeline.zremrangebyscore(key, '-inf', cutoff)
+    
+    @staticmethod
+    def _created_timestamp(job_data: Dict) -> float:
+        """Index score of a job: its creation time as a Unix timestamp."""
+        try:
+            return datetime.fromisoformat(job_data['created_at']).replace(
+                tzinfo=timezone.utc
+            ).timestamp()
+        except (KeyError, ValueError):
+            return time.time()
     
     def get_job(self, job_id: str) -> Optional[Dict]:
         """
@@ -65,25 +276,96 @@ class JobManager:
         """
         Update job data.
         
+        The record is read and rewritten in one optimistic transaction,
+        like claim_upgrade, so concurrent updates of the same job (e.g. a
+        partial result and an upgrade claim) never overwrite each other's
+        fields or leave the status indexes out of step with the record.
+        
         Args:
             job_id: Job ID
             **kwargs: Fields to update
         """
-        job_data = self.get_job(job_id)
-        if not job_data:
-            logger.error(f"Job {job_id} not found")
-            return
+        key = f"job:{job_id}"
+        with self.redis.pipeline() as pipeline:
+            while True:
+                try:
+                    pipeline.watch(key)
+                    data = pipeline.get(key)
+                    if not data:
+                        logger.error(f"Job {job_id} not found")
+                        return
+                    
+                    job_data = json.loads(data)
+                    old_status = job_data.get('status')
+                    job_data.update(kwargs)
+                    
+                    pipeline.multi()
+                    self._queue_update(pipeline, job_id, job_data, old_status)
+                    pipeline.execute()
+                    break
+                except WatchError:
+                    # The job changed since it was read; apply the update again
+                    continue
         
-        job_data.update(kwargs)
+        logger.info(f"Updated job {job_id}: {kwargs}")
+    
+    def _queue_update(self, pipeline, job_id: str, job_data: Dict, old_status: str):
+        """Queue writing a job record and moving it between status indexes."""
+        pipeline.setex(f"job:{job_id}", JOB_TTL, json.dumps(job_data))
         
-        # Update in Redis
-        self.redis.setex(
-            f"job:{job_id}",
-            86400,
-            json.dumps(job_data)
-        )
+        old_status = TranscriptionStatus(old_status)
+        new_status = TranscriptionStatus(job_data['status'])
+        if new_status != old_status:
+            created = self._created_timestamp(job_data)
+            pipeline.zrem(STATUS_INDEX.format(status=old_status.value), job_id)
+            pipeline.zadd(STATUS_INDEX.format(status=new_status.value), {job_id: created})
+            if new_status in TERMINAL_STATUSES:
+                pipeline.zrem(ACTIVE_INDEX, job_id)
+            elif old_status in TERMINAL_STATUSES:
+                # A finished job is running again (preview upgrade)
+                pipeline.zadd(ACTIVE_INDEX, {job_id: created})
+    
+    def claim_upgrade(self, job_id: str) -> bool:
+        """
+        Atomically turn a completed preview back into a pending full job.
         
-        logger.info(f"Updated job {job_id}: {kwargs}")
+        The job record is watched while it is checked, so of several
+        concurrent upgrade requests exactly one succeeds.
+        
+        Args:
+            job_id: Job ID
+            
+        Returns:
+            True if the job was a completed preview and is now pending,
+            False if it does not exist or is not a completed preview
+        """
+        key = f"job:{job_id}"
+        with self.redis.pipeline() as pipeline:
+            while True:
+                try:
+                    pipeline.watch(key)
+                    data = pipeline.get(key)
+                    job_data = json.loads(data) if data else None
+                    if (not job_data
+                            or job_data.get('mode') != TranscriptionMode.PREVIEW.value
+                            or job_data.get('status') != TranscriptionStatus.COMPLETED.value):
+                        return False
+                    
+                    old_status = job_data['status']
+                    job_data.update(
+                        mode=TranscriptionMode.FULL,
+                        status=TranscriptionStatus.PENDING,
+                        progress=0
+                    )
+                    pipeline.multi()
+                    self._queue_update(pipeline, job_id, job_data, old_status)
+                    pipeline.execute()
+                    
+                    logger.info(f"Claimed preview job {job_id} for upgrade")
+                    return True
+                except WatchError:
+                    # The job changed while it was checked; check it again
+                    continue
     
     def update_status(self, job_id: str, status: TranscriptionStatus, 
                      progress: int = None):
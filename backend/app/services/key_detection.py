@@ -0,0 +1,246 @@
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np
+from app.services.note_store import MIDI_TEMPO
+
+logger = logging.getLogger(__name__)
+
+# Aarden-Essen key profiles (the music21 default for analyze('key')),
+# indexed by pitch class relative to the tonic
+MAJOR_PROFILE = np.array([17.7661, 0.145624, 14.9265, 0.160186, 19.8049, 11.3587,
+                          0.291248, 22.062, 0.145624, 8.15494, 0.232998, 4.95122])
+MINOR_PROFILE = np.array([18.2648, 0.737619, 14.0499, 16.8599, 0.702494, 14.4362,
+                          0.702494, 18.6161, 4.56621, 1.93186, 7.37619, 1.75623])
+
+# Tonics spelled for music21, indexed by key signature (fifths + 6), so
+# the name always agrees with the signature the writer emits
+MAJOR_TONICS = ['G-', 'D-', 'A-', 'E-', 'B-', 'F', 'C', 'G', 'D', 'A', 'E', 'B']
+MINOR_TONICS = ['E-', 'B-', 'F', 'C', 'G', 'D', 'A', 'E', 'B', 'F#', 'C#', 'G#']
+
+# A modulation must beat the current key signature's best correlation by
+# this much in MIN_REGION_WINDOWS consecutive windows; single windows of
+# a piece in one key regularly favour a neighbouring key
+MODULATION_MARGIN = 0.1
+MIN_REGION_WINDOWS = 4
+
+
+def _key_profiles() -> np.ndarray:
+    """Build the 24 z-normalized profiles: rows 0-11 major, 12-23 minor."""
+    profiles = np.stack(
+        [np.roll(MAJOR_PROFILE, tonic) for tonic in range(12)]
+        + [np.roll(MINOR_PROFILE, tonic) for tonic in range(12)]
+    )
+    profiles = profiles - profiles.mean(axis=1, keepdims=True)
+    return profiles / np.linalg.norm(profiles, axis=1, keepdims=True)
+
+
+KEY_PROFILES = _key_profiles()
+
+
+class KeyEstimate(NamedTuple):
+    """Estimated key of a passage."""
+    tonic: int  # pitch class 0-11
+    mode: str  # 'major' or 'minor'
+    correlation: float
+
+    @property
+    def fifths(self) -> int:
+        """Key signature as sharps (positive) or flats (negative), -6 to 5."""
+        major_tonic = self.tonic if self.mode == 'major' else (self.tonic + 3) % 12
+        return (major_tonic * 7 + 6) % 12 - 6
+
+    @property
+    def tonic_name(self) -> str:
+        """Tonic spelled for music21 (e.g. 'E-', 'F#'), matching `fifths`."""
+        names = MAJOR_TONICS if self.mode == 'major' else MINOR_TONICS
+        return names[self.fifths + 6]
+
+
+def pitch_class_histograms(pitch, onset, offset, windows: np.ndarray) -> np.ndarray:
+    """
+    Build duration-weighted pitch-class histograms for time windows.
+
+    Args:
+        pitch: MIDI pitch numbers
+        onset: Note start times in seconds
+        offset: Note end times in seconds
+        windows: Array of shape (W, 2) with window start and end times
+
+    Returns:
+        Array of shape (W, 12) with seconds sounded per pitch class
+    """
+    pitch_class = np.asarray(pitch, dtype=np.int64) % 12
+    onset = np.asarray(onset, dtype=np.float64)
+    offset = np.asarray(offset, dtype=np.float64)
+
+    # Seconds each note sounds inside each window: (W, N)
+    overlap = (np.minimum(offset[None, :], windows[:, 1:2])
+               - np.maximum(onset[None, :], windows[:, 0:1]))
+    np.clip(overlap, 0, None, out=overlap)
+
+    one_hot = np.zeros((len(pitch_class), 12))
+    one_hot[np.arange(len(pitch_class)), pitch_class] = 1
+    return overlap @ one_hot
+
+
+def _correlations(histograms: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Correlate histograms with every key profile.
+
+    Returns:
+        Tuple of (correlations of shape (H, 24), mask of histograms with notes)
+    """
+    centered = histograms - histograms.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=1)
+    correlations = (centered / np.where(norms > 0, norms, 1)[:, None]) @ KEY_PROFILES.T
+    return correlations, norms > 0
+
+
+def _key_estimate(index: int, correlation: float) -> KeyEstimate:
+    """Build the estimate for row `index` of KEY_PROFILES."""
+    return KeyEstimate(tonic=int(index % 12),
+                       mode='major' if index < 12 else 'minor',
+                       correlation=float(correlation))
+
+
+def _best_keys(histograms: np.ndarray) -> List[Optional[KeyEstimate]]:
+    """Correlate histograms with every key profile and pick the best match."""
+    correlations, valid = _correlations(histograms)
+    best = correlations.argmax(axis=1)
+
+    return [
+        _key_estimate(index, correlations[row, index]) if valid[row] else None
+        for row, index in enumerate(best)
+    ]
+
+
+def estimate_key(pitch, onset, offset) -> Optional[KeyEstimate]:
+    """
+    Estimate the key of a whole piece.
+
+    Args:
+        pitch: MIDI pitch numbers
+        onset: Note start times in seconds
+        offset: Note end times in seconds
+
+    Returns:
+        KeyEstimate, or None if there are no notes
+    """
+    pitch_class = np.asarray(pitch, dtype=np.int64) % 12
+    durations = np.asarray(offset, dtype=np.float64) - np.asarray(onset, dtype=np.float64)
+    histogram = np.bincount(pitch_class, weights=durations, minlength=12)
+    return _best_keys(histogram[None, :])[0]
+
+
+def estimate_keys(pitch, onset, offset, window: float = 16.0, hop: float = 8.0,
+                  margin: float = MODULATION_MARGIN,
+                  min_windows: int = MIN_REGION_WINDOWS) -> List[Tuple[float, KeyEstimate]]:
+    """
+    Estimate keys over sliding windows to detect modulations.
+
+    The piece opens in its whole-piece key, unless a key with another
+    key signature beats it by `margin` over the span of the first
+    `min_windows` windows, so a single unusual opening window cannot set
+    the key. After that the key only changes when a key with another
+    signature correlates better than both keys of the current signature
+    (major and relative minor) by at least `margin` in `min_windows`
+    consecutive windows; the new region starts at the first of those
+    windows. Moves between relative major and minor never count as a
+    change.
+
+    Args:
+        pitch: MIDI pitch numbers
+        onset: Note start times in seconds
+        offset: Note end times in seconds
+        window: Window length in seconds
+        hop: Distance between window starts in seconds
+        margin: Correlation a new key needs over the current key
+        min_windows: Consecutive windows a new key must win
+
+    Returns:
+        List of (start_time, KeyEstimate) for each key region
+    """
+    offset = np.asarray(offset, dtype=np.float64)
+    overall = estimate_key(pitch, onset, offset)
+    if overall is None:
+        return []
+
+    starts = np.arange(0.0, max(float(offset.max()) - window, 0.0) + hop, hop)
+    windows = np.stack([starts, starts + window], axis=1)
+    correlations, valid = _correlations(pitch_class_histograms(pitch, onset, offset, windows))
+
+    # Key signature of each row of KEY_PROFILES
+    fifths = np.array([_key_estimate(index, 0.0).fifths for index in range(24)])
+
+    def beats_current(correlation: np.ndarray, best: int) -> bool:
+        return (fifths[best] != fifths[current]
+                and correlation[best] - correlation[fifths == fifths[current]].max() >= margin)
+
+    current = overall.tonic + (0 if overall.mode == 'major' else 12)
+    opening_span = np.array([[0.0, starts[:min_windows][-1] + window]])
+    opening = _correlations(pitch_class_histograms(pitch, onset, offset, opening_span))[0][0]
+    if beats_current(opening, int(opening.argmax())):
+        current = int(opening.argmax())
+        overall = _key_estimate(current, opening[current])
+    regions = [(0.0, overall)]
+
+    # Key signature that has won the last `count` windows, from row `first`
+    candidate, first, count = None, 0, 0
+    for row, best in enumerate(correlations.argmax(axis=1).tolist()):
+        if not (valid[row] and beats_current(correlations[row], best)):
+            candidate, count = None, 0
+            continue
+        if fifths[best] != candidate:
+            candidate, first, count = fifths[best], row, 0
+        count += 1
+        if count < min_windows:
+            continue
+
+        # Major or relative minor, whichever fits the whole run better
+        run = correlations[first:row + 1].mean(axis=0)
+        key = int(np.where(fifths == candidate, run, -np.inf).argmax())
+        region = (float(starts[first]), _key_estimate(key, run[key]))
+        if region[0] == regions[-1][0]:
+            regions[-1] = region  # The piece opens in another key
+        else:
+            regions.append(region)
+        current, candidate, count = key, None, 0
+    return regions
+
+
+def estimate_time_signature(onset, velocity=None) -> Tuple[int, int]:
+    """
+    Estimate whether a piece is in triple or quadruple meter.
+
+    Compares the autocorrelation of the sixteenth-note onset-strength
+    signal at a lag of three beats against four beats. Defaults to 4/4
+    unless triple meter is clearly stronger. The grid assumes the fixed
+    120 BPM the scores are written at, so recordings at other tempos
+    can be misjudged; the pipeline only uses this when DETECT_METER is on.
+
+    Args:
+        onset: Note start times in seconds
+        velocity: Optional MIDI velocities used as onset strength
+
+    Returns:
+        Tuple of (beats, beat_type)
+    """
+    onset = np.asarray(onset, dtype=np.float64)
+    if len(onset) < 16:
+        return 4, 4
+
+    sixteenths_per_second = 4 * 1_000_000 / MIDI_TEMPO
+    slots = np.rint(onset * sixteenths_per_second).astype(np.int64)
+    weights = None if velocity is None else np.asarray(velocity, dtype=np.float64)
+    strength = np.bincount(slots, weights=weights)
+    strength = strength - strength.mean()
+
+    def autocorrelation(lag: int) -> float:
+        if len(strength) <= lag:
+            return 0.0
+        return float(np.dot(strength[:-lag], strength[lag:]) / (len(strength) - lag))
+
+    triple, quadruple = autocorrelation(12), autocorrelation(16)
+    if triple > 0 and triple > 1.2 * quadruple:
+        return 3, 4
+    return 4, 4
@@ -0,0 +1,300 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from app.models.schemas import TranscriptionMode, TranscriptionStatus
+from app.services.job_manager import TERMINAL_STATUSES
+from app.services.instrumentation import RECLAIMED_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Result fields pointing at artifacts, cleared when a job's outputs are evicted
+ARTIFACT_URL_FIELDS = ['midi_url', 'musicxml_url', 'mxl_url', 'pdf_url', 'preview_midi_url']
+
+
+class LifecycleMetrics:
+    """Process-wide counters of reclaimed disk space, by reason."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reclaimed_bytes: Dict[str, int] = {}
+        self.removed_dirs: Dict[str, int] = {}
+        self.last_sweep_at: Optional[float] = None
+
+    def record(self, reason: str, size: int):
+        """Record one removed directory of `size` bytes."""
+        with self._lock:
+            self.reclaimed_bytes[reason] = self.reclaimed_bytes.get(reason, 0) + size
+            self.removed_dirs[reason] = self.removed_dirs.get(reason, 0) + 1
+        RECLAIMED_BYTES.labels(reason=reason).inc(size)
+
+    def snapshot(self) -> Dict:
+        """Copy of the counters, safe to serialize."""
+        with self._lock:
+            return {
+                'reclaimed_bytes': dict(self.reclaimed_bytes),
+                'removed_dirs': dict(self.removed_dirs),
+                'last_sweep_at': self.last_sweep_at,
+            }
+
+
+metrics = LifecycleMetrics()
+
+
+def directory_size(path: Path) -> int:
+    """
+    Total size of the files under a directory.
+
+    Args:
+        path: Directory to measure
+
+    Returns:
+        Size in bytes (0 if the directory does not exist)
+    """
+    total = 0
+    try:
+        entries = list(os.scandir(path))
+    except FileNotFoundError:
+        return 0
+
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                total += directory_size(Path(entry.path))
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            continue  # Removed while scanning
+    return total
+
+
+def remove_directory(path: Path, reason: str) -> int:
+    """
+    Delete a directory tree and record the reclaimed space.
+
+    Args:
+        path: Directory to delete
+        reason: Metrics label (e.g. 'intermediates', 'orphans', 'quota')
+
+    Returns:
+        Bytes reclaimed
+    """
+    size = directory_size(path)
+    if not path.exists():
+        return 0
+
+    shutil.rmtree(path, ignore_errors=True)
+    metrics.record(reason, size)
+    logger.info(f"Removed {path} ({size} bytes, {reason})")
+    return size
+
+
+def remove_intermediates(upload_dir: str, job_id: str) -> int:
+    """
+    Delete a job's downloaded and processed audio.
+
+    Runs as soon as transcription has produced the note store, after which
+    nothing reads the job's audio again.
+
+    Args:
+        upload_dir: Root directory of job audio
+        job_id: Job ID
+
+    Returns:
+        Bytes reclaimed
+    """
+    return remove_directory(Path(upload_dir) / job_id, 'intermediates')
+
+
+def touch_outputs(output_dir: Path):
+    """
+    Mark a job's outputs as recently used for quota eviction.
+
+    Args:
+        output_dir: Job output directory
+    """
+    try:
+        os.utime(output_dir)
+    except FileNotFoundError:
+        pass
+
+
+class LifecycleManager:
+    """Remove expired job directories and keep storage under a quota.
+
+    Job records expire from Redis after 24 hours. A periodic sweep deletes
+    upload and output directories whose job key is gone, then evicts the
+    outputs and audio of finished jobs, least recently used first, until
+    the combined size of both directories is under the quota.
+
+    With a remote artifact store the output directory only holds working
+    copies, so evicting them keeps the jobs' download URLs; objects in the
+    store are expected to expire through the bucket's lifecycle rules.
+    """
+
+    def __init__(self, job_manager, upload_dir: str, output_dir: str,
+                 quota_bytes: int, interval: float, grace_period: float,
+                 artifact_store=None):
+        """
+        Initialize the lifecycle manager.
+
+        Args:
+            job_manager: JobManager used to look up job records
+            upload_dir: Root directory of job audio
+            output_dir: Root directory of job outputs
+            quota_bytes: Maximum combined size of both directories (0 disables)
+            interval: Seconds between sweeps
+            grace_period: Minimum age in seconds before a directory without
+                a job record is treated as orphaned
+            artifact_store: ArtifactStore the outputs are published to
+                (defaults to the output directory itself)
+        """
+        self.job_manager = job_manager
+        self.upload_dir = Path(upload_dir)
+        self.output_dir = Path(output_dir)
+        self.quota_bytes = quota_bytes
+        self.interval = interval
+        self.grace_period = grace_period
+        self.artifact_store = artifact_store
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sweeping periodically on a daemon thread."""
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name='lifecycle', daemon=True)
+        self._thread.start()
+        logger.info(f"Started lifecycle sweeps every {self.interval:.0f}s")
+
+    def _run(self):
+        """Sweep loop."""
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Lifecycle sweep failed: {e}", exc_info=True)
+            time.sleep(self.interval)
+
+    def sweep(self) -> Dict[str, int]:
+        """
+        Run one sweep: remove orphaned directories, then enforce the quota.
+
+        Returns:
+            Bytes reclaimed by reason
+        """
+        reclaimed = {
+            'orphans': self.sweep_orphans(),
+            'quota': self.enforce_quota(),
+        }
+        metrics.last_sweep_at = time.time()
+        return reclaimed
+
+    def _job_dirs(self, root: Path) -> List[Path]:
+        """List the per-job directories under a root."""
+        try:
+            return [Path(entry.path) for entry in os.scandir(root) if entry.is_dir()]
+        except FileNotFoundError:
+            return []
+
+    def sweep_orphans(self) -> int:
+        """
+        Delete job directories whose Redis job record has expired.
+
+        Returns:
+            Bytes reclaimed
+        """
+        now = time.time()
+        candidates = []
+        for path in self._job_dirs(self.upload_dir) + self._job_dirs(self.output_dir):
+            try:
+                if now - path.stat().st_mtime > self.grace_period:
+                    candidates.append(path)
+            except FileNotFoundError:
+                continue  # Removed since listing (e.g. intermediates of a finished job)
+        if not candidates:
+            return 0
+
+        # One round trip for all existence checks
+        pipeline = self.job_manager.redis.pipeline(transaction=False)
+        for path in candidates:
+            pipeline.exists(f"job:{path.name}")
+        exists = pipeline.execute()
+
+        return sum(remove_directory(path, 'orphans')
+                   for path, found in zip(candidates, exists) if not found)
+
+    def usage(self) -> Dict[str, int]:
+        """
+        Current disk usage of the storage directories.
+
+        Returns:
+            Bytes used by uploads and outputs
+        """
+        return {
+            'uploads': directory_size(self.upload_dir),
+            'outputs': directory_size(self.output_dir),
+        }
+
+    def enforce_quota(self) -> int:
+        """
+        Evict finished jobs' outputs and audio, least recently used first,
+        until storage is under the quota.
+
+        Jobs are ranked by their most recently used directory, upload or
+        output, so audio counts even when the outputs live in a remote
+        store. Completed previews keep their audio, which an upgrade
+        continues from, unless evicting everything else is not enough.
+
+        Returns:
+            Bytes reclaimed
+        """
+        if self.quota_bytes <= 0:
+            return 0
+
+        last_used: Dict[str, float] = {}
+        sizes: Dict[str, int] = {}
+        for path in self._job_dirs(self.upload_dir) + self._job_dirs(self.output_dir):
+            try:
+                # Directory mtime is bumped by every write and download
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            last_used[path.name] = max(mtime, last_used.get(path.name, mtime))
+            sizes[path.name] = sizes.get(path.name, 0) + directory_size(path)
+
+        used = sum(sizes.values())
+        if used <= self.quota_bytes:
+            return 0
+
+        job_ids = sorted(last_used, key=last_used.get)
+        results = self.job_manager.get_results(job_ids)
+        finished = [(job_id, result) for job_id, result in zip(job_ids, results)
+                    if result is None or result.status in TERMINAL_STATUSES]
+
+        reclaimed = 0
+        for keep_preview_audio in (True, False):
+            for job_id, result in finished:
+                if used - reclaimed <= self.quota_bytes:
+                    break
+
+                outputs = remove_directory(self.output_dir / job_id, 'quota')
+                reclaimed += outputs
+                if outputs and result is not None and self._outputs_are_local(job_id):
+                    self.job_manager.update_job(job_id, **{field: None for field in ARTIFACT_URL_FIELDS})
+
+                upgradable = (result is not None and result.mode == TranscriptionMode.PREVIEW
+                              and result.status == TranscriptionStatus.COMPLETED)
+                if not (keep_preview_audio and upgradable):
+                    reclaimed += remove_directory(self.upload_dir / job_id, 'quota')
+
+        if used - reclaimed > self.quota_bytes:
+            logger.warning(f"Storage still over quota after eviction: "
+                           f"{used - reclaimed} > {self.quota_bytes} bytes")
+        return reclaimed
+
+    def _outputs_are_local(self, job_id: str) -> bool:
+        """Whether the output directory is where a job's artifacts are served from."""
+        return self.artifact_store is None or self.artifact_store.local_dir(job_id) is not None
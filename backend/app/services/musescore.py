@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Common MuseScore paths
+MUSESCORE_CANDIDATES = [
+    'musescore',
+    'mscore',
+    '/usr/bin/musescore',
+    '/usr/local/bin/musescore',
+    'C:\\Program Files\\MuseScore 3\\bin\\MuseScore3.exe',
+    'C:\\Program Files\\MuseScore 4\\bin\\MuseScore4.exe',
+]
+
+# Timeout for a single score; batch timeouts scale with the batch size
+RENDER_TIMEOUT = 60
+
+
+@lru_cache(maxsize=1)
+def find_musescore() -> Optional[str]:
+    """
+    Find the MuseScore executable.
+
+    The result is cached for the lifetime of the process, so the
+    `--version` probes only run on the first call.
+
+    Returns:
+        Command to run MuseScore, or None if it is not installed
+    """
+    for path in MUSESCORE_CANDIDATES:
+        # Skip candidates that do not exist without spawning a process
+        if not shutil.which(path) and not os.path.isfile(path):
+            continue
+        try:
+            result = subprocess.run(
+                [path, '--version'],
+                capture_output=True,
+                timeout=5
+            )
+            if result.returncode == 0:
+                logger.info(f"Found MuseScore: {path}")
+                return path
+        except (OSError, subprocess.SubprocessError):
+            continue
+
+    logger.info("MuseScore not found")
+    return None
+
+
+class MuseScoreBatchRenderer:
+    """Render PDFs from many jobs with one MuseScore process.
+
+    Requests arriving within `window` seconds of each other are collected
+    and rendered together with MuseScore's batch job mode (`-j job.json`),
+    so concurrent jobs share one MuseScore start-up instead of paying a
+    cold start each.
+    """
+
+    def __init__(self, musescore_cmd: str, window: float, max_batch: int):
+        """
+        Initialize the renderer and start its background thread.
+
+        Args:
+            musescore_cmd: MuseScore executable
+            window: Seconds to wait for more requests after the first one
+            max_batch: Maximum number of scores per MuseScore run
+        """
+        self.musescore_cmd = musescore_cmd
+        self.window = window
+        self.max_batch = max_batch
+        self._requests: "queue.Queue[Tuple[str, str, Future]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='musescore-batch',
+                                        daemon=True)
+        self._thread.start()
+
+    def render(self, musicxml_path: str, output_path: str) -> Optional[str]:
+        """
+        Render a MusicXML file to PDF, blocking until its batch finishes.
+
+        Args:
+            musicxml_path: Path to input MusicXML file
+            output_path: Path for output PDF file
+
+        Returns:
+            Path to PDF file, or None if rendering failed
+        """
+        future: Future = Future()
+        self._requests.put((musicxml_path, output_path, future))
+        return future.result()
+
+    def _run(self):
+        """Collect requests into batches and render them."""
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._render_batch(batch)
+            except Exception as e:
+                logger.error(f"MuseScore batch render failed: {e}")
+            finally:
+                for _, output_path, future in batch:
+                    if not future.done():
+                        future.set_result(output_path if os.path.exists(output_path) else None)
+
+    def _render_batch(self, batch: List[Tuple[str, str, Future]]):
+        """Run MuseScore once for every score in the batch."""
+        jobs = [{'in': os.path.abspath(src), 'out': os.path.abspath(dst)}
+                for src, dst, _ in batch]
+
+        fd, job_file = tempfile.mkstemp(suffix='.json', prefix='musescore-batch-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(jobs, f)
+
+            subprocess.run(
+                [self.musescore_cmd, '-j', job_file],
+                check=True,
+                capture_output=True,
+                timeout=RENDER_TIMEOUT * len(batch)
+            )
+            logger.info(f"Rendered {len(batch)} PDFs in one MuseScore batch")
+        finally:
+            os.unlink(job_file)
+
+
+_batch_renderer: Optional[MuseScoreBatchRenderer] = None
+_batch_renderer_lock = threading.Lock()
+
+
+def get_batch_renderer(musescore_cmd: str, window: float,
+                       max_batch: int) -> MuseScoreBatchRenderer:
+    """Get the process-wide batch renderer, creating it on first use."""
+    global _batch_renderer
+    with _batch_renderer_lock:
+        if _batch_renderer is None:
+            _batch_renderer = MuseScoreBatchRenderer(musescore_cmd, window, max_batch)
+        return _batch_renderer
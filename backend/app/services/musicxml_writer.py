@@ -0,0 +1,299 @@
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.services.files import atomic_write
+from app.services.note_store import NoteStore, RIGHT_HAND, LEFT_HAND, MIDI_TEMPO
+
+logger = logging.getLogger(__name__)
+
+# Divisions per quarter note; notes are quantized to a sixteenth-note grid
+DIVISIONS = 4
+
+# Maximum number of voices per staff; longer notes are shortened to fit
+MAX_VOICES_PER_STAFF = 2
+
+# Note durations (in divisions) that can be written as one note: (type, dots)
+NOTE_TYPES = {
+    16: ('whole', 0),
+    14: ('half', 2),
+    12: ('half', 1),
+    8: ('half', 0),
+    7: ('quarter', 2),
+    6: ('quarter', 1),
+    4: ('quarter', 0),
+    3: ('eighth', 1),
+    2: ('eighth', 0),
+    1: ('16th', 0),
+}
+
+SHARP_SPELLING = [('C', 0), ('C', 1), ('D', 0), ('D', 1), ('E', 0), ('F', 0),
+                  ('F', 1), ('G', 0), ('G', 1), ('A', 0), ('A', 1), ('B', 0)]
+FLAT_SPELLING = [('C', 0), ('D', -1), ('D', 0), ('E', -1), ('E', 0), ('F', 0),
+                 ('G', -1), ('G', 0), ('A', -1), ('A', 0), ('B', -1), ('B', 0)]
+
+HEADER = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<!DOCTYPE score-partwise PUBLIC "-//Recordare//DTD MusicXML 4.0 Partwise//EN" "http://www.musicxml.org/dtds/partwise.dtd">
+<score-partwise version="4.0">
+  <work><work-title>Piano Transcription</work-title></work>
+  <identification>
+    <creator type="composer">Transcribed by YouTube2Sheets</creator>
+    <encoding><software>YouTube2Sheets</software></encoding>
+  </identification>
+  <part-list>
+    <score-part id="P1"><part-name>Piano</part-name></score-part>
+  </part-list>
+  <part id="P1">
+'''
+
+FOOTER = '''  </part>
+</score-partwise>
+'''
+
+
+class UnsupportedNotesError(ValueError):
+    """Raised when notes cannot be written by the direct MusicXML writer."""
+
+
+class MusicXMLWriter:
+    """Write two-hand piano notes straight to MusicXML.
+
+    Notes are quantized, grouped into chords, assigned to voices and
+    streamed to the output file one measure at a time, without building
+    a music21 object graph. Right-hand notes go on the treble staff and
+    left-hand notes on the bass staff of a single piano part.
+    """
+
+    def __init__(self, fifths: int = 0, mode: str = 'major',
+                 beats: int = 4, beat_type: int = 4,
+                 key_changes: Optional[Dict[int, Tuple[int, str]]] = None):
+        """
+        Initialize the writer.
+
+        Args:
+            fifths: Key signature as number of sharps (positive) or flats (negative)
+            mode: Key mode ('major' or 'minor')
+            beats: Time signature numerator
+            beat_type: Time signature denominator
+            key_changes: Optional {measure_index: (fifths, mode)} key changes
+        """
+        if beat_type not in (1, 2, 4, 8, 16):
+            raise UnsupportedNotesError(f"Unsupported time signature {beats}/{beat_type}")
+
+        self.fifths = fifths
+        self.mode = mode
+        self.beats = beats
+        self.beat_type = beat_type
+        self.measure_length = beats * DIVISIONS * 4 // beat_type
+        self.key_changes = key_changes or {}
+
+    def write(self, notes: NoteStore, output_path: str) -> str:
+        """
+        Write notes to a MusicXML file.
+
+        Args:
+            notes: Note store for the job
+            output_path: Path for output MusicXML file
+
+        Returns:
+            Path to MusicXML file
+        """
+        if len(notes) and not np.isin(notes.hand, (RIGHT_HAND, LEFT_HAND)).all():
+            raise UnsupportedNotesError("Notes must be assigned to the left or right hand")
+        if len(notes) and notes.pitch.max() > 127:
+            raise UnsupportedNotesError("Pitches must be valid MIDI note numbers")
+
+        measures, measure_count = self._layout(notes)
+        self.spelling = FLAT_SPELLING if self.fifths < 0 else SHARP_SPELLING
+
+        # Write under a temporary name so readers never see a partial file
+        with atomic_write(output_path) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(HEADER)
+            for number in range(measure_count):
+                f.write(self._measure_xml(number, measures.get(number, {})))
+            f.write(FOOTER)
+
+        logger.info(f"Wrote MusicXML directly: {output_path}")
+        return output_path
+
+    def _layout(self, notes: NoteStore) -> Tuple[Dict, int]:
+        """
+        Quantize notes and split them into per-measure, per-voice pieces.
+
+        Returns:
+            Tuple of ({measure: {(staff, voice): [pieces]}}, measure_count)
+        """
+        divisions_per_second = DIVISIONS * 1_000_000 / MIDI_TEMPO
+        starts = np.rint(notes.onset * divisions_per_second).astype(np.int64)
+        ends = np.rint(notes.offset * divisions_per_second).astype(np.int64)
+        ends = np.maximum(ends, starts + 1)
+        staves = np.where(notes.hand == RIGHT_HAND, 1, 2)
+
+        measures = defaultdict(lambda: defaultdict(list))
+        last_end = int(ends.max()) if len(notes) else 0
+        measure_count = max(1, -(-last_end // self.measure_length))
+        if not len(notes):
+            return measures, measure_count
+
+        # Group notes sharing staff and start into chords lasting as long
+        # as their longest note
+        keys = np.stack([staves, starts], axis=1)
+        chord_keys, group_ids = np.unique(keys, axis=0, return_inverse=True)
+        group_ids = group_ids.reshape(-1)
+        order = np.argsort(group_ids, kind='stable')
+        boundaries = np.flatnonzero(np.diff(group_ids[order])) + 1
+        chord_pitches = np.split(notes.pitch[order], boundaries)
+        chord_ends = np.zeros(len(chord_keys), dtype=np.int64)
+        np.maximum.at(chord_ends, group_ids, ends)
+
+        # np.unique sorts by staff, then start. Ending each chord no later
+        # than the start of the chord MAX_VOICES_PER_STAFF places after it
+        # bounds the overlap, so greedy assignment never needs more voices.
+        chord_staves, chord_starts = chord_keys[:, 0], chord_keys[:, 1]
+        later = np.arange(len(chord_keys)) + MAX_VOICES_PER_STAFF
+        has_later = later < len(chord_keys)
+        later = np.minimum(later, len(chord_keys) - 1)
+        clip = has_later & (chord_staves[later] == chord_staves)
+        chord_ends = np.where(clip, np.minimum(chord_ends, chord_starts[later]), chord_ends)
+
+        voice_ends: Dict[int, List[int]] = {1: [], 2: []}
+        for staff, start, end, pitches in zip(chord_staves.tolist(), chord_starts.tolist(),
+                                              chord_ends.tolist(), chord_pitches):
+            ends_in_staff = voice_ends[staff]
+            for voice, voice_end in enumerate(ends_in_staff):
+                if voice_end <= start:
+                    break
+            else:
+                ends_in_staff.append(0)
+                voice = len(ends_in_staff) - 1
+            ends_in_staff[voice] = end
+
+            pitches = sorted(set(pitches.tolist()))
+            voice_number = voice + 1 if staff == 1 else voice + 5
+
+            # Split chords at barlines, tying the pieces together
+            position = start
+            while position < end:
+                measure, offset = divmod(position, self.measure_length)
+                piece_end = min(end, (measure + 1) * self.measure_length)
+                measures[measure][(staff, voice_number)].append(
+                    (offset, piece_end - position, pitches,
+                     position > start, piece_end < end)
+                )
+                position = piece_end
+
+        return measures, measure_count
+
+    def _measure_xml(self, number: int, voices: Dict) -> str:
+        """Render one measure, with every voice filled to the barline."""
+        parts = [f'    <measure number="{number + 1}">\n']
+        if number == 0:
+            parts.append(self._attributes_xml())
+        elif number in self.key_changes:
+            fifths, mode = self.key_changes[number]
+            self.spelling = FLAT_SPELLING if fifths < 0 else SHARP_SPELLING
+            parts.append(f'      <attributes><key><fifths>{fifths}</fifths>'
+                         f'<mode>{mode}</mode></key></attributes>\n')
+
+        # Voice 1 of both staves is always written so empty bars get rests
+        voice_keys = sorted(set(voices) | {(1, 1), (2, 5)})
+        for index, key in enumerate(voice_keys):
+            staff, voice = key
+            hidden = voice not in (1, 5)
+            position = 0
+            pieces = voices.get(key, [])
+            if not pieces and not hidden:
+                parts.append(
+                    f'      <note><rest measure="yes"/><duration>{self.measure_length}'
+                    f'</duration><voice>{voice}</voice><staff>{staff}</staff></note>\n'
+                )
+                position = self.measure_length
+
+            for offset, length, pitches, tie_stop, tie_start in pieces:
+                if offset > position:
+                    parts.extend(self._rest_xml(offset - position, voice, staff, hidden))
+                parts.extend(self._chord_xml(length, pitches, voice, staff,
+                                             tie_stop, tie_start))
+                position = offset + length
+
+            if position < self.measure_length:
+                parts.extend(self._rest_xml(self.measure_length - position,
+                                            voice, staff, hidden))
+
+            if index < len(voice_keys) - 1:
+                parts.append(f'      <backup><duration>{self.measure_length}'
+                             f'</duration></backup>\n')
+
+        parts.append('    </measure>\n')
+        return ''.join(parts)
+
+    def _attributes_xml(self) -> str:
+        """Render the attributes and tempo of the first measure."""
+        tempo = 60000000 // MIDI_TEMPO
+        return (
+            '      <attributes>\n'
+            f'        <divisions>{DIVISIONS}</divisions>\n'
+            f'        <key><fifths>{self.fifths}</fifths><mode>{self.mode}</mode></key>\n'
+            f'        <time><beats>{self.beats}</beats>'
+            f'<beat-type>{self.beat_type}</beat-type></time>\n'
+            '        <staves>2</staves>\n'
+            '        <clef number="1"><sign>G</sign><line>2</line></clef>\n'
+            '        <clef number="2"><sign>F</sign><line>4</line></clef>\n'
+            '      </attributes>\n'
+            '      <direction placement="above"><direction-type><metronome>'
+            f'<beat-unit>quarter</beat-unit><per-minute>{tempo}</per-minute>'
+            f'</metronome></direction-type><sound tempo="{tempo}"/></direction>\n'
+        )
+
+    def _rest_xml(self, length: int, voice: int, staff: int, hidden: bool) -> List[str]:
+        """Render a rest, split into writable durations."""
+        attrs = ' print-object="no"' if hidden else ''
+        parts = []
+        for piece in _split_duration(length):
+            note_type, dots = NOTE_TYPES[piece]
+            parts.append(
+                f'      <note{attrs}><rest/><duration>{piece}</duration>'
+                f'<voice>{voice}</voice><type>{note_type}</type>{"<dot/>" * dots}'
+                f'<staff>{staff}</staff></note>\n'
+            )
+        return parts
+
+    def _chord_xml(self, length: int, pitches: List[int], voice: int, staff: int,
+                   tie_stop: bool, tie_start: bool) -> List[str]:
+        """Render a note or chord, split into tied writable durations."""
+        pieces = _split_duration(length)
+        parts = []
+        for index, piece in enumerate(pieces):
+            note_type, dots = NOTE_TYPES[piece]
+            stop = tie_stop or index > 0
+            start = tie_start or index < len(pieces) - 1
+            ties = ('<tie type="stop"/>' if stop else '') + \
+                   ('<tie type="start"/>' if start else '')
+            tied = ('<tied type="stop"/>' if stop else '') + \
+                   ('<tied type="start"/>' if start else '')
+            notations = f'<notations>{tied}</notations>' if tied else ''
+
+            for chord_index, pitch in enumerate(pitches):
+                step, alter = self.spelling[pitch % 12]
+                octave = pitch // 12 - 1
+                parts.append(
+                    '      <note>'
+                    f'{"<chord/>" if chord_index else ""}'
+                    f'<pitch><step>{step}</step>'
+                    f'{f"<alter>{alter}</alter>" if alter else ""}'
+                    f'<octave>{octave}</octave></pitch>'
+                    f'<duration>{piece}</duration>{ties}<voice>{voice}</voice>'
+                    f'<type>{note_type}</type>{"<dot/>" * dots}'
+                    f'<staff>{staff}</staff>{notations}</note>\n'
+                )
+        return parts
+
+
+def _split_duration(length: int) -> List[int]:
+    """Split a duration in divisions into writable note lengths, longest first."""
+    pieces = []
+    while length > 0:
+        piece = next(value for value in NOTE_TYPES if value <= length)
+        pieces.append(piece)
+        length -= piece
+    return pieces
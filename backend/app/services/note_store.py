@@ -0,0 +1,267 @@
+import logging
+from pathlib import Path
+from typing import List, Optional, Union
+import numpy as np
+from app.services.files import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# File name of the canonical note store inside outputs/<job_id>/
+NOTES_FILENAME = "notes.npz"
+
+# Notes transcribed so far while a job is still transcribing
+PARTIAL_NOTES_FILENAME = "notes_partial.npz"
+
+# Quick preview MIDI of the opening seconds, published while transcribing
+PREVIEW_MIDI_FILENAME = "preview.mid"
+
+# Hand assignment values for the `hand` column
+RIGHT_HAND = 0
+LEFT_HAND = 1
+
+# Timing used when rendering the store to MIDI (120 BPM)
+MIDI_TICKS_PER_BEAT = 480
+MIDI_TEMPO = 500000  # microseconds per beat
+
+
+class NoteStore:
+    """Columnar store of transcribed notes.
+
+    Every job artifact (MIDI, MusicXML, piano roll, quality metrics) is
+    derived from these arrays, so notes are only parsed once per job.
+    Times are in seconds; arrays are always sorted by onset, then pitch.
+    """
+
+    COLUMNS = ('pitch', 'onset', 'offset', 'velocity', 'hand')
+
+    def __init__(self, pitch, onset, offset, velocity, hand=None):
+        """
+        Initialize the store from parallel arrays.
+
+        Args:
+            pitch: MIDI pitch numbers
+            onset: Note start times in seconds
+            offset: Note end times in seconds
+            velocity: MIDI velocities (1-127)
+            hand: Hand assignment per note (RIGHT_HAND / LEFT_HAND)
+        """
+        pitch = np.asarray(pitch, dtype=np.uint8)
+        onset = np.asarray(onset, dtype=np.float32)
+        offset = np.asarray(offset, dtype=np.float32)
+        velocity = np.asarray(velocity, dtype=np.uint8)
+        if hand is None:
+            hand = np.full(len(pitch), RIGHT_HAND, dtype=np.uint8)
+        hand = np.asarray(hand, dtype=np.uint8)
+
+        order = np.lexsort((pitch, onset))
+        self.pitch = pitch[order]
+        self.onset = onset[order]
+        self.offset = offset[order]
+        self.velocity = velocity[order]
+        self.hand = hand[order]
+
+    def __len__(self) -> int:
+        return len(self.pitch)
+
+    @classmethod
+    def empty(cls) -> 'NoteStore':
+        """Create a store without notes."""
+        return cls([], [], [], [])
+
+    @classmethod
+    def concatenate(cls, stores: List['NoteStore']) -> 'NoteStore':
+        """Merge several stores into one."""
+        if not stores:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(store, column) for store in stores])
+                     for column in cls.COLUMNS))
+
+    def select(self, mask) -> 'NoteStore':
+        """Create a store with the notes selected by a boolean mask."""
+        return NoteStore(*(getattr(self, column)[mask] for column in self.COLUMNS))
+
+    def shifted(self, seconds: float) -> 'NoteStore':
+        """Create a store with every note moved later by `seconds`."""
+        return NoteStore(self.pitch, self.onset + seconds, self.offset + seconds,
+                         self.velocity, self.hand)
+
+    def before(self, seconds: float) -> 'NoteStore':
+        """Create a store with the notes that start before `seconds`."""
+        return self.select(self.onset < seconds)
+
+    def stitched(self, chunk: 'NoteStore', start: float, end: float) -> 'NoteStore':
+        """
+        Add the notes of a transcribed chunk to the notes found so far.
+
+        The chunk owns the notes whose onset falls in [start, end). Notes
+        it saw in its leading context (onset before `start`) are the tails
+        of notes that were cut off at the previous chunk's edge; they
+        extend the matching earlier note instead of being added again.
+
+        Args:
+            chunk: Notes of the chunk, in absolute time, including context
+            start: Start of the chunk without context in seconds
+            end: End of the chunk without context in seconds
+
+        Returns:
+            NoteStore with the notes so far and the chunk's notes
+        """
+        owned = chunk.select((chunk.onset >= start) & (chunk.onset < end))
+        tails = chunk.select(chunk.onset < start)
+
+        offset = self.offset
+        if len(tails) and len(self):
+            # An earlier note continues in a tail of the same pitch that
+            # overlaps it: (notes, tails)
+            continues = ((self.pitch[:, None] == tails.pitch[None, :])
+                         & (tails.onset[None, :] <= self.offset[:, None])
+                         & (tails.offset[None, :] > self.onset[:, None]))
+            offset = np.where(continues, tails.offset[None, :], offset[:, None]).max(axis=1)
+
+        extended = NoteStore(self.pitch, self.onset, offset, self.velocity, self.hand)
+        return NoteStore.concatenate([extended, owned])
+
+    @classmethod
+    def from_note_events(cls, note_events) -> 'NoteStore':
+        """
+        Build a store from Basic Pitch note events.
+
+        Args:
+            note_events: Iterable of (start_s, end_s, pitch, amplitude, bends)
+
+        Returns:
+            NoteStore
+        """
+        if note_events is None or len(note_events) == 0:
+            return cls.empty()
+
+        onset = np.fromiter((e[0] for e in note_events), dtype=np.float64)
+        offset = np.fromiter((e[1] for e in note_events), dtype=np.float64)
+        pitch = np.fromiter((e[2] for e in note_events), dtype=np.int64)
+        amplitude = np.fromiter((e[3] for e in note_events), dtype=np.float64)
+        velocity = np.clip(np.rint(amplitude * 127), 1, 127)
+
+        return cls(pitch, onset, offset, velocity)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'NoteStore':
+        """
+        Load a store written by `save`.
+
+        Args:
+            path: Path to the .npz file
+
+        Returns:
+            NoteStore
+        """
+        with np.load(str(path)) as data:
+            return cls(*(data[column] for column in cls.COLUMNS))
+
+    def save(self, path: Union[str, Path]) -> str:
+        """
+        Write the store to an uncompressed .npz file.
+
+        The file is written under a temporary name and renamed into place,
+        so readers never see a partially written store.
+
+        Args:
+            path: Output path (should end in .npz)
+
+        Returns:
+            Path to the written file
+        """
+        with atomic_write(path) as tmp_path, open(tmp_path, 'wb') as f:
+            np.savez(f, **{column: getattr(self, column) for column in self.COLUMNS})
+
+        logger.info(f"Saved {len(self)} notes to {path}")
+        return str(path)
+
+    @property
+    def duration(self) -> float:
+        """End time of the last sounding note in seconds."""
+        return float(self.offset.max()) if len(self) else 0.0
+
+    def to_midi(self, output_path: str) -> str:
+        """
+        Render the store as a type 1 MIDI file with one track per hand.
+
+        Args:
+            output_path: Path for the output MIDI file
+
+        Returns:
+            Path to the MIDI file
+        """
+        import mido
+
+        midi = mido.MidiFile(type=1, ticks_per_beat=MIDI_TICKS_PER_BEAT)
+        ticks_per_second = MIDI_TICKS_PER_BEAT * 1_000_000 / MIDI_TEMPO
+
+        onset_ticks = np.rint(self.onset * ticks_per_second).astype(np.int64)
+        offset_ticks = np.rint(self.offset * ticks_per_second).astype(np.int64)
+        offset_ticks = np.maximum(offset_ticks, onset_ticks + 1)
+
+        for hand, name in ((RIGHT_HAND, 'Right Hand'), (LEFT_HAND, 'Left Hand')):
+            track = mido.MidiTrack()
+            track.append(mido.MetaMessage('track_name', name=name, time=0))
+            if hand == RIGHT_HAND:
+                track.append(mido.MetaMessage('set_tempo', tempo=MIDI_TEMPO, time=0))
+
+            mask = self.hand == hand
+            count = int(mask.sum())
+            if count:
+                # Interleave note_on/note_off events; note_off sorts first on ties
+                times = np.concatenate([onset_ticks[mask], offset_ticks[mask]])
+                is_on = np.concatenate([np.ones(count, bool), np.zeros(count, bool)])
+                pitches = np.concatenate([self.pitch[mask], self.pitch[mask]])
+                velocities = np.concatenate([self.velocity[mask],
+                                             np.zeros(count, np.uint8)])
+                order = np.lexsort((is_on, times))
+                deltas = np.diff(times[order], prepend=0)
+
+                for delta, on, pitch, velocity in zip(deltas.tolist(),
+                                                      is_on[order].tolist(),
+                                                      pitches[order].tolist(),
+                                                      velocities[order].tolist()):
+                    msg_type = 'note_on' if on else 'note_off'
+                    track.append(mido.Message(msg_type, note=pitch,
+                                              velocity=velocity, time=delta))
+
+            track.append(mido.MetaMessage('end_of_track', time=0))
+            midi.tracks.append(track)
+
+        # Write under a temporary name so readers never see a partial file
+        with atomic_write(output_path) as tmp_path:
+            midi.save(tmp_path)
+        logger.info(f"Wrote MIDI from note store: {output_path}")
+        return output_path
+
+    def quality_metrics(self, duration: Optional[float] = None) -> dict:
+        """
+        Calculate quality metrics for the transcription.
+
+        Args:
+            duration: Audio duration in seconds (defaults to the last note end)
+
+        Returns:
+            Dictionary of quality metrics
+        """
+        if duration is None:
+            duration = self.duration
+        note_count = len(self)
+
+        # Polyphony estimate as reported since the first release: notes
+        # started per second, capped at 10 (not notes sounding at once)
+        polyphony_avg = min(note_count / max(duration, 1), 10.0)
+
+        # Confidence score (simplified - based on note density)
+        expected_density = 5.0  # notes per second for typical piano
+        actual_density = note_count / max(duration, 1)
+        confidence_score = min(actual_density / expected_density, 1.0)
+        confidence_score = max(0.3, min(confidence_score, 0.95))  # Clamp
+
+        return {
+            'confidence_score': round(confidence_score, 2),
+            'note_count': note_count,
+            'duration': round(duration, 2),
+            'polyphony_avg': round(polyphony_avg, 2),
+        }
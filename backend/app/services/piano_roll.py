@@ -0,0 +1,217 @@
+import json
+import logging
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+import numpy as np
+from app.services.files import atomic_write
+from app.services.note_store import NoteStore, MIDI_TEMPO
+
+logger = logging.getLogger(__name__)
+
+# File name of the precomputed piano roll inside outputs/<job_id>/
+PIANO_ROLL_FILENAME = "piano_roll.npz"
+
+DEFAULT_TEMPO = 500000  # microseconds per beat (120 BPM)
+
+# Notes encoded per chunk when streaming the piano roll as JSON
+JSON_CHUNK_NOTES = 1024
+
+
+class PianoRoll:
+    """Piano roll data with an interval index for time-range queries.
+
+    Notes are sorted by start time. `end_max[i]` holds the latest end time
+    of notes 0..i, which is non-decreasing, so the notes overlapping any
+    window can be located with two binary searches.
+    """
+
+    COLUMNS = ('pitch', 'start', 'end', 'velocity')
+
+    def __init__(self, pitch, start, end, velocity, tempo: float = 120.0):
+        """
+        Initialize piano roll data from parallel arrays.
+
+        Args:
+            pitch: MIDI pitch numbers
+            start: Note start times in seconds
+            end: Note end times in seconds
+            velocity: MIDI velocities
+            tempo: Initial tempo in BPM
+        """
+        pitch = np.asarray(pitch, dtype=np.uint8)
+        start = np.asarray(start, dtype=np.float32)
+        end = np.asarray(end, dtype=np.float32)
+        velocity = np.asarray(velocity, dtype=np.uint8)
+
+        order = np.lexsort((pitch, start))
+        self.pitch = pitch[order]
+        self.start = start[order]
+        self.end = end[order]
+        self.velocity = velocity[order]
+        self.end_max = np.maximum.accumulate(self.end) if len(self.end) else self.end
+        self.tempo = float(tempo)
+
+    def __len__(self) -> int:
+        return len(self.pitch)
+
+    @property
+    def duration(self) -> float:
+        """End time of the last sounding note in seconds."""
+        return float(self.end_max[-1]) if len(self) else 0.0
+
+    @classmethod
+    def from_notes(cls, notes: NoteStore) -> 'PianoRoll':
+        """Build piano roll data from a note store."""
+        return cls(notes.pitch, notes.onset, notes.offset, notes.velocity,
+                   tempo=60000000 / MIDI_TEMPO)
+
+    @classmethod
+    def from_midi(cls, midi_path: str) -> 'PianoRoll':
+        """
+        Build piano roll data from a MIDI file using its full tempo map.
+
+        Args:
+            midi_path: Path to MIDI file
+
+        Returns:
+            PianoRoll
+        """
+        import mido
+
+        midi = mido.MidiFile(midi_path)
+
+        tempo_ticks, tempo_values = [0], [DEFAULT_TEMPO]
+        pitches, starts, ends, velocities = [], [], [], []
+
+        for track in midi.tracks:
+            track_time = 0
+            active_notes = {}
+
+            for msg in track:
+                track_time += msg.time
+
+                if msg.type == 'set_tempo':
+                    tempo_ticks.append(track_time)
+                    tempo_values.append(msg.tempo)
+                elif msg.type == 'note_on' and msg.velocity > 0:
+                    active_notes[(msg.channel, msg.note)] = (track_time, msg.velocity)
+                elif msg.type == 'note_off' or msg.type == 'note_on':
+                    note_info = active_notes.pop((msg.channel, msg.note), None)
+                    if note_info is not None:
+                        pitches.append(msg.note)
+                        starts.append(note_info[0])
+                        ends.append(track_time)
+                        velocities.append(note_info[1])
+
+        # Tempo changes apply from their tick onwards; later events at the
+        # same tick win, which also replaces the default tempo at tick 0
+        tempo_ticks = np.asarray(tempo_ticks, dtype=np.int64)
+        tempo_values = np.asarray(tempo_values, dtype=np.float64)
+        order = np.argsort(tempo_ticks, kind='stable')
+        tempo_ticks, tempo_values = tempo_ticks[order], tempo_values[order]
+        last = np.append(tempo_ticks[1:] != tempo_ticks[:-1], True)
+        tempo_ticks, tempo_values = tempo_ticks[last], tempo_values[last]
+
+        seconds_per_tick = tempo_values / 1_000_000 / midi.ticks_per_beat
+        segment_seconds = np.diff(tempo_ticks) * seconds_per_tick[:-1]
+        tempo_seconds = np.concatenate([[0.0], np.cumsum(segment_seconds)])
+
+        def ticks_to_seconds(ticks):
+            ticks = np.asarray(ticks, dtype=np.int64)
+            segment = np.searchsorted(tempo_ticks, ticks, side='right') - 1
+            return (tempo_seconds[segment]
+                    + (ticks - tempo_ticks[segment]) * seconds_per_tick[segment])
+
+        return cls(pitches, ticks_to_seconds(starts), ticks_to_seconds(ends),
+                   velocities, tempo=60000000 / tempo_values[0])
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'PianoRoll':
+        """
+        Load piano roll data written by `save`.
+
+        Args:
+            path: Path to the .npz file
+
+        Returns:
+            PianoRoll
+        """
+        with np.load(str(path)) as data:
+            return cls(*(data[column] for column in cls.COLUMNS),
+                       tempo=float(data['tempo']))
+
+    def save(self, path: Union[str, Path]) -> str:
+        """
+        Write piano roll data to an uncompressed .npz file.
+
+        The file is written under a temporary name and renamed into place,
+        so readers never see a partially written piano roll.
+
+        Args:
+            path: Output path (should end in .npz)
+
+        Returns:
+            Path to the written file
+        """
+        with atomic_write(path) as tmp_path, open(tmp_path, 'wb') as f:
+            np.savez(f, tempo=np.float64(self.tempo),
+                     **{column: getattr(self, column) for column in self.COLUMNS})
+
+        logger.info(f"Saved piano roll with {len(self)} notes to {path}")
+        return str(path)
+
+    def query(self, start: Optional[float] = None,
+              end: Optional[float] = None) -> dict:
+        """
+        Get piano roll data for notes sounding inside a time window.
+
+        Args:
+            start: Window start in seconds (defaults to the beginning)
+            end: Window end in seconds (defaults to the end of the piece)
+
+        Returns:
+            Dictionary with notes, tempo (BPM) and total duration
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.end_max, start, side='right'))
+        hi = len(self) if end is None else int(np.searchsorted(self.start, end, side='left'))
+
+        index = np.arange(lo, max(lo, hi))
+        if start is not None:
+            index = index[self.end[index] > start]
+
+        return {
+            'notes': self._note_dicts(index),
+            'tempo': self.tempo,
+            'duration': self.duration,
+        }
+
+    def iter_json(self, chunk_notes: int = JSON_CHUNK_NOTES) -> Iterator[bytes]:
+        """
+        Encode the whole piano roll as JSON in chunks.
+
+        Produces the same document as `json.dumps(self.query())` without
+        holding the full text, or a dict for every note, in memory.
+
+        Args:
+            chunk_notes: Notes encoded per chunk
+
+        Yields:
+            UTF-8 encoded pieces of the JSON document
+        """
+        yield b'{"notes": ['
+        for lo in range(0, len(self), chunk_notes):
+            notes = json.dumps(self._note_dicts(np.arange(lo, min(lo + chunk_notes, len(self)))))
+            yield ((', ' if lo else '') + notes[1:-1]).encode()
+        yield ('], ' + json.dumps({'tempo': self.tempo, 'duration': self.duration})[1:]).encode()
+
+    def _note_dicts(self, index: np.ndarray) -> List[dict]:
+        """Build the JSON-ready note dicts for the notes at `index`."""
+        pitch = self.pitch[index].tolist()
+        note_start = self.start[index].astype(np.float64).tolist()
+        note_end = self.end[index].astype(np.float64).tolist()
+        velocity = self.velocity[index].tolist()
+
+        return [
+            {'pitch': p, 'start': s, 'end': e, 'velocity': v, 'duration': e - s}
+            for p, s, e, v in zip(pitch, note_start, note_end, velocity)
+        ]
@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Files written to outputs/<job_id>/ for profiled jobs
+PROFILE_FILENAME = "profile.json"
+PROFILE_STACKS_FILENAME = "profile.folded"
+
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+TRACEMALLOC_FRAMES = 5
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+
+# tracemalloc is process-wide; it runs while any profiled job needs it
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+def _frame_label(frame) -> str:
+    """Function name and location of a frame, as used in the profile."""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class JobProfiler:
+    """Sampling CPU profiler and allocation tracer for one job.
+
+    A background thread samples the Python stacks of the threads currently
+    running one of the job's stages every SAMPLE_INTERVAL seconds, so
+    stages running concurrently on pool threads are attributed correctly.
+    tracemalloc snapshots taken around each stage give its top allocation
+    sites. Stacks are written in collapsed ("folded") format for flame
+    graph tools, and per-stage summaries as JSON.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        """
+        Initialize the profiler.
+
+        Args:
+            interval: Seconds between stack samples
+        """
+        self.interval = interval
+        self._stacks: Counter = Counter()
+        self._threads: Dict[int, List[str]] = {}  # thread ID -> running (nested) stages
+        self._snapshots: Dict[str, tracemalloc.Snapshot] = {}
+        self._allocations: Dict[str, List[dict]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started = 0.0
+        self._ticks = 0
+        self.samples = 0
+
+    def start(self):
+        """Start sampling and allocation tracing."""
+        _start_tracemalloc()
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name='job-profiler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        """Stop sampling and allocation tracing."""
+        if self._sampler is None:
+            return
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+        _stop_tracemalloc()
+
+    def begin_stage(self, name: str):
+        """Attribute samples of the calling thread to a stage, until it ends."""
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        with self._lock:
+            self._threads.setdefault(threading.get_ident(), []).append(name)
+            if snapshot is not None:
+                self._snapshots[name] = snapshot
+
+    def end_stage(self, name: str):
+        """Attribute samples back to the enclosing stage and record allocations."""
+        with self._lock:
+            stack = self._threads.get(threading.get_ident(), [])
+            if name in stack:
+                del stack[len(stack) - 1 - stack[::-1].index(name)]
+            if not stack:
+                self._threads.pop(threading.get_ident(), None)
+            before = self._snapshots.pop(name, None)
+
+        if before is None or not tracemalloc.is_tracing():
+            return
+        diff = tracemalloc.take_snapshot().compare_to(before, 'traceback')
+        self._allocations[name] = [
+            {
+                'size_bytes': stat.size_diff,
+                'count': stat.count_diff,
+                'traceback': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            }
+            for stat in diff[:TOP_ALLOCATIONS]
+            if stat.size_diff > 0
+        ]
+
+    def _run(self):
+        """Sampler loop."""
+        while not self._stop.wait(self.interval):
+            self._ticks += 1
+            with self._lock:
+                # Samples go to the innermost stage of each thread
+                threads = {thread_id: stack[-1] for thread_id, stack in self._threads.items()}
+            if not threads:
+                continue
+
+            frames = sys._current_frames()
+            for thread_id, stage in threads.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(stage)
+                self._stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def summary(self) -> dict:
+        """
+        Summarize samples and allocations per stage.
+
+        Returns:
+            Dictionary with sample counts, top functions by self and total
+            samples, and top allocation sites for each stage
+        """
+        stages: Dict[str, dict] = {}
+        for stack, count in self._stacks.items():
+            stage, *frames = stack.split(';')
+            entry = stages.setdefault(stage, {'samples': 0, 'self': Counter(), 'total': Counter()})
+            entry['samples'] += count
+            if frames:
+                entry['self'][frames[-1]] += count
+            for label in set(frames):
+                entry['total'][label] += count
+
+        # Busy processes wake the sampler late, so use the achieved interval
+        elapsed = time.perf_counter() - self._started
+        interval = elapsed / self._ticks if self._ticks else self.interval
+
+        return {
+            'sample_interval': round(interval, 5),
+            'elapsed_seconds': round(elapsed, 3),
+            'samples': self.samples,
+            'stages': {
+                stage: {
+                    'samples': entry['samples'],
+                    'estimated_seconds': round(entry['samples'] * interval, 3),
+                    'top_self': entry['self'].most_common(TOP_FUNCTIONS),
+                    'top_total': entry['total'].most_common(TOP_FUNCTIONS),
+                    'top_allocations': self._allocations.get(stage, []),
+                }
+                for stage, entry in stages.items()
+            },
+        }
+
+    def save(self, output_dir: Path) -> List[str]:
+        """
+        Write the profile files into a job output directory.
+
+        Args:
+            output_dir: Job output directory
+
+        Returns:
+            Names of the files written
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(output_dir / PROFILE_STACKS_FILENAME, 'w') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(output_dir / PROFILE_FILENAME, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+        logger.info(f"Saved profile with {self.samples} samples to {output_dir}")
+        return [PROFILE_FILENAME, PROFILE_STACKS_FILENAME]
@@ -0,0 +1,94 @@
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+Task = Tuple[Callable, tuple]
+
+
+class FairScheduler:
+    """Run jobs on a fixed pool of threads, round-robin across tenants.
+
+    Each tenant has its own FIFO queue. Workers take one task from the
+    next tenant in turn, so a tenant that submits a whole playlist cannot
+    hold back another tenant's single job.
+    """
+
+    def __init__(self, max_workers: int):
+        """
+        Initialize the scheduler and start its worker threads.
+
+        Args:
+            max_workers: Number of jobs processed at the same time
+        """
+        self.max_workers = max_workers
+        self._queues: Dict[str, Deque[Task]] = {}
+        self._tenants: Deque[str] = deque()
+        self._condition = threading.Condition()
+        self._running = 0
+
+        for index in range(max_workers):
+            thread = threading.Thread(target=self._run, name=f'scheduler-{index}',
+                                      daemon=True)
+            thread.start()
+
+        logger.info(f"Initialized FairScheduler with {max_workers} workers")
+
+    def submit(self, tenant: str, func: Callable, *args):
+        """
+        Queue a task for a tenant.
+
+        Args:
+            tenant: Tenant the task belongs to
+            func: Function to run
+            *args: Arguments for the function
+        """
+        with self._condition:
+            if tenant not in self._queues:
+                self._queues[tenant] = deque()
+                self._tenants.append(tenant)
+            self._queues[tenant].append((func, args))
+            self._condition.notify()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of tasks waiting to start."""
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def running(self) -> int:
+        """Number of tasks currently running."""
+        with self._condition:
+            return self._running
+
+    def _next_task(self) -> Task:
+        """Wait for a task, taking tenants in round-robin order."""
+        with self._condition:
+            while not self._tenants:
+                self._condition.wait()
+
+            tenant = self._tenants.popleft()
+            queue = self._queues[tenant]
+            task = queue.popleft()
+            if queue:
+                self._tenants.append(tenant)
+            else:
+                del self._queues[tenant]
+
+            self._running += 1
+            return task
+
+    def _run(self):
+        """Worker thread loop."""
+        while True:
+            func, args = self._next_task()
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error(f"Scheduled task failed: {e}", exc_info=True)
+            finally:
+                with self._condition:
+                    self._running -= 1
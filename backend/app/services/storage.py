@@ -0,0 +1,427 @@
+import abc
+import logging
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from app.services.files import atomic_write
+from app.services.artifacts import MANIFEST_FILENAME, PROVISIONAL_FILENAME
+from app.services.instrumentation import record_cache
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Order in which a job's files are published: the preview marker is
+# uploaded first and deleted last, the manifest goes after the files it
+# describes, so a reader that checks them first never sees a mix
+_PUBLISH_ORDER = {PROVISIONAL_FILENAME: 0, MANIFEST_FILENAME: 2}
+
+
+class StoredObject(NamedTuple):
+    """Size and version of an object in an artifact store."""
+    size: int
+    version: str  # changes whenever the object is rewritten
+
+
+class ArtifactStore(abc.ABC):
+    """Shared storage for job outputs.
+
+    Workers write a job's outputs into a local directory and publish them
+    with sync(); API nodes read them back through an ArtifactCache.
+    Objects are addressed by job ID and file name, and are read and
+    written in chunks so large artifacts are never held in memory.
+    """
+
+    def local_dir(self, job_id: str) -> Optional[Path]:
+        """Directory holding a job's objects on this machine, or None for remote stores."""
+        return None
+
+    @abc.abstractmethod
+    def put(self, job_id: str, name: str, path: Path):
+        """Upload a local file as a job object."""
+
+    @abc.abstractmethod
+    def stat(self, job_id: str, name: str) -> Optional[StoredObject]:
+        """Size and version of a job object, or None if it does not exist."""
+
+    @abc.abstractmethod
+    def list(self, job_id: str) -> Dict[str, StoredObject]:
+        """All objects of a job by name."""
+
+    @abc.abstractmethod
+    def iter_object(self, job_id: str, name: str, start: int = 0,
+                    length: Optional[int] = None) -> Iterator[bytes]:
+        """Stream a job object, or `length` bytes of it from `start`, in chunks."""
+
+    @abc.abstractmethod
+    def delete(self, job_id: str, name: str):
+        """Delete a job object if it exists."""
+
+    def download(self, job_id: str, name: str, path: Path):
+        """
+        Stream a job object into a local file.
+
+        The file is replaced atomically, so readers never see a partial copy.
+
+        Args:
+            job_id: Job ID
+            name: Object name
+            path: Destination file
+        """
+        with atomic_write(path) as tmp_path, open(tmp_path, 'wb') as f:
+            for chunk in self.iter_object(job_id, name):
+                f.write(chunk)
+
+    def sync(self, job_id: str, output_dir: Path, names: Optional[Iterable[str]] = None):
+        """
+        Publish a job's output directory.
+
+        Uploads the local files and deletes objects whose file no longer
+        exists, in an order that keeps readers consistent (see
+        _PUBLISH_ORDER).
+
+        Args:
+            job_id: Job ID
+            output_dir: Local job output directory
+            names: Files to publish (defaults to the whole directory)
+        """
+        output_dir = Path(output_dir)
+        local = self.local_dir(job_id)
+        if local is not None and local.resolve() == output_dir.resolve():
+            return  # Already written in place
+
+        if names is None:
+            names = set(self.list(job_id))
+            if output_dir.is_dir():
+                names.update(path.name for path in output_dir.iterdir() if path.is_file())
+
+        names = sorted(names, key=lambda name: _PUBLISH_ORDER.get(name, 1))
+        present = [name for name in names if (output_dir / name).exists()]
+        for name in present:
+            self.put(job_id, name, output_dir / name)
+        for name in reversed(names):
+            if name not in present:
+                self.delete(job_id, name)
+
+
+class LocalArtifactStore(ArtifactStore):
+    """Artifact store in a local (or network-mounted) directory, one subdirectory per job."""
+
+    def __init__(self, root: str):
+        """
+        Initialize the store.
+
+        Args:
+            root: Store directory, normally OUTPUT_DIR
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def local_dir(self, job_id: str) -> Optional[Path]:
+        return self.root / job_id
+
+    def put(self, job_id: str, name: str, path: Path):
+        target = self.root / job_id / name
+        if Path(path).resolve() == target.resolve():
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(target) as tmp_path, open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+
+    def stat(self, job_id: str, name: str) -> Optional[StoredObject]:
+        try:
+            st = (self.root / job_id / name).stat()
+        except FileNotFoundError:
+            return None
+        return StoredObject(st.st_size, f"{st.st_mtime_ns:x}-{st.st_size:x}")
+
+    def list(self, job_id: str) -> Dict[str, StoredObject]:
+        job_dir = self.root / job_id
+        if not job_dir.is_dir():
+            return {}
+        objects = {}
+        for path in job_dir.iterdir():
+            if path.is_file() and not path.name.startswith('.'):
+                stored = self.stat(job_id, path.name)
+                if stored is not None:
+                    objects[path.name] = stored
+        return objects
+
+    def iter_object(self, job_id: str, name: str, start: int = 0,
+                    length: Optional[int] = None) -> Iterator[bytes]:
+        with open(self.root / job_id / name, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining is None or remaining > 0:
+                size = STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining)
+                chunk = f.read(size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, job_id: str, name: str):
+        (self.root / job_id / name).unlink(missing_ok=True)
+
+
+class S3ArtifactStore(ArtifactStore):
+    """Artifact store in an S3-compatible bucket.
+
+    Works with AWS S3 and, through `endpoint_url`, with S3-compatible
+    servers such as MinIO or a local stand-in like moto's server mode.
+    Credentials come from the usual boto3 sources (environment variables,
+    config files or an instance role). Uploads use boto3's managed
+    multipart transfer and reads stream (ranged) GET responses.
+
+    Requires boto3, which is only imported when this backend is used.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 client=None):
+        """
+        Initialize the store.
+
+        Args:
+            bucket: Bucket name
+            prefix: Key prefix for all jobs
+            endpoint_url: URL of an S3-compatible server (None for AWS)
+            client: Existing boto3 S3 client to use instead of creating one
+        """
+        if client is None:
+            import boto3
+
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+
+    def _key(self, job_id: str, name: str = "") -> str:
+        return '/'.join(part for part in (self.prefix, job_id, name) if part)
+
+    def put(self, job_id: str, name: str, path: Path):
+        self.client.upload_file(str(path), self.bucket, self._key(job_id, name))
+
+    def stat(self, job_id: str, name: str) -> Optional[StoredObject]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(job_id, name))
+        except self.client.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return StoredObject(head['ContentLength'], head['ETag'].strip('"'))
+
+    def list(self, job_id: str) -> Dict[str, StoredObject]:
+        prefix = self._key(job_id) + '/'
+        objects = {}
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get('Contents', []):
+                name = item['Key'][len(prefix):]
+                if name and '/' not in name:
+                    objects[name] = StoredObject(item['Size'], item['ETag'].strip('"'))
+        return objects
+
+    def iter_object(self, job_id: str, name: str, start: int = 0,
+                    length: Optional[int] = None) -> Iterator[bytes]:
+        kwargs = {}
+        if start or length is not None:
+            end = '' if length is None else str(start + length - 1)
+            kwargs['Range'] = f"bytes={start}-{end}"
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(job_id, name),
+                                      **kwargs)['Body']
+        try:
+            yield from body.iter_chunks(STREAM_CHUNK_SIZE)
+        finally:
+            body.close()
+
+    def delete(self, job_id: str, name: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(job_id, name))
+
+
+class _CachedFile:
+    """A store object copied into the cache."""
+
+    def __init__(self, version: str, size: int):
+        self.version = version
+        self.size = size
+        self.last_used = time.monotonic()
+
+
+class ArtifactCache:
+    """Read-through cache of store objects on an API node.
+
+    Objects are streamed into `cache_dir/<job_id>/` on first use and served
+    from there. A job's cached files are revalidated against the store
+    (one metadata request per file, no download) at most every
+    `revalidate_after` seconds, so preview outputs and partial notes are
+    picked up when they change while hot downloads do not hit the store.
+    The least recently used files are evicted when the cache grows past
+    `max_bytes`. Files written into a job's cache directory by the API
+    itself (such as a manifest computed on first download) are removed
+    together with the job's last cached file.
+
+    For a store on local disk the store directory is used directly.
+    """
+
+    def __init__(self, store: ArtifactStore, cache_dir: str, max_bytes: int,
+                 revalidate_after: float):
+        """
+        Initialize the cache.
+
+        Args:
+            store: Store to read from
+            cache_dir: Directory for cached files
+            max_bytes: Size limit of the cache
+            revalidate_after: Seconds a validated file is served without
+                checking the store again
+        """
+        self.store = store
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self._files: Dict[Tuple[str, str], _CachedFile] = {}
+        # Job ID -> (time of the current validation window, names validated in it)
+        self._validated: Dict[str, Tuple[float, Set[str]]] = {}
+        self._pruned_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def fetch(self, job_id: str, names: Iterable[str]) -> Path:
+        """
+        Make files of a job available locally.
+
+        Args:
+            job_id: Job ID
+            names: File names needed
+
+        Returns:
+            Local job directory holding those of the files that exist
+        """
+        local = self.store.local_dir(job_id)
+        if local is not None:
+            return local
+
+        names = list(names)
+        job_dir = self.cache_dir / job_id
+        now = time.monotonic()
+        with self._lock:
+            self._prune_validated(now)
+            window = self._validated.get(job_id)
+            if window is None or now - window[0] >= self.revalidate_after:
+                # All files served in one window are validated in that window
+                window = self._validated[job_id] = (now, set())
+            validated = window[1]
+            stale = [name for name in names if name not in validated]
+            for name in names:
+                cached = self._files.get((job_id, name))
+                if cached is not None:
+                    cached.last_used = now
+
+        downloaded = False
+        for name in stale:
+            downloaded |= self._refresh(job_id, name, job_dir / name)
+            with self._lock:
+                validated.add(name)
+
+        if downloaded:
+            self._evict()
+        return job_dir
+
+    def _refresh(self, job_id: str, name: str, path: Path) -> bool:
+        """Bring one cached file up to date with the store; returns True if it was downloaded."""
+        key = (job_id, name)
+        stored = self.store.stat(job_id, name)
+        with self._lock:
+            cached = self._files.get(key)
+
+        if stored is None:
+            if cached is not None:
+                self._remove([key])
+            return False
+
+        hit = cached is not None and cached.version == stored.version and path.exists()
+        record_cache('artifact_store', hit=hit)
+        if hit:
+            return False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.store.download(job_id, name, path)
+        with self._lock:
+            self._files[key] = _CachedFile(stored.version, stored.size)
+        logger.info(f"Cached {name} of job {job_id} ({stored.size} bytes)")
+        return True
+
+    def _prune_validated(self, now: float):
+        """Forget expired validation windows; called with the lock held."""
+        if now - self._pruned_at < self.revalidate_after:
+            return
+        self._pruned_at = now
+        for job_id, (started, _) in list(self._validated.items()):
+            if now - started >= self.revalidate_after:
+                del self._validated[job_id]
+
+    def _evict(self):
+        """Remove least recently used files until the cache fits in max_bytes."""
+        with self._lock:
+            used = sum(cached.size for cached in self._files.values())
+            if used <= self.max_bytes:
+                return
+            victims: List[Tuple[str, str]] = []
+            for key, cached in sorted(self._files.items(), key=lambda item: item[1].last_used):
+                if used <= self.max_bytes:
+                    break
+                victims.append(key)
+                used -= cached.size
+        self._remove(victims)
+
+    def _remove(self, keys: List[Tuple[str, str]]):
+        """
+        Drop cached files, and the rest of a job's directory with its last file.
+
+        A job's directory may also hold files the API wrote itself, which
+        are never in `_files`; they go once no cached file of the job is
+        left. Hidden files are downloads in progress and are left alone.
+        """
+        with self._lock:
+            for job_id, name in keys:
+                self._files.pop((job_id, name), None)
+                if job_id in self._validated:
+                    self._validated[job_id][1].discard(name)
+            jobs = {job_id for job_id, _ in self._files}
+            emptied = {job_id for job_id, _ in keys if job_id not in jobs}
+            for job_id in emptied:
+                self._validated.pop(job_id, None)
+
+        for job_id, name in keys:
+            (self.cache_dir / job_id / name).unlink(missing_ok=True)
+        for job_id in emptied:
+            job_dir = self.cache_dir / job_id
+            try:
+                for path in job_dir.iterdir():
+                    if path.is_file() and not path.name.startswith('.'):
+                        path.unlink(missing_ok=True)
+                job_dir.rmdir()
+            except OSError:
+                pass  # Gone already, or a download into it is in progress
+
+def create_artifact_store() -> ArtifactStore:
+    """
+    Create the artifact store configured in the settings.
+
+    Returns:
+        LocalArtifactStore on OUTPUT_DIR, or S3ArtifactStore
+
+    Raises:
+        ValueError: If the configuration is invalid
+    """
+    from app.core.config import settings
+
+    if settings.ARTIFACT_STORE == 'local':
+        return LocalArtifactStore(settings.OUTPUT_DIR)
+    if settings.ARTIFACT_STORE == 's3':
+        if not settings.S3_BUCKET:
+            raise ValueError("ARTIFACT_STORE=s3 requires S3_BUCKET")
+        return S3ArtifactStore(settings.S3_BUCKET, settings.S3_PREFIX, settings.S3_ENDPOINT_URL)
+    raise ValueError(f"Unknown ARTIFACT_STORE: {settings.ARTIFACT_STORE}")
@@ -1,32 +1,90 @@
 import os
 import logging
+import tempfile
+import time
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Optional, Tuple
 import numpy as np
-from basic_pitch.inference import predict
-from basic_pitch import ICASSP_2022_MODEL_PATH
-import librosa
+from app.services.note_store import NoteStore, RIGHT_HAND, LEFT_HAND
+from app.services.instrumentation import StageRecorder, record_cache
 
 logger = logging.getLogger(__name__)
 
+# Basic Pitch inference settings
+ONSET_THRESHOLD = 0.5
+FRAME_THRESHOLD = 0.3
+MINIMUM_NOTE_LENGTH = 127.70  # ms
+
+# Preview settings: stricter thresholds and a longer minimum note keep
+# only confident notes, so note creation and every format rendered from
+# the notes have less to do
+PREVIEW_ONSET_THRESHOLD = 0.6
+PREVIEW_FRAME_THRESHOLD = 0.4
+PREVIEW_MINIMUM_NOTE_LENGTH = 200.0  # ms
+
+# Audio context added on both sides of a chunk so notes at the edges
+# are detected as well as they would be in the full recording
+CHUNK_CONTEXT = 1.0  # seconds
+
+# Callback receiving (notes_so_far, transcribed_seconds, total_seconds)
+PartialCallback = Callable[[NoteStore, float, float], None]
+
 class PianoTranscriber:
-    """Transcribe audio to MIDI using Basic Pitch model."""
+    """Transcribe audio to MIDI using Basic Pitch model.
+    
+    Basic Pitch, librosa and soundfile are imported by the methods that
+    use them, like in AudioProcessor, so importing the worker does not
+    load the model stack.
+    """
     
     def __init__(self):
         """Initialize the transcriber with Basic Pitch model."""
+        from basic_pitch import ICASSP_2022_MODEL_PATH
+        
         self.model_path = ICASSP_2022_MODEL_PATH
+        self._model = None
         logger.info("Initialized Basic Pitch transcriber")
     
-    def transcribe(self, audio_path: str, output_dir: str) -> Tuple[str, dict]:
+    def _get_model(self):
+        """Load the Basic Pitch model once and reuse it for every job."""
+        from basic_pitch.inference import Model
+        
+        record_cache('model', hit=self._model is not None)
+        if self._model is None:
+            self._model = Model(self.model_path)
+        return self._model
+    
+    def transcribe(self, audio_path: str, output_dir: str,
+                   on_partial: Optional[PartialCallback] = None,
+                   first_chunk_seconds: float = 20.0,
+                   chunk_seconds: float = 30.0,
+                   partial_interval: float = 0.0,
+                   fast: bool = False,
+                   stages: Optional[StageRecorder] = None) -> Tuple[NoteStore, dict]:
         """
-        Transcribe audio to MIDI.
+        Transcribe audio to notes.
+        
+        When `on_partial` is given the audio is transcribed in chunks and
+        the callback receives the notes found so far after each chunk.
+        `fast` trades some accuracy for speed for previews: inference runs
+        in one pass with the PREVIEW_* note settings and without the
+        melodia note post-processing.
         
         Args:
             audio_path: Path to input audio file
             output_dir: Directory to save output files
+            on_partial: Optional callback for incremental results
+            first_chunk_seconds: Length of the first chunk, kept short so
+                the first partial result arrives quickly
+            chunk_seconds: Length of the remaining chunks
+            partial_interval: Minimum seconds between `on_partial` calls
+                after the first one
+            fast: Use the cheaper preview settings
+            stages: Recorder for the 'inference' and 'note_creation' stages
             
         Returns:
-            Tuple of (midi_path, quality_metrics)
+            Tuple of (note_store, quality_metrics)
         """
         try:
             output_path = Path(output_dir)
@@ -35,79 +93,122 @@ class PianoTranscriber:
             # Run Basic Pitch inference
             logger.info(f"Starting transcription for {audio_path}")
             
-            model_output, midi_data, note_events = predict(
-                audio_path,
-                self.model_path,
-                onset_threshold=0.5,
-                frame_threshold=0.3,
-                minimum_note_length=127.70,  # ms
-                minimum_frequency=None,
-                maximum_frequency=None,
-                multiple_pitch_bends=False,
-                melodia_trick=True,
-                debug_file=None,
-            )
-            
-            # Save MIDI file
-            midi_path = output_path / "transcription.mid"
-            midi_data.write(str(midi_path))
+            if on_partial is None or fast:
+                model_output = self._infer(audio_path, stages)
+                notes = self._create_notes(model_output, fast, stages)
+            else:
+                notes = self._transcribe_chunked(
+                    audio_path, on_partial, first_chunk_seconds, chunk_seconds,
+                    partial_interval, stages
+                )
             
-            logger.info(f"Transcription completed: {midi_path}")
+            logger.info(f"Transcription completed: {len(notes)} notes")
             
             # Calculate quality metrics
-            quality_metrics = self._calculate_quality_metrics(
-                midi_data, 
-                audio_path,
-                note_events
-            )
+            quality_metrics = self._calculate_quality_metrics(notes, audio_path)
             
-            return str(midi_path), quality_metrics
+            return notes, quality_metrics
             
         except Exception as e:
             logger.error(f"Error during transcription: {e}")
             raise
     
-    def _calculate_quality_metrics(self, midi_data, audio_path: str, 
-                                   note_events) -> dict:
+    def _infer(self, audio_path: str, stages: Optional[StageRecorder]) -> dict:
+        """Run the Basic Pitch model on an audio file."""
+        from basic_pitch.inference import run_inference
+        
+        model = self._get_model()
+        with stages.stage('inference') if stages else nullcontext():
+            return run_inference(audio_path, model)
+    
+    def _create_notes(self, model_output: dict, fast: bool,
+                      stages: Optional[StageRecorder]) -> NoteStore:
+        """Turn model output into notes with the full or preview settings."""
+        from basic_pitch.constants import AUDIO_SAMPLE_RATE, FFT_HOP
+        from basic_pitch.note_creation import model_output_to_notes
+        
+        minimum_note_length = PREVIEW_MINIMUM_NOTE_LENGTH if fast else MINIMUM_NOTE_LENGTH
+        with stages.stage('note_creation') if stages else nullcontext():
+            _, note_events = model_output_to_notes(
+                model_output,
+                onset_thresh=PREVIEW_ONSET_THRESHOLD if fast else ONSET_THRESHOLD,
+                frame_thresh=PREVIEW_FRAME_THRESHOLD if fast else FRAME_THRESHOLD,
+                min_note_len=int(np.round(minimum_note_length / 1000
+                                          * (AUDIO_SAMPLE_RATE / FFT_HOP))),
+                min_freq=None,
+                max_freq=None,
+                include_pitch_bends=False,
+                multiple_pitch_bends=False,
+                melodia_trick=not fast,
+            )
+            return NoteStore.from_note_events(note_events)
+    
+    def _transcribe_chunked(self, audio_path: str, on_partial: PartialCallback,
+                            first_chunk_seconds: float,
+                            chunk_seconds: float,
+                            partial_interval: float,
+                            stages: Optional[StageRecorder] = None) -> NoteStore:
+        """
+        Transcribe audio chunk by chunk, reporting notes after each chunk.
+        
+        Each chunk is padded with CHUNK_CONTEXT seconds of audio on both
+        sides and keeps only the notes whose onset falls inside it, so
+        every note is reported exactly once. Notes still sounding past a
+        chunk's trailing context are extended from the next chunk (see
+        NoteStore.stitched).
+        
+        Returns:
+            NoteStore with all notes
+        """
+        import librosa
+        import soundfile as sf
+        
+        y, sr = librosa.load(audio_path, sr=None, mono=True)
+        total_seconds = len(y) / sr
+        
+        notes = NoteStore.empty()
+        start, length = 0.0, first_chunk_seconds
+        last_partial = None
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            chunk_path = os.path.join(tmp, 'chunk.wav')
+            
+            while start < total_seconds:
+                end = min(start + length, total_seconds)
+                context_start = max(0.0, start - CHUNK_CONTEXT)
+                context_end = min(total_seconds, end + CHUNK_CONTEXT)
+                sf.write(chunk_path, y[int(context_start * sr):int(context_end * sr)], sr)
+                
+                model_output = self._infer(chunk_path, stages)
+                chunk = self._create_notes(model_output, False, stages).shifted(context_start)
+                notes = notes.stitched(chunk, start, end)
+                
+                # Every publish rewrites and re-uploads all notes so far,
+                # so long files only publish every `partial_interval`
+                now = time.monotonic()
+                if last_partial is None or now - last_partial >= partial_interval:
+                    on_partial(notes, end, total_seconds)
+                    last_partial = now
+                start, length = end, chunk_seconds
+        
+        return notes
+    
+    def _calculate_quality_metrics(self, notes: NoteStore, audio_path: str) -> dict:
         """
         Calculate quality metrics for the transcription.
         
         Args:
-            midi_data: MIDI data object
+            notes: Transcribed notes
             audio_path: Path to original audio
-            note_events: Note events from transcription
             
         Returns:
             Dictionary of quality metrics
         """
         try:
-            # Count notes
-            note_count = len([n for track in midi_data.tracks for n in track 
-                            if n.type == 'note_on'])
+            import librosa
             
-            # Get duration
             duration = librosa.get_duration(path=audio_path)
-            
-            # Calculate average polyphony (notes playing simultaneously)
-            if note_events is not None and len(note_events) > 0:
-                # Simple polyphony estimation
-                polyphony_avg = min(note_count / max(duration, 1), 10.0)
-            else:
-                polyphony_avg = 0.0
-            
-            # Confidence score (simplified - based on note density)
-            # In production, you'd use more sophisticated metrics
-            expected_density = 5.0  # notes per second for typical piano
-            actual_density = note_count / max(duration, 1)
-            confidence_score = min(actual_density / expected_density, 1.0)
-            confidence_score = max(0.3, min(confidence_score, 0.95))  # Clamp
-            
-            return {
-                'confidence_score': round(confidence_score, 2),
-                'note_count': note_count,
-                'duration': round(duration, 2),
-                'polyphony_avg': round(polyphony_avg, 2),
-            }
+            return notes.quality_metrics(duration)
             
         except Exception as e:
             logger.error(f"Error calculating quality metrics: {e}")
@@ -118,48 +219,39 @@ class PianoTranscriber:
                 'polyphony_avg': 0.0,
             }
     
-    def apply_piano_postprocessing(self, midi_path: str, output_path: str) -> str:
+    def apply_piano_postprocessing(self, notes: NoteStore) -> NoteStore:
         """
-        Apply piano-specific post-processing to MIDI.
+        Apply piano-specific post-processing to transcribed notes.
         
         Args:
-            midi_path: Input MIDI path
-            output_path: Output MIDI path
+            notes: Transcribed notes
             
         Returns:
-            Path to processed MIDI
+            Processed notes
         """
         try:
-            import mido
-            
-            midi = mido.MidiFile(midi_path)
-            
             # Apply quantization
-            midi = self._quantize_midi(midi)
+            notes = self._quantize_notes(notes)
             
             # Split into hands (basic heuristic)
-            midi = self._split_hands(midi)
-            
-            # Save processed MIDI
-            midi.save(output_path)
+            notes = self._split_hands(notes)
             
-            logger.info(f"Applied piano post-processing: {output_path}")
-            return output_path
+            logger.info("Applied piano post-processing")
+            return notes
             
         except Exception as e:
             logger.error(f"Error in post-processing: {e}")
             # Return original if processing fails
-            import shutil
-            shutil.copy(midi_path, output_path)
-            return output_path
+            return notes
     
-    def _quantize_midi(self, midi):
-        """Apply quantization to MIDI timing."""
+    def _quantize_notes(self, notes: NoteStore) -> NoteStore:
+        """Apply quantization to note timing."""
         # Simplified quantization - in production use more sophisticated approach
-        return midi
+        return notes
     
-    def _split_hands(self, midi):
-        """Split notes into left and right hand tracks."""
+    def _split_hands(self, notes: NoteStore) -> NoteStore:
+        """Assign notes to the left or right hand."""
         # Simplified hand split - in production use ML or heuristics
-        # Typically: notes above middle C (60) = right hand, below = left hand
-        return midi
+        # Notes from middle C (60) upwards = right hand, below = left hand
+        hand = np.where(notes.pitch >= 60, RIGHT_HAND, LEFT_HAND)
+        return NoteStore(notes.pitch, notes.onset, notes.offset, notes.velocity, hand)
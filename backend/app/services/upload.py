@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import wave
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Decoded upload format, matching what the pipeline resamples to anyway
+UPLOAD_SAMPLE_RATE = 16000
+UPLOAD_SAMPLE_WIDTH = 2  # 16-bit PCM
+
+PCM_READ_SIZE = 64 * 1024
+MAX_FIELD_SIZE = 1024
+
+
+class UploadError(ValueError):
+    """Raised when an upload is malformed or cannot be decoded."""
+
+
+class UploadLimitError(UploadError):
+    """Raised when an upload exceeds the size or duration limit."""
+
+
+class AudioUpload:
+    """Stream a multipart audio upload into a WAV file while it arrives.
+
+    The request body is parsed incrementally with python-multipart. Bytes
+    of the audio part are written to disk and piped straight into an
+    ffmpeg process that decodes them to 16 kHz mono PCM, so decoding runs
+    alongside the upload. Size is checked on every chunk received and
+    duration on every chunk decoded, and the upload is aborted as soon as
+    either limit is exceeded.
+    """
+
+    def __init__(self, output_path: Path, raw_path: Path, max_bytes: int,
+                 max_seconds: float, file_field: str = 'file'):
+        """
+        Initialize the upload.
+
+        Args:
+            output_path: Where to write the decoded WAV file
+            raw_path: Where to keep the uploaded file as received
+            max_bytes: Maximum size of the uploaded file
+            max_seconds: Maximum decoded audio duration
+            file_field: Name of the multipart field holding the audio
+        """
+        self.output_path = output_path
+        self.raw_path = raw_path
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.file_field = file_field
+
+        self.filename: Optional[str] = None
+        self.fields: Dict[str, str] = {}
+        self.received_bytes = 0
+        self.decoded_seconds = 0.0
+
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b''
+        self._header_value = b''
+        self._part_name: Optional[str] = None
+        self._part_value = b''
+        self._pending: List[bytes] = []
+
+    async def receive(self, content_type: str, body: AsyncIterator[bytes]):
+        """
+        Receive the request body and decode the audio part.
+
+        Args:
+            content_type: Request Content-Type header
+            body: Request body chunks
+
+        Raises:
+            UploadLimitError: If the size or duration limit is exceeded
+            UploadError: If the request is malformed or has no audio
+        """
+        media_type, params = parse_options_header(content_type)
+        if media_type != b'multipart/form-data' or b'boundary' not in params:
+            raise UploadError("Expected a multipart/form-data request")
+
+        parser = MultipartParser(params[b'boundary'], {
+            'on_part_begin': self._on_part_begin,
+            'on_part_data': self._on_part_data,
+            'on_part_end': self._on_part_end,
+            'on_header_field': self._on_header_field,
+            'on_header_value': self._on_header_value,
+            'on_header_end': self._on_header_end,
+            'on_headers_finished': self._on_headers_finished,
+        })
+
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        decoder, pcm_writer = await self._start_decoder('pipe:0')
+        streaming = True
+
+        try:
+            with open(self.raw_path, 'wb') as raw:
+                async for chunk in body:
+                    parser.write(chunk)
+                    for data in self._pending:
+                        raw.write(data)
+                        if streaming:
+                            try:
+                                decoder.stdin.write(data)
+                                await decoder.stdin.drain()
+                            except (BrokenPipeError, ConnectionResetError):
+                                streaming = False  # Decoder gave up; retried from disk below
+                    self._pending.clear()
+
+                    # Surface limit errors while the upload is still arriving
+                    if pcm_writer.done() and pcm_writer.exception():
+                        await pcm_writer
+                parser.finalize()
+
+            if self.filename is None:
+                raise UploadError(f"No '{self.file_field}' file in upload")
+
+            if streaming:
+                decoder.stdin.close()
+            returncode, stderr = await self._finish_decoder(decoder, pcm_writer)
+
+            if returncode != 0:
+                # Containers that need seeking (e.g. MP4 with a trailing
+                # index) cannot be decoded from a pipe; decode the saved file
+                logger.info(f"Streaming decode failed for {self.filename}, decoding from disk")
+                decoder, pcm_writer = await self._start_decoder(str(self.raw_path))
+                returncode, stderr = await self._finish_decoder(decoder, pcm_writer)
+                if returncode != 0:
+                    raise UploadError(f"Could not decode audio: {stderr}")
+
+            if self.decoded_seconds == 0:
+                raise UploadError("Uploaded file contains no audio")
+
+        except BaseException:
+            if decoder.returncode is None:
+                decoder.kill()
+                await decoder.wait()
+            pcm_writer.cancel()
+            self.output_path.unlink(missing_ok=True)
+            self.raw_path.unlink(missing_ok=True)
+            raise
+
+        logger.info(f"Received upload {self.filename}: {self.received_bytes} bytes, "
+                    f"{self.decoded_seconds:.1f}s of audio")
+
+    async def _start_decoder(self, source: str):
+        """Start ffmpeg decoding `source` to PCM and a task writing the WAV."""
+        decoder = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-i', source,
+            '-ac', '1', '-ar', str(UPLOAD_SAMPLE_RATE), '-f', 's16le', 'pipe:1',
+            stdin=asyncio.subprocess.PIPE if source == 'pipe:0' else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        return decoder, asyncio.create_task(self._write_pcm(decoder))
+
+    async def _finish_decoder(self, decoder, pcm_writer) -> Tuple[int, str]:
+        """Wait for ffmpeg to finish and return (returncode, stderr)."""
+        await pcm_writer
+        stderr = await decoder.stderr.read()
+        returncode = await decoder.wait()
+        return returncode, stderr.decode(errors='replace').strip()
+
+    async def _write_pcm(self, decoder):
+        """Copy decoded PCM into the WAV file, enforcing the duration limit."""
+        bytes_per_second = UPLOAD_SAMPLE_RATE * UPLOAD_SAMPLE_WIDTH
+        with wave.open(str(self.output_path), 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(UPLOAD_SAMPLE_WIDTH)
+            wav.setframerate(UPLOAD_SAMPLE_RATE)
+
+            decoded_bytes = 0
+            self.decoded_seconds = 0.0
+            while True:
+                pcm = await decoder.stdout.read(PCM_READ_SIZE)
+                if not pcm:
+                    break
+                wav.writeframes(pcm)
+                decoded_bytes += len(pcm)
+                self.decoded_seconds = decoded_bytes / bytes_per_second
+                if self.decoded_seconds > self.max_seconds:
+                    decoder.kill()  # Unblocks the upload loop if it is writing to ffmpeg
+                    raise UploadLimitError(
+                        f"Audio is longer than the {self.max_seconds:.0f}s limit"
+                    )
+
+    # python-multipart callbacks
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._part_name = None
+        self._part_value = b''
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b''
+        self._header_value = b''
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b'content-disposition', b''))
+        name = options.get(b'name', b'').decode()
+        if name == self.file_field and b'filename' in options:
+            if self.filename is not None:
+                raise UploadError("Only one audio file can be uploaded")
+            self.filename = options[b'filename'].decode(errors='replace')
+        self._part_name = name
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._part_name == self.file_field and self.filename is not None:
+            self.received_bytes += end - start
+            if self.received_bytes > self.max_bytes:
+                raise UploadLimitError(
+                    f"Upload is larger than the {self.max_bytes // (1024 * 1024)} MB limit"
+                )
+            self._pending.append(data[start:end])
+        else:
+            self._part_value += data[start:end]
+            if len(self._part_value) > MAX_FIELD_SIZE:
+                raise UploadError(f"Form field '{self._part_name}' is too large")
+
+    def _on_part_end(self):
+        if self._part_name and self._part_name != self.file_field:
+            self.fields[self._part_name] = self._part_value.decode(errors='replace')
@@ -1,10 +1,25 @@
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Optional
 from app.services.audio_processor import AudioProcessor
 from app.services.transcriber import PianoTranscriber
 from app.services.converter import MusicConverter
+from app.services.note_store import (
+    NoteStore,
+    NOTES_FILENAME,
+    PARTIAL_NOTES_FILENAME,
+    PREVIEW_MIDI_FILENAME
+)
+from app.services.piano_roll import PianoRoll, PIANO_ROLL_FILENAME
 from app.services.job_manager import JobManager
+from app.services.artifacts import MANIFEST_FILENAME, register_artifacts, set_provisional
+from app.services.lifecycle import remove_directory, remove_intermediates
+from app.services.instrumentation import StageRecorder, record_job
+from app.services.profiler import JobProfiler
+from app.services.storage import create_artifact_store
 from app.models.schemas import TranscriptionStatus
 from app.core.config import settings
 
@@ -20,17 +35,26 @@ class TranscriptionWorker:
         self.transcriber = PianoTranscriber()
         self.converter = MusicConverter()
         self.job_manager = JobManager(settings.REDIS_URL)
+        self.artifact_store = create_artifact_store()
         logger.info("Initialized TranscriptionWorker")
     
-    def process_job(self, job_id: str, youtube_url: str, isolate_piano: bool = False):
+    def process_job(self, job_id: str, youtube_url: str, isolate_piano: bool = False,
+                    profile: bool = False, preview: bool = False):
         """
         Process a transcription job.
         
+        A preview only downloads and transcribes the first
+        PREVIEW_MODE_SECONDS of the video with cheaper settings and no PDF,
+        keeping the downloaded segment so upgrade_job can finish it.
+        
         Args:
             job_id: Job ID
             youtube_url: YouTube video URL
-            isolate_piano: Whether to isolate piano from mix
+            isolate_piano: Whether to isolate piano from mix (ignored for previews)
+            profile: Whether to capture a CPU and allocation profile
+            preview: Whether to transcribe only a quick preview
         """
+        stages = self._stage_recorder(profile)
         try:
             logger.info(f"Starting job {job_id}")
             
@@ -41,10 +65,12 @@ class TranscriptionWorker:
                 progress=10
             )
             
-            audio_path, video_info = self.audio_processor.download_youtube_audio(
-                youtube_url, 
-                job_id
-            )
+            with stages.stage('download'):
+                audio_path, video_info = self.audio_processor.download_youtube_audio(
+                    youtube_url, 
+                    job_id,
+                    max_seconds=settings.PREVIEW_MODE_SECONDS if preview else None
+                )
             
             self.job_manager.update_job(
                 job_id,
@@ -52,76 +78,336 @@ class TranscriptionWorker:
                 video_duration=video_info['duration']
             )
             
-            # Step 2: Process audio
+            self._transcribe_audio(job_id, audio_path, isolate_piano, stages, preview=preview)
+            
+            logger.info(f"Completed {'preview ' if preview else ''}job {job_id}")
+            
+        except Exception as e:
+            self._fail_job(job_id, e, stages)
+        finally:
+            self._save_profile(job_id, stages)
+            self._drop_local_outputs(job_id)
+    
+    def upgrade_job(self, job_id: str, isolate_piano: bool = False, profile: bool = False):
+        """
+        Turn a completed preview into a full transcription.
+        
+        Only the audio after the preview segment is downloaded, using the
+        video info cached by the preview; if the segment is gone the whole
+        video is downloaded again. The preview outputs stay downloadable
+        until the full run replaces them.
+        
+        Args:
+            job_id: Job ID of a completed preview
+            isolate_piano: Whether to isolate piano from mix
+            profile: Whether to capture a CPU and allocation profile
+        """
+        stages = self._stage_recorder(profile)
+        try:
+            logger.info(f"Upgrading preview job {job_id}")
+            
             self.job_manager.update_status(
                 job_id,
-                TranscriptionStatus.PROCESSING,
-                progress=30
+                TranscriptionStatus.DOWNLOADING,
+                progress=10
             )
             
-            # Convert to mono and normalize
-            processed_path = str(Path(audio_path).parent / "processed.wav")
-            self.audio_processor.convert_to_mono_wav(audio_path, processed_path)
-            self.audio_processor.normalize_audio(processed_path)
+            with stages.stage('download'):
+                audio_path = self.audio_processor.download_remainder(job_id)
+                if audio_path is None:
+                    job = self.job_manager.get_job(job_id)
+                    audio_path, _ = self.audio_processor.download_youtube_audio(
+                        job['youtube_url'],
+                        job_id
+                    )
+            
+            self._transcribe_audio(job_id, audio_path, isolate_piano, stages)
+            
+            logger.info(f"Completed job {job_id}")
             
-            # Optionally isolate piano
-            if isolate_piano:
+        except Exception as e:
+            self._fail_job(job_id, e, stages)
+        finally:
+            self._save_profile(job_id, stages)
+            self._drop_local_outputs(job_id)
+    
+    def process_upload(self, job_id: str, audio_path: str, isolate_piano: bool = False,
+                       profile: bool = False):
+        """
+        Process a transcription job for an uploaded audio file.
+        
+        The upload endpoint has already decoded the file to WAV, so this
+        skips the download step and runs the rest of the pipeline.
+        
+        Args:
+            job_id: Job ID
+            audio_path: Path to the decoded upload
+            isolate_piano: Whether to isolate piano from mix
+            profile: Whether to capture a CPU and allocation profile
+        """
+        stages = self._stage_recorder(profile)
+        try:
+            logger.info(f"Starting upload job {job_id}")
+            self._transcribe_audio(job_id, audio_path, isolate_piano, stages)
+            logger.info(f"Completed job {job_id}")
+            
+        except Exception as e:
+            self._fail_job(job_id, e, stages)
+        finally:
+            self._save_profile(job_id, stages)
+            self._drop_local_outputs(job_id)
+    
+    def _stage_recorder(self, profile: bool) -> StageRecorder:
+        """Create a job's stage recorder, with a running profiler if requested."""
+        if not profile:
+            return StageRecorder()
+        
+        profiler = JobProfiler()
+        profiler.start()
+        return StageRecorder(profiler=profiler)
+    
+    def _save_profile(self, job_id: str, stages: StageRecorder):
+        """Stop a job's profiler, if any, and save the profile with its outputs."""
+        if stages.profiler is None:
+            return
+        
+        try:
+            stages.profiler.stop()
+            output_dir = Path(settings.OUTPUT_DIR) / job_id
+            names = stages.profiler.save(output_dir)
+            self.artifact_store.sync(job_id, output_dir, names)
+        except Exception as e:
+            logger.warning(f"Could not save profile for job {job_id}: {e}")
+    
+    def _drop_local_outputs(self, job_id: str):
+        """Remove a finished job's working copy of its outputs once they live in a remote store."""
+        if self.artifact_store.local_dir(job_id) is None:
+            remove_directory(Path(settings.OUTPUT_DIR) / job_id, 'published')
+    
+    def _fail_job(self, job_id: str, error: Exception, stages: StageRecorder):
+        """
+        Mark a job as failed, keeping the timings of the stages that ran.
+        
+        Args:
+            job_id: Job ID
+            error: Exception that stopped the job
+            stages: Stage measurements so far
+        """
+        logger.error(f"Error processing job {job_id}: {error}", exc_info=True)
+        self.job_manager.update_job(job_id, stage_metrics=stages.as_dict())
+        self.job_manager.set_error(job_id, str(error))
+        record_job(TranscriptionStatus.FAILED.value)
+        remove_intermediates(settings.UPLOAD_DIR, job_id)
+    
+    def _transcribe_audio(self, job_id: str, audio_path: str, isolate_piano: bool,
+                          stages: StageRecorder, preview: bool = False):
+        """
+        Run the pipeline from audio processing to completion.
+        
+        Args:
+            job_id: Job ID
+            audio_path: Path to the job's source audio
+            isolate_piano: Whether to isolate piano from mix
+            stages: Recorder for per-stage timing and resource usage
+            preview: Use the cheap preview pipeline and keep the audio
+                for a later upgrade
+        """
+        # Step 2: Process audio
+        self.job_manager.update_status(
+            job_id,
+            TranscriptionStatus.PROCESSING,
+            progress=30
+        )
+        
+        # Convert to mono and normalize
+        with stages.stage('process_audio'):
+            processed_path = str(Path(audio_path).parent / "processed.wav")
+            with stages.stage('decode'):
+                y, sr = self.audio_processor.decode_audio(audio_path)
+            with stages.stage('resample'):
+                self.audio_processor.resample_to_wav(y, sr, processed_path)
+            del y  # Free the decoded samples before the rest of the job
+            with stages.stage('normalize'):
+                self.audio_processor.normalize_audio(processed_path)
+        
+        # Optionally isolate piano (too slow for a preview)
+        if isolate_piano and not preview:
+            with stages.stage('isolate_piano'):
                 isolated_path = str(Path(audio_path).parent / "isolated.wav")
                 processed_path = self.audio_processor.isolate_piano(
                     processed_path, 
                     isolated_path
                 )
-            
-            # Step 3: Transcribe
-            self.job_manager.update_status(
-                job_id,
-                TranscriptionStatus.TRANSCRIBING,
-                progress=50
-            )
-            
-            output_dir = Path(settings.OUTPUT_DIR) / job_id
-            output_dir.mkdir(parents=True, exist_ok=True)
-            
-            midi_path, quality_metrics = self.transcriber.transcribe(
+        
+        # Step 3: Transcribe
+        self.job_manager.update_status(
+            job_id,
+            TranscriptionStatus.TRANSCRIBING,
+            progress=50
+        )
+        
+        output_dir = Path(settings.OUTPUT_DIR) / job_id
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        with stages.stage('transcribe'):
+            notes, quality_metrics = self.transcriber.transcribe(
                 processed_path,
-                str(output_dir)
+                str(output_dir),
+                on_partial=None if preview else partial(self._publish_partial, job_id, output_dir),
+                first_chunk_seconds=settings.PREVIEW_SECONDS,
+                chunk_seconds=settings.TRANSCRIBE_CHUNK_SECONDS,
+                partial_interval=settings.PARTIAL_PUBLISH_INTERVAL,
+                fast=preview,
+                stages=stages
             )
-            
-            # Apply piano post-processing
-            processed_midi = str(output_dir / "transcription_processed.mid")
-            self.transcriber.apply_piano_postprocessing(midi_path, processed_midi)
-            
-            # Step 4: Convert to other formats
-            self.job_manager.update_status(
-                job_id,
-                TranscriptionStatus.CONVERTING,
-                progress=80
+        
+        # Apply piano post-processing and persist the canonical note store
+        with stages.stage('postprocess'):
+            notes = self.transcriber.apply_piano_postprocessing(notes)
+            notes.save(output_dir / NOTES_FILENAME)
+        (output_dir / PARTIAL_NOTES_FILENAME).unlink(missing_ok=True)
+        
+        # The audio is not read again once the notes exist, unless a
+        # preview is upgraded later
+        if not preview:
+            remove_intermediates(settings.UPLOAD_DIR, job_id)
+        
+        # Step 4: Convert to other formats
+        self.job_manager.update_status(
+            job_id,
+            TranscriptionStatus.CONVERTING,
+            progress=80
+        )
+        
+        # MIDI, notation (MusicXML then PDF) and piano roll are
+        # independent, so render them concurrently
+        processed_midi = str(output_dir / "transcription_processed.mid")
+        musicxml_path = str(output_dir / "transcription.musicxml")
+        mxl_path = str(output_dir / "transcription.mxl")
+        pdf_path = str(output_dir / "transcription.pdf")
+        
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            midi_future = pool.submit(self._write_midi, notes, processed_midi, stages)
+            notation_future = pool.submit(
+                self._convert_notation, notes, musicxml_path, mxl_path,
+                None if preview else pdf_path, stages, preview
+            )
+            piano_roll_future = pool.submit(
+                self._write_piano_roll, notes, output_dir / PIANO_ROLL_FILENAME, stages
             )
             
-            # Convert to MusicXML
-            musicxml_path = str(output_dir / "transcription.musicxml")
-            self.converter.midi_to_musicxml(processed_midi, musicxml_path)
-            
-            # Convert to PDF (optional, may fail if MuseScore not available)
-            pdf_path = str(output_dir / "transcription.pdf")
-            pdf_result = self.converter.musicxml_to_pdf(musicxml_path, pdf_path)
+            midi_future.result()
+            piano_roll_future.result()
+            pdf_result = notation_future.result()
+        
+        # Outputs are immutable from here on, unless they are a preview;
+        # hash them once for ETags
+        register_artifacts(output_dir)
+        set_provisional(output_dir, preview)
+        
+        # Publish before the job is marked complete, so any API node can serve it
+        with stages.stage('publish'):
+            self.artifact_store.sync(job_id, output_dir)
+        
+        # Step 5: Complete
+        self.job_manager.update_job(
+            job_id,
+            status=TranscriptionStatus.COMPLETED,
+            progress=100,
+            quality=quality_metrics,
+            midi_url=f"/api/v1/download/{job_id}/midi",
+            musicxml_url=f"/api/v1/download/{job_id}/musicxml",
+            mxl_url=f"/api/v1/download/{job_id}/mxl",
+            pdf_url=f"/api/v1/download/{job_id}/pdf" if pdf_result else None,
+            stage_metrics=stages.as_dict(),
+        )
+        record_job(TranscriptionStatus.COMPLETED.value,
+                   audio_seconds=quality_metrics.get('duration', 0.0),
+                   elapsed=stages.elapsed)
+    
+    def _publish_partial(self, job_id: str, output_dir: Path, notes: NoteStore,
+                         transcribed_seconds: float, total_seconds: float):
+        """
+        Publish notes transcribed so far while the job is still running.
+        
+        Saves the partial note store for the piano-roll endpoint, writes a
+        preview MIDI once the first PREVIEW_SECONDS are transcribed and
+        advances progress through the TRANSCRIBING stage (50-75%).
+        
+        Args:
+            job_id: Job ID
+            output_dir: Job output directory
+            notes: Notes transcribed so far
+            transcribed_seconds: Audio transcribed so far
+            total_seconds: Total audio length
+        """
+        try:
+            notes = self.transcriber.apply_piano_postprocessing(notes)
+            notes.save(output_dir / PARTIAL_NOTES_FILENAME)
+            published = [PARTIAL_NOTES_FILENAME]
             
-            # Create piano roll data
-            piano_roll_data = self.converter.create_piano_roll_data(processed_midi)
+            updates = {
+                'transcribed_seconds': round(transcribed_seconds, 2),
+                'progress': 50 + int(25 * transcribed_seconds / max(total_seconds, 1)),
+            }
             
-            # Step 5: Complete
-            self.job_manager.update_job(
-                job_id,
-                status=TranscriptionStatus.COMPLETED,
-                progress=100,
-                quality=quality_metrics,
-                midi_url=f"/api/v1/download/{job_id}/midi",
-                musicxml_url=f"/api/v1/download/{job_id}/musicxml",
-                pdf_url=f"/api/v1/download/{job_id}/pdf" if pdf_result else None,
-            )
+            preview_path = output_dir / PREVIEW_MIDI_FILENAME
+            preview_ready = transcribed_seconds >= min(settings.PREVIEW_SECONDS, total_seconds)
+            if preview_ready and not preview_path.exists():
+                notes.before(settings.PREVIEW_SECONDS).to_midi(str(preview_path))
+                register_artifacts(output_dir, ['preview'])
+                published += [PREVIEW_MIDI_FILENAME, MANIFEST_FILENAME]
+                updates['preview_midi_url'] = f"/api/v1/download/{job_id}/preview"
             
-            logger.info(f"Completed job {job_id}")
+            self.artifact_store.sync(job_id, output_dir, published)
+            self.job_manager.update_job(job_id, **updates)
             
         except Exception as e:
-            logger.error(f"Error processing job {job_id}: {e}", exc_info=True)
-            self.job_manager.set_error(job_id, str(e))
+            # Partial results are best effort and must not fail the job
+            logger.warning(f"Could not publish partial results for job {job_id}: {e}")
+    
+    def _write_midi(self, notes: NoteStore, midi_path: str, stages: StageRecorder):
+        """Write the job's MIDI file as a measured stage."""
+        with stages.stage('midi'):
+            notes.to_midi(midi_path)
+    
+    def _write_piano_roll(self, notes: NoteStore, path: Path, stages: StageRecorder):
+        """Precompute the job's piano roll as a measured stage."""
+        with stages.stage('piano_roll'):
+            PianoRoll.from_notes(notes).save(path)
+    
+    def _convert_notation(self, notes: NoteStore, musicxml_path: str,
+                          mxl_path: str, pdf_path: Optional[str], stages: StageRecorder,
+                          preview: bool = False):
+        """
+        Write MusicXML, compress it to MXL and render it to PDF.
+        
+        Previews use the whole-piece key and 4/4 instead of detecting key
+        changes and meter.
+        
+        Args:
+            notes: Note store for the job
+            musicxml_path: Output MusicXML path
+            mxl_path: Output compressed MusicXML path
+            pdf_path: Output PDF path, or None to skip the PDF
+            stages: Recorder for per-stage timing and resource usage
+            preview: Whether the notes are a quick preview
+            
+        Returns:
+            Path to PDF file, or None if skipped or MuseScore not available
+        """
+        with stages.stage('musicxml'):
+            self.converter.notes_to_musicxml(
+                notes,
+                musicxml_path,
+                detect_modulations=settings.DETECT_KEY_CHANGES and not preview,
+                detect_meter=settings.DETECT_METER and not preview
+            )
+            self.converter.musicxml_to_mxl(musicxml_path, mxl_path)
+        
+        if pdf_path is None:
+            return None
+        
+        # Convert to PDF (optional, may fail if MuseScore not available)
+        with stages.stage('pdf'):
+            return self.converter.musicxml_to_pdf(musicxml_path, pdf_path)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Measure how long the API process takes to import.
+
+Imports app.main in fresh interpreters and reports the median import time
+and any heavy ML modules that were loaded. The exit status is 1 when a
+heavy module is imported, the import is slower than --max-seconds, or it
+regresses beyond the threshold against a baseline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_import [--repeat 5] [--max-seconds 5]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.25]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+# Modules the API must not import; they belong to the worker
+HEAVY_MODULES = ['tensorflow', 'basic_pitch', 'librosa', 'music21', 'pydub', 'yt_dlp']
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': seconds,
+    'modules': len(sys.modules),
+    'heavy_modules': [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure_api_import(repeat: int = 5) -> dict:
+    """
+    Import app.main in `repeat` fresh interpreters.
+
+    Args:
+        repeat: Number of interpreters to start
+
+    Returns:
+        Dictionary with the median import time, module count and any heavy
+        modules that were loaded
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', _PROBE],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        'seconds': round(statistics.median(run['seconds'] for run in runs), 4),
+        'runs': [round(run['seconds'], 4) for run in runs],
+        'modules': runs[-1]['modules'],
+        'heavy_modules': sorted({m for run in runs for m in run['heavy_modules']}),
+    }
+
+
+def check_import(current: dict, baseline: dict = None, threshold: float = 0.25,
+                 max_seconds: float = None) -> List[str]:
+    """
+    Check an import measurement against limits and an optional baseline.
+
+    Args:
+        current: Result of measure_api_import
+        baseline: Earlier result of measure_api_import
+        threshold: Allowed relative slowdown against the baseline
+        max_seconds: Absolute limit on the import time
+
+    Returns:
+        Descriptions of every problem found
+    """
+    problems = []
+    if current['heavy_modules']:
+        problems.append(f"api_import loads {', '.join(current['heavy_modules'])}")
+    if max_seconds is not None and current['seconds'] > max_seconds:
+        problems.append(f"api_import: {current['seconds']:.3f}s > {max_seconds:.3f}s limit")
+    if baseline:
+        before = baseline['seconds']
+        if current['seconds'] > before * (1 + threshold):
+            problems.append(f"api_import: {before:.3f}s -> {current['seconds']:.3f}s "
+                            f"(+{(current['seconds'] / max(before, 1e-9) - 1) * 100:.0f}%)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Fresh interpreters to time (median is reported)')
+    parser.add_argument('--max-seconds', type=float, default=5.0,
+                        help='Fail when importing the API takes longer than this')
+    parser.add_argument('--output', help="Write results as JSON to this path ('-' for stdout)")
+    parser.add_argument('--baseline', help='Earlier JSON result to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed relative slowdown before failing')
+    args = parser.parse_args()
+
+    result = {'benchmark': 'import', 'api_import': measure_api_import(args.repeat)}
+    report = sys.stderr if args.output == '-' else sys.stdout
+    api_import = result['api_import']
+    print(f"app.main imported in {api_import['seconds']:.3f}s "
+          f"({api_import['modules']} modules)", file=report)
+
+    if args.output == '-':
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text()).get('api_import')
+
+    problems = check_import(api_import, baseline, args.threshold, args.max_seconds)
+    for problem in problems:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Compare the direct MusicXML writer against the music21 path.
+
+Runs both conversions on note stores from real job outputs and prints
+wall-clock timings and output sizes.
+
+Usage (from backend/):
+    python -m benchmarks.bench_musicxml [notes.npz ...] [--outputs ./outputs]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.converter import MusicConverter
+from app.services.musicxml_writer import MusicXMLWriter
+from app.services.note_store import NoteStore, NOTES_FILENAME
+
+
+def time_call(func, repeat: int) -> float:
+    """Return the median wall-clock time of `repeat` calls in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('paths', nargs='*', help='notes.npz files to convert')
+    parser.add_argument('--outputs', default='./outputs',
+                        help='Job output directory searched when no paths are given')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per conversion (median is reported)')
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in args.paths] or sorted(Path(args.outputs).glob(f'*/{NOTES_FILENAME}'))
+    if not paths:
+        parser.error(f"No {NOTES_FILENAME} files found")
+
+    converter = MusicConverter()
+    print(f"{'job':<38} {'notes':>6} {'direct s':>9} {'music21 s':>10} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        direct_path = str(Path(tmp) / 'direct.musicxml')
+        music21_path = str(Path(tmp) / 'music21.musicxml')
+
+        for path in paths:
+            notes = NoteStore.load(path)
+            direct = time_call(lambda: MusicXMLWriter().write(notes, direct_path), args.repeat)
+            slow = time_call(lambda: converter.notes_to_musicxml_music21(notes, music21_path),
+                             args.repeat)
+            print(f"{path.parent.name:<38} {len(notes):>6} {direct:>9.3f} {slow:>10.3f} "
+                  f"{slow / max(direct, 1e-9):>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
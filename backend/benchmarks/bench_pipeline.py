@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+"""
+Benchmark every stage of the transcription pipeline on synthetic audio.
+
+Renders a known note sequence and runs it through the real
+TranscriptionWorker.process_job, with job state in an in-memory Redis
+(fakeredis) and a local stand-in for the YouTube download. Reports the
+worker's per-stage wall time, CPU time and peak memory, the job's total
+wall time and the import time of the API process (see bench_import).
+Results can be written as JSON and compared against a baseline; the
+exit status is 1 when any stage regresses beyond the threshold.
+
+Runs offline on a CPU-only machine; needs requirements-dev.txt for
+fakeredis.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline [--seconds 60] [--polyphony 3] [--repeat 3]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.25]
+"""
+import os
+
+# Keep TensorFlow on the CPU and quiet before any service imports it
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import librosa
+
+from app.core.config import settings
+from app.models.schemas import TranscriptionStatus
+from app.services.audio_processor import AudioProcessor
+from app.services.instrumentation import StageRecorder
+from app.services.musescore import find_musescore
+from app.services.note_store import NoteStore, NOTES_FILENAME
+from app.services.worker import TranscriptionWorker
+from benchmarks.bench_import import check_import, measure_api_import
+from benchmarks.synthetic import SAMPLE_RATE, generate_notes, note_f1, render, write_wav
+
+# Worker stages in pipeline order; MIDI, notation and piano roll overlap.
+# process_audio covers decode, resample and normalize; transcribe covers
+# inference and note creation (summed over chunks) plus partial publishing
+STAGES = ['download', 'process_audio', 'decode', 'resample', 'normalize', 'transcribe',
+          'inference', 'note_creation', 'postprocess', 'midi', 'musicxml', 'pdf',
+          'piano_roll', 'publish']
+
+# Differences below this many seconds are treated as noise
+MIN_REGRESSION_SECONDS = 0.05
+
+# Largest acceptable drop in note F1 against the baseline
+MAX_F1_DROP = 0.02
+
+
+class LocalAudioSource(AudioProcessor):
+    """AudioProcessor whose YouTube download serves a local file instead."""
+
+    def __init__(self, audio_path: Path, upload_dir: str):
+        super().__init__(upload_dir)
+        self.audio_path = audio_path
+
+    def download_youtube_audio(self, url: str, job_id: str,
+                               max_seconds: Optional[float] = None) -> Tuple[str, dict]:
+        """Copy the local file to where the downloader would put it."""
+        output_path = self.output_dir / job_id
+        output_path.mkdir(parents=True, exist_ok=True)
+        audio_file = output_path / 'audio.wav'
+        shutil.copyfile(self.audio_path, audio_file)
+        duration = librosa.get_duration(path=str(audio_file))
+        return str(audio_file), {'title': self.audio_path.name, 'duration': duration,
+                                 'uploader': 'benchmark'}
+
+
+def create_worker(audio_path: Path, work_dir: Path) -> TranscriptionWorker:
+    """
+    Create a worker that keeps all job state and files inside `work_dir`.
+
+    Args:
+        audio_path: Recording served as every job's download
+        work_dir: Directory for uploads and outputs
+
+    Returns:
+        TranscriptionWorker on fakeredis and the local audio source
+    """
+    import fakeredis
+
+    settings.UPLOAD_DIR = str(work_dir / 'uploads')
+    settings.OUTPUT_DIR = str(work_dir / 'outputs')
+    settings.ARTIFACT_STORE = 'local'
+
+    worker = TranscriptionWorker()
+    worker.job_manager.redis = fakeredis.FakeRedis(decode_responses=True)
+    worker.audio_processor = LocalAudioSource(audio_path, settings.UPLOAD_DIR)
+    return worker
+
+
+def run_pipeline(worker: TranscriptionWorker) -> Tuple[Dict[str, dict], float, NoteStore]:
+    """
+    Run one job through TranscriptionWorker.process_job.
+
+    Returns:
+        Tuple of (per-stage measurements, job wall seconds, transcribed notes)
+
+    Raises:
+        RuntimeError: If the job fails
+    """
+    job_id = worker.job_manager.create_job('local://benchmark')
+
+    started = time.perf_counter()
+    worker.process_job(job_id, 'local://benchmark')
+    elapsed = time.perf_counter() - started
+
+    job = worker.job_manager.get_job(job_id)
+    if job['status'] != TranscriptionStatus.COMPLETED:
+        raise RuntimeError(f"Benchmark job failed: {job.get('error')}")
+
+    measurements = job['stage_metrics']
+    if job.get('pdf_url') is None:
+        measurements['pdf']['skipped'] = True
+    notes = NoteStore.load(Path(settings.OUTPUT_DIR) / job_id / NOTES_FILENAME)
+    return measurements, elapsed, notes
+
+
+def summarize(runs: List[Dict[str, dict]]) -> Dict[str, dict]:
+    """Median wall and CPU time and maximum peak memory of each stage that ran."""
+    summary = {}
+    for stage in STAGES:
+        entries = [run[stage] for run in runs if stage in run]
+        if not entries:
+            continue
+        walls = [entry['wall_seconds'] for entry in entries]
+        peaks = [entry['peak_rss_bytes'] for entry in entries if 'peak_rss_bytes' in entry]
+        summary[stage] = {
+            'wall_seconds': round(statistics.median(walls), 4),
+            'cpu_seconds': round(statistics.median(entry['cpu_seconds'] for entry in entries), 4),
+            'peak_rss_bytes': max(peaks) if peaks else None,
+            'runs': walls,
+        }
+        if any(entry.get('skipped') for entry in entries):
+            summary[stage]['skipped'] = True
+    return summary
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Compare a result against a baseline.
+
+    Args:
+        result: Current benchmark result
+        baseline: Earlier benchmark result
+        threshold: Allowed relative slowdown per stage (0.25 = 25%)
+
+    Returns:
+        Descriptions of every regression found
+    """
+    if result['config'] != baseline.get('config'):
+        print(f"warning: baseline config {baseline.get('config')} differs from "
+              f"{result['config']}", file=sys.stderr)
+
+    regressions = []
+    for stage, current in result['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if previous is None or current.get('skipped') or previous.get('skipped'):
+            continue
+        now, before = current['wall_seconds'], previous['wall_seconds']
+        if now > before * (1 + threshold) and now - before > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{stage}: {before:.3f}s -> {now:.3f}s "
+                               f"(+{(now / max(before, 1e-9) - 1) * 100:.0f}%)")
+
+    # Stages overlap inside the worker, so the job time is checked as well
+    now, before = result['total_seconds'], baseline.get('total_seconds')
+    if (before is not None and now > before * (1 + threshold)
+            and now - before > MIN_REGRESSION_SECONDS):
+        regressions.append(f"total: {before:.3f}s -> {now:.3f}s "
+                           f"(+{(now / max(before, 1e-9) - 1) * 100:.0f}%)")
+
+    f1, previous_f1 = result['quality']['note_f1'], baseline.get('quality', {}).get('note_f1')
+    if previous_f1 is not None and f1 < previous_f1 - MAX_F1_DROP:
+        regressions.append(f"note_f1: {previous_f1:.3f} -> {f1:.3f}")
+
+    regressions += check_import(result['api_import'], baseline.get('api_import'), threshold)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=60.0,
+                        help='Length of the synthetic recording')
+    parser.add_argument('--polyphony', type=int, default=3, help='Notes per chord')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the note sequence')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Pipeline runs (median is reported)')
+    parser.add_argument('--output', help="Write results as JSON to this path ('-' for stdout)")
+    parser.add_argument('--baseline', help='Earlier JSON result to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed relative slowdown per stage before failing')
+    args = parser.parse_args()
+
+    reference = generate_notes(args.seconds, args.polyphony, seed=args.seed)
+
+    runs, totals = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        audio_path = write_wav(work_dir / 'synthetic.wav', render(reference))
+        worker = create_worker(audio_path, work_dir)
+
+        # Load the model once up front, as a long-running worker would have
+        model_stage = StageRecorder()
+        with model_stage.stage('model_load'):
+            worker.transcriber._get_model()
+
+        for _ in range(args.repeat):
+            measurements, elapsed, notes = run_pipeline(worker)
+            runs.append(measurements)
+            totals.append(elapsed)
+
+    stages = summarize(runs)
+    total = statistics.median(totals)
+    result = {
+        'benchmark': 'pipeline',
+        'created_at': datetime.utcnow().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'musescore': find_musescore() is not None,
+        },
+        'config': {
+            'seconds': args.seconds,
+            'polyphony': args.polyphony,
+            'seed': args.seed,
+            'sample_rate': SAMPLE_RATE,
+        },
+        'repeat': args.repeat,
+        'model_load_seconds': model_stage.as_dict()['model_load']['wall_seconds'],
+        'api_import': measure_api_import(),
+        'quality': {
+            'reference_notes': len(reference),
+            'transcribed_notes': len(notes),
+            'note_f1': round(note_f1(reference, notes), 4),
+        },
+        'stages': stages,
+        'total_seconds': round(total, 4),
+        'realtime_factor': round(args.seconds / total, 3) if total else None,
+    }
+
+    # Keep stdout clean for JSON when writing results there
+    report = sys.stderr if args.output == '-' else sys.stdout
+    print(f"{'stage':<12} {'wall s':>8} {'cpu s':>8} {'peak MB':>8}", file=report)
+    for name, stage in stages.items():
+        peak = stage['peak_rss_bytes']
+        note = ' (skipped)' if stage.get('skipped') else ''
+        print(f"{name:<12} {stage['wall_seconds']:>8.3f} {stage['cpu_seconds']:>8.3f} "
+              f"{peak / 2 ** 20 if peak else 0:>8.0f}{note}", file=report)
+    print(f"{'total':<12} {total:>8.3f}   realtime factor {result['realtime_factor']}x, "
+          f"note F1 {result['quality']['note_f1']:.3f}", file=report)
+    print(f"API import {result['api_import']['seconds']:.3f}s", file=report)
+
+    if args.output == '-':
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+
+    if args.baseline:
+        regressions = compare(result, json.loads(Path(args.baseline).read_text()),
+                              args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}", file=report)
+
+
+if __name__ == '__main__':
+    main()
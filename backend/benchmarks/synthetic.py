@@ -0,0 +1,140 @@
+"""
+Synthetic piano recordings for offline benchmarks.
+
+Renders a seeded random note sequence with a simple additive piano-like
+tone, so benchmarks need no network access and know the notes they
+should get back.
+"""
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from app.services.note_store import NoteStore
+
+SAMPLE_RATE = 44100
+
+# Relative amplitude of each harmonic and how fast notes decay
+HARMONICS = np.array([1.0, 0.5, 0.3, 0.2, 0.12, 0.08])
+DECAY_RATE = 2.5  # 1/s
+ATTACK = 0.005  # s
+RELEASE = 0.03  # s
+
+PITCH_RANGE = (36, 96)  # C2 to C7
+
+
+def generate_notes(seconds: float, polyphony: int, seed: int = 0,
+                   beat: float = 0.5) -> NoteStore:
+    """
+    Generate a random chord sequence.
+
+    A chord of `polyphony` distinct pitches starts on every beat and lasts
+    between a half and two beats.
+
+    Args:
+        seconds: Length of the sequence
+        polyphony: Notes per chord
+        seed: Random seed
+        beat: Seconds between chord onsets
+
+    Returns:
+        NoteStore with the generated notes
+    """
+    rng = np.random.default_rng(seed)
+    onsets = np.arange(0.0, max(seconds - 2 * beat, beat), beat)
+    low, high = PITCH_RANGE
+
+    pitch = np.concatenate([rng.choice(np.arange(low, high), polyphony, replace=False)
+                            for _ in onsets])
+    onset = np.repeat(onsets, polyphony)
+    lengths = np.repeat(rng.uniform(0.5, 2.0, len(onsets)) * beat, polyphony)
+    velocity = rng.integers(60, 110, len(pitch))
+    return NoteStore(pitch, onset, onset + lengths, velocity)
+
+
+def render(notes: NoteStore, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Render notes to a mono waveform.
+
+    Args:
+        notes: Notes to render
+        sample_rate: Output sample rate
+
+    Returns:
+        Float32 samples in [-1, 1]
+    """
+    total = int((notes.duration + RELEASE) * sample_rate) + 1
+    audio = np.zeros(total, dtype=np.float64)
+
+    for pitch, onset, offset, velocity in zip(notes.pitch, notes.onset,
+                                              notes.offset, notes.velocity):
+        length = offset - onset
+        t = np.arange(int((length + RELEASE) * sample_rate)) / sample_rate
+        frequency = 440.0 * 2 ** ((int(pitch) - 69) / 12)
+
+        tone = sum(amplitude * np.sin(2 * np.pi * frequency * (k + 1) * t)
+                   for k, amplitude in enumerate(HARMONICS)
+                   if frequency * (k + 1) < sample_rate / 2)
+        envelope = np.exp(-DECAY_RATE * t) * np.minimum(t / ATTACK, 1.0)
+        envelope *= np.clip((length + RELEASE - t) / RELEASE, 0.0, 1.0)
+
+        start = int(onset * sample_rate)
+        audio[start:start + len(t)] += (velocity / 127) * tone * envelope
+
+    peak = np.abs(audio).max()
+    if peak > 0:
+        audio *= 0.9 / peak
+    return audio.astype(np.float32)
+
+
+def write_wav(path: Path, audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Path:
+    """
+    Write float samples as a 16-bit mono WAV file.
+
+    Args:
+        path: Output path
+        audio: Samples in [-1, 1]
+        sample_rate: Sample rate
+
+    Returns:
+        The output path
+    """
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return path
+
+
+def note_f1(reference: NoteStore, estimate: NoteStore, onset_tolerance: float = 0.05) -> float:
+    """
+    Onset-and-pitch F-measure of a transcription against known notes.
+
+    A reference note is matched by at most one estimated note with the same
+    pitch whose onset is within `onset_tolerance` seconds.
+
+    Args:
+        reference: Notes that were rendered
+        estimate: Notes that were transcribed
+        onset_tolerance: Maximum onset difference in seconds
+
+    Returns:
+        F1 score between 0 and 1
+    """
+    if not len(reference) or not len(estimate):
+        return 0.0
+
+    matched = 0
+    used = np.zeros(len(estimate), dtype=bool)
+    for pitch, onset in zip(reference.pitch, reference.onset):
+        candidates = np.flatnonzero(~used & (estimate.pitch == pitch)
+                                    & (np.abs(estimate.onset - onset) <= onset_tolerance))
+        if len(candidates):
+            used[candidates[np.argmin(np.abs(estimate.onset[candidates] - onset))]] = True
+            matched += 1
+
+    precision = matched / len(estimate)
+    recall = matched / len(reference)
+    return 0.0 if matched == 0 else 2 * precision * recall / (precision + recall)
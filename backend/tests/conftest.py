@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Settings create their directories on import; keep them out of the tree
+_TMP_DIR = Path(tempfile.mkdtemp(prefix='y2s-tests-'))
+os.environ.setdefault('UPLOAD_DIR', str(_TMP_DIR / 'uploads'))
+os.environ.setdefault('OUTPUT_DIR', str(_TMP_DIR / 'outputs'))
+os.environ.setdefault('ARTIFACT_CACHE_DIR', str(_TMP_DIR / 'artifact_cache'))
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def redis():
+    """In-memory Redis speaking the same protocol as the real server."""
+    fakeredis = pytest.importorskip('fakeredis')
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def job_manager(redis):
+    """JobManager on fake Redis."""
+    from app.services.job_manager import JobManager
+
+    manager = JobManager('redis://localhost:6379/0')
+    manager.redis = redis
+    return manager
+
+
+@pytest.fixture
+def routes(redis, monkeypatch):
+    """The API routes module with its job manager on fake Redis."""
+    from app.api import routes
+
+    monkeypatch.setattr(routes.job_manager, 'redis', redis)
+    return routes
+
+
+@pytest.fixture
+def client(routes):
+    """Test client for the API; startup tasks (lifecycle, preload) do not run."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def job_outputs():
+    """Create an output directory for a fresh job ID."""
+    import uuid
+    from app.core.config import settings
+
+    def create(**files):
+        job_id = str(uuid.uuid4())
+        output_dir = Path(settings.OUTPUT_DIR) / job_id
+        output_dir.mkdir(parents=True)
+        for filename, content in files.items():
+            (output_dir / filename).write_bytes(content)
+        return job_id, output_dir
+
+    return create
@@ -0,0 +1,74 @@
+import hashlib
+import json
+
+from app.services.artifacts import (
+    MANIFEST_FILENAME,
+    compute_etag,
+    get_artifact_etag,
+    is_provisional,
+    register_artifacts,
+    set_provisional,
+)
+
+
+def test_compute_etag_is_quoted_content_hash(tmp_path):
+    path = tmp_path / 'file'
+    path.write_bytes(b'notes')
+
+    assert compute_etag(path) == f'"{hashlib.sha256(b"notes").hexdigest()[:32]}"'
+
+
+def test_register_artifacts_records_existing_files(tmp_path):
+    (tmp_path / 'transcription_processed.mid').write_bytes(b'MThd')
+    (tmp_path / 'transcription.pdf').write_bytes(b'%PDF-1.4')
+
+    manifest = register_artifacts(tmp_path)
+
+    assert set(manifest) == {'midi', 'pdf'}
+    assert manifest['pdf'] == {'etag': compute_etag(tmp_path / 'transcription.pdf'), 'size': 8}
+    assert json.loads((tmp_path / MANIFEST_FILENAME).read_text()) == manifest
+    assert sorted(p.name for p in tmp_path.iterdir()) == \
+        sorted([MANIFEST_FILENAME, 'transcription.pdf', 'transcription_processed.mid'])
+
+
+def test_register_artifacts_updates_named_entries_only(tmp_path):
+    midi = tmp_path / 'transcription_processed.mid'
+    midi.write_bytes(b'one')
+    (tmp_path / 'transcription.pdf').write_bytes(b'%PDF')
+    first = register_artifacts(tmp_path)
+    midi.write_bytes(b'two')
+
+    second = register_artifacts(tmp_path, ['midi'])
+
+    assert second['midi']['etag'] != first['midi']['etag']
+    assert second['pdf'] == first['pdf']
+
+
+def test_get_artifact_etag_registers_on_first_access(tmp_path):
+    (tmp_path / 'transcription.musicxml').write_bytes(b'<score/>')
+
+    etag = get_artifact_etag(tmp_path, 'musicxml')
+
+    assert etag == compute_etag(tmp_path / 'transcription.musicxml')
+    manifest = json.loads((tmp_path / MANIFEST_FILENAME).read_text())
+    assert manifest['musicxml']['etag'] == etag
+
+
+def test_get_artifact_etag_trusts_manifest(tmp_path):
+    path = tmp_path / 'transcription.musicxml'
+    path.write_bytes(b'<score/>')
+    etag = get_artifact_etag(tmp_path, 'musicxml')
+    path.write_bytes(b'<changed/>')  # outputs are immutable once registered
+
+    assert get_artifact_etag(tmp_path, 'musicxml') == etag
+
+
+def test_provisional_marker(tmp_path):
+    assert not is_provisional(tmp_path)
+
+    set_provisional(tmp_path, True)
+    assert is_provisional(tmp_path)
+
+    set_provisional(tmp_path, False)
+    set_provisional(tmp_path, False)
+    assert not is_provisional(tmp_path)
@@ -0,0 +1,214 @@
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.audio_processor import AudioProcessor
+from app.services.scheduler import FairScheduler
+
+VIDEO_URL = 'https://www.youtube.com/watch?v={}'
+PLAYLIST_URL = 'https://www.youtube.com/playlist?list=PL123'
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, tenant, func, *args):
+        self.tasks.append((tenant, func, args))
+
+
+@pytest.fixture
+def recorder(routes, monkeypatch):
+    recorder = RecordingScheduler()
+    monkeypatch.setattr(routes, 'scheduler', recorder)
+    return recorder
+
+
+@pytest.fixture
+def playlist(routes, monkeypatch):
+    """Serve a playlist of `count` videos from the playlist expansion."""
+    requested = []
+
+    def serve(count):
+        def expand_playlist(url, limit):
+            requested.append(limit)
+            return [{'url': VIDEO_URL.format(i), 'title': f'Video {i}'}
+                    for i in range(min(count, limit))]
+
+        monkeypatch.setattr(routes.audio_processor, 'expand_playlist', expand_playlist)
+        return requested
+
+    return serve
+
+
+def test_batch_of_urls_queues_every_video(client, routes, recorder):
+    urls = [VIDEO_URL.format(i) for i in range(3)]
+
+    response = client.post('/api/v1/transcribe/batch',
+                           json={'youtube_urls': urls, 'isolate_piano': True})
+
+    assert response.status_code == 200
+    batch = response.json()
+    assert (batch['total'], batch['status'], batch['counts']) == (3, 'pending', {'pending': 3})
+    job_ids = [job['job_id'] for job in batch['jobs']]
+    assert [args for _, _, args in recorder.tasks] == \
+        [(job_id, url, True) for job_id, url in zip(job_ids, urls)]
+
+    routes.job_manager.update_status(job_ids[0], 'completed', progress=100)
+    status = client.get(f"/api/v1/batch/{batch['batch_id']}").json()
+    assert (status['status'], status['progress']) == ('processing', 33)
+    assert status['counts'] == {'completed': 1, 'pending': 2}
+
+
+def test_missing_batch(client, routes):
+    assert client.get('/api/v1/batch/missing').status_code == 404
+
+
+def test_batch_needs_exactly_one_source(client, routes, recorder):
+    both = {'youtube_urls': [VIDEO_URL.format(0)], 'playlist_url': PLAYLIST_URL}
+
+    assert client.post('/api/v1/transcribe/batch', json=both).status_code == 422
+    assert client.post('/api/v1/transcribe/batch', json={}).status_code == 422
+    assert recorder.tasks == []
+
+
+def test_batch_of_urls_over_limit(client, routes, recorder, monkeypatch):
+    monkeypatch.setattr(routes.settings, 'MAX_BATCH_SIZE', 2)
+    urls = [VIDEO_URL.format(i) for i in range(3)]
+
+    response = client.post('/api/v1/transcribe/batch', json={'youtube_urls': urls})
+
+    assert response.status_code == 400
+    assert recorder.tasks == []
+
+
+def test_playlist_is_expanded(client, routes, recorder, playlist, monkeypatch):
+    monkeypatch.setattr(routes.settings, 'MAX_BATCH_SIZE', 3)
+    requested = playlist(3)
+
+    response = client.post('/api/v1/transcribe/batch', json={'playlist_url': PLAYLIST_URL})
+
+    assert response.status_code == 200
+    assert response.json()['source_url'] == PLAYLIST_URL
+    assert [args[1] for _, _, args in recorder.tasks] == [VIDEO_URL.format(i) for i in range(3)]
+    assert requested == [4]
+
+
+def test_playlist_over_limit_is_rejected_not_truncated(client, routes, recorder, playlist,
+                                                       monkeypatch):
+    monkeypatch.setattr(routes.settings, 'MAX_BATCH_SIZE', 3)
+    playlist(10)
+
+    response = client.post('/api/v1/transcribe/batch', json={'playlist_url': PLAYLIST_URL})
+
+    assert response.status_code == 400
+    assert 'limited to 3 videos' in response.json()['detail']
+    assert recorder.tasks == []
+
+
+def test_empty_or_broken_playlist(client, routes, recorder, playlist, monkeypatch):
+    playlist(0)
+    assert client.post('/api/v1/transcribe/batch',
+                       json={'playlist_url': PLAYLIST_URL}).status_code == 400
+
+    def expand_playlist(url, limit):
+        raise RuntimeError('This playlist is private')
+
+    monkeypatch.setattr(routes.audio_processor, 'expand_playlist', expand_playlist)
+    response = client.post('/api/v1/transcribe/batch', json={'playlist_url': PLAYLIST_URL})
+    assert response.status_code == 400
+    assert 'private' in response.json()['detail']
+
+
+def client_at(app, host):
+    """Test client whose requests come from `host`."""
+    async def with_client(scope, receive, send):
+        await app(dict(scope, client=(host, 50000)), receive, send)
+
+    return TestClient(with_client)
+
+
+def test_batches_of_two_clients_are_interleaved(routes, monkeypatch):
+    from app.main import app
+
+    scheduler = FairScheduler(max_workers=1)
+    monkeypatch.setattr(routes, 'scheduler', scheduler)
+    gate, blocked = threading.Event(), threading.Event()
+    scheduler.submit('blocker', lambda: blocked.set() or gate.wait())
+    assert blocked.wait(5)
+
+    order = []
+    monkeypatch.setattr(routes, '_process_job', lambda job_id, url, *args: order.append(url))
+    for host, prefix in (('10.0.0.1', 'a'), ('10.0.0.2', 'b')):
+        urls = [VIDEO_URL.format(f'{prefix}{i}') for i in range(3)]
+        response = client_at(app, host).post('/api/v1/transcribe/batch',
+                                             json={'youtube_urls': urls})
+        assert response.status_code == 200
+
+    gate.set()
+    deadline = time.monotonic() + 5
+    while len(order) < 6:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    assert [url[-2:] for url in order] == ['a0', 'b0', 'a1', 'b1', 'a2', 'b2']
+
+
+class FakeYoutubeDL:
+    """Stand-in for yt_dlp.YoutubeDL returning a canned flat playlist."""
+
+    info = None
+    options = None
+
+    def __init__(self, options):
+        FakeYoutubeDL.options = options
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download):
+        assert download is False
+        return self.info
+
+
+@pytest.fixture
+def youtube_dl(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'yt_dlp', SimpleNamespace(YoutubeDL=FakeYoutubeDL))
+    return FakeYoutubeDL
+
+
+def test_expand_playlist_flat_entries(youtube_dl, tmp_path):
+    youtube_dl.info = {'entries': [
+        {'ie_key': 'Youtube', 'id': 'abc', 'url': 'abc', 'title': 'First'},
+        None,  # unavailable video
+        {'webpage_url': 'https://www.youtube.com/watch?v=def', 'title': 'Second'},
+        {'ie_key': 'Youtube', 'id': 'ghi'},
+    ]}
+
+    videos = AudioProcessor(str(tmp_path)).expand_playlist(PLAYLIST_URL, limit=5)
+
+    assert videos == [
+        {'url': VIDEO_URL.format('abc'), 'title': 'First'},
+        {'url': VIDEO_URL.format('def'), 'title': 'Second'},
+        {'url': VIDEO_URL.format('ghi'), 'title': 'Unknown'},
+    ]
+    assert youtube_dl.options['playlistend'] == 5
+    assert youtube_dl.options['extract_flat'] == 'in_playlist'
+
+
+def test_expand_playlist_single_video_and_limit(youtube_dl, tmp_path):
+    processor = AudioProcessor(str(tmp_path))
+
+    youtube_dl.info = {'webpage_url': VIDEO_URL.format('one'), 'title': 'Only'}
+    assert processor.expand_playlist(VIDEO_URL.format('one'), limit=5) == \
+        [{'url': VIDEO_URL.format('one'), 'title': 'Only'}]
+
+    youtube_dl.info = {'entries': [{'ie_key': 'Youtube', 'id': str(i)} for i in range(5)]}
+    assert len(processor.expand_playlist(PLAYLIST_URL, limit=2)) == 2
@@ -0,0 +1,94 @@
+import wave
+
+import numpy as np
+import pytest
+
+from app.services.note_store import NoteStore
+from benchmarks.bench_import import check_import
+from benchmarks.synthetic import PITCH_RANGE, generate_notes, note_f1, render, write_wav
+
+
+def test_generate_notes_is_seeded_chords():
+    notes = generate_notes(10.0, polyphony=3, seed=1)
+
+    assert len(notes) % 3 == 0
+    onsets, counts = np.unique(notes.onset, return_counts=True)
+    assert (counts == 3).all()
+    np.testing.assert_allclose(np.diff(onsets), 0.5)
+    for onset in onsets:  # distinct pitches per chord
+        assert len(set(notes.pitch[notes.onset == onset])) == 3
+    assert PITCH_RANGE[0] <= notes.pitch.min() and notes.pitch.max() < PITCH_RANGE[1]
+    assert generate_notes(10.0, 3, seed=1).pitch.tolist() == notes.pitch.tolist()
+    assert generate_notes(10.0, 3, seed=2).pitch.tolist() != notes.pitch.tolist()
+
+
+def test_render_and_write_wav(tmp_path):
+    notes = NoteStore([69], [0.1], [0.6], [100])
+
+    audio = render(notes, sample_rate=8000)
+    path = write_wav(tmp_path / 'a.wav', audio, sample_rate=8000)
+
+    assert audio.dtype == np.float32
+    assert np.abs(audio).max() == pytest.approx(0.9)
+    assert not audio[:int(0.1 * 8000)].any()  # silent before the onset
+    with wave.open(str(path)) as wav:
+        assert (wav.getnchannels(), wav.getframerate(), wav.getnframes()) == (1, 8000, len(audio))
+
+
+def test_note_f1():
+    reference = NoteStore([60, 64, 67, 72], [0.0, 0.5, 1.0, 1.5], [0.4] * 4, [80] * 4)
+
+    assert note_f1(reference, reference) == 1.0
+    # Onsets within the tolerance still match, other pitches never do
+    jittered = NoteStore(reference.pitch, reference.onset + 0.04, reference.offset, reference.velocity)
+    assert note_f1(reference, jittered) == 1.0
+    late = NoteStore(reference.pitch, reference.onset + 0.06, reference.offset, reference.velocity)
+    assert note_f1(reference, late) == 0.0
+    half = reference.select(np.array([True, True, False, False]))
+    assert note_f1(reference, half) == pytest.approx(2 / 3)
+    assert note_f1(reference, NoteStore.empty()) == 0.0
+
+
+def test_note_f1_matches_each_note_once():
+    reference = NoteStore([60], [0.0], [0.5], [80])
+    doubled = NoteStore([60, 60], [0.0, 0.01], [0.5, 0.5], [80, 80])
+
+    assert note_f1(reference, doubled) == pytest.approx(2 / 3)
+
+
+def test_check_import():
+    current = {'seconds': 1.3, 'heavy_modules': []}
+
+    assert check_import(current, {'seconds': 1.2}) == []
+    assert len(check_import(current, {'seconds': 1.0})) == 1
+    assert check_import(current, max_seconds=1.0) == ['api_import: 1.300s > 1.000s limit']
+    assert check_import({'seconds': 0.1, 'heavy_modules': ['librosa']}) == \
+        ['api_import loads librosa']
+
+
+def test_compare_flags_stage_total_and_quality_regressions():
+    pytest.importorskip('librosa')
+    pytest.importorskip('basic_pitch')
+    from benchmarks.bench_pipeline import compare
+
+    api_import = {'seconds': 1.0, 'heavy_modules': []}
+    baseline = {
+        'config': {'seconds': 60},
+        'stages': {'transcribe': {'wall_seconds': 10.0}, 'pdf': {'wall_seconds': 1.0}},
+        'total_seconds': 12.0,
+        'quality': {'note_f1': 0.8},
+        'api_import': api_import,
+    }
+    result = {
+        'config': {'seconds': 60},
+        'stages': {'transcribe': {'wall_seconds': 14.0},
+                   'pdf': {'wall_seconds': 9.0, 'skipped': True}},
+        'total_seconds': 16.0,
+        'quality': {'note_f1': 0.7},
+        'api_import': api_import,
+    }
+
+    regressions = compare(result, baseline, threshold=0.25)
+
+    assert [r.split(':')[0] for r in regressions] == ['transcribe', 'total', 'note_f1']
+    assert compare(baseline, baseline, threshold=0.25) == []
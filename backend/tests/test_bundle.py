@@ -0,0 +1,72 @@
+import io
+import json
+import zipfile
+
+from app.services.artifacts import iter_bundle, list_bundle_files
+from app.services.piano_roll import PIANO_ROLL_FILENAME, PianoRoll
+
+MIDI = b'MThd' + bytes(200_000)
+PDF = b'%PDF' + bytes(range(256)) * 400
+
+
+def test_list_bundle_files_compression(tmp_path):
+    (tmp_path / 'transcription_processed.mid').write_bytes(MIDI)
+    (tmp_path / 'transcription.pdf').write_bytes(PDF)
+    (tmp_path / 'transcription.mxl').write_bytes(b'PK')  # not bundled
+
+    files = list_bundle_files(tmp_path)
+
+    assert [(name, compress) for name, _, compress in files] == [
+        ('transcription_processed.mid', zipfile.ZIP_DEFLATED),
+        ('transcription.pdf', zipfile.ZIP_STORED),
+    ]
+
+
+def test_iter_bundle_streams_files_and_generated_entries(tmp_path):
+    (tmp_path / 'transcription_processed.mid').write_bytes(MIDI)
+    generated = [b'{"a": ', b'1}']
+
+    chunks = list(iter_bundle(list_bundle_files(tmp_path), {'extra.json': iter(generated)}))
+
+    assert len(chunks) > 1
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as bundle:
+        assert bundle.testzip() is None
+        assert bundle.read('transcription_processed.mid') == MIDI
+        assert json.loads(bundle.read('extra.json')) == {'a': 1}
+
+
+def test_bundle_download(client, job_outputs):
+    roll = PianoRoll([60, 64], [0.0, 1.0], [0.5, 2.0], [80, 90])
+    job_id, output_dir = job_outputs(**{
+        'transcription_processed.mid': MIDI,
+        'transcription.musicxml': b'<score-partwise/>',
+        'transcription.pdf': PDF,
+    })
+    roll.save(output_dir / PIANO_ROLL_FILENAME)
+
+    response = client.get(f'/api/v1/download/{job_id}/bundle')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/zip'
+    assert f'transcription_{job_id}.zip' in response.headers['content-disposition']
+    with zipfile.ZipFile(io.BytesIO(response.content)) as bundle:
+        assert bundle.namelist() == ['transcription_processed.mid', 'transcription.musicxml',
+                                     'transcription.pdf', 'piano_roll.json']
+        assert bundle.read('transcription.pdf') == PDF
+        assert bundle.getinfo('transcription.pdf').compress_type == zipfile.ZIP_STORED
+        assert json.loads(bundle.read('piano_roll.json')) == roll.query()
+
+
+def test_bundle_without_piano_roll(client, job_outputs):
+    job_id, _ = job_outputs(**{'transcription_processed.mid': MIDI})
+
+    response = client.get(f'/api/v1/download/{job_id}/bundle')
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as bundle:
+        assert bundle.namelist() == ['transcription_processed.mid']
+
+
+def test_bundle_without_artifacts_is_404(client, job_outputs):
+    job_id, _ = job_outputs()
+
+    assert client.get(f'/api/v1/download/{job_id}/bundle').status_code == 404
@@ -0,0 +1,125 @@
+import pytest
+
+from app.services.artifacts import PROVISIONAL_FILENAME, compute_etag
+
+CONTENT = bytes(range(256)) * 4  # 1 KiB
+
+
+@pytest.fixture
+def midi_job(job_outputs):
+    job_id, output_dir = job_outputs(**{'transcription_processed.mid': CONTENT})
+    return job_id, output_dir, f'/api/v1/download/{job_id}/midi'
+
+
+def test_full_download_with_etag(client, midi_job):
+    _, output_dir, url = midi_job
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers['etag'] == compute_etag(output_dir / 'transcription_processed.mid')
+    assert response.headers['accept-ranges'] == 'bytes'
+    assert 'immutable' in response.headers['cache-control']
+
+
+def test_missing_artifact_is_404(client, midi_job):
+    job_id, _, _ = midi_job
+
+    assert client.get(f'/api/v1/download/{job_id}/pdf').status_code == 404
+
+
+@pytest.mark.parametrize('if_none_match', ['{etag}', 'W/{etag}', '"other", {etag}', '*'])
+def test_if_none_match_returns_304(client, midi_job, if_none_match):
+    _, _, url = midi_job
+    etag = client.get(url).headers['etag']
+
+    response = client.get(url, headers={'If-None-Match': if_none_match.format(etag=etag)})
+
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+
+
+def test_stale_if_none_match_returns_file(client, midi_job):
+    _, _, url = midi_job
+
+    response = client.get(url, headers={'If-None-Match': '"stale"'})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+@pytest.mark.parametrize('header,start,end', [
+    ('bytes=0-99', 0, 99),
+    ('bytes=1000-', 1000, 1023),
+    ('bytes=-24', 1000, 1023),
+    ('bytes=1000-5000', 1000, 1023),
+])
+def test_range_returns_206(client, midi_job, header, start, end):
+    _, _, url = midi_job
+
+    response = client.get(url, headers={'Range': header})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers['content-range'] == f'bytes {start}-{end}/1024'
+    assert response.headers['content-length'] == str(end - start + 1)
+
+
+@pytest.mark.parametrize('header', ['bytes=1024-', 'bytes=50-10'])
+def test_unsatisfiable_range_returns_416(client, midi_job, header):
+    _, _, url = midi_job
+
+    response = client.get(url, headers={'Range': header})
+
+    assert response.status_code == 416
+    assert response.headers['content-range'] == 'bytes */1024'
+
+
+@pytest.mark.parametrize('header', ['bytes=0-9,20-29', 'lines=0-9', 'bytes=a-b'])
+def test_unsupported_range_returns_full_file(client, midi_job, header):
+    _, _, url = midi_job
+
+    response = client.get(url, headers={'Range': header})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_if_range_with_current_etag_returns_206(client, midi_job):
+    _, _, url = midi_job
+    etag = client.get(url).headers['etag']
+
+    response = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': etag})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+
+
+def test_if_range_with_old_etag_returns_full_file(client, midi_job):
+    _, _, url = midi_job
+
+    response = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"old"'})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_provisional_outputs_are_not_cached(client, midi_job):
+    _, output_dir, url = midi_job
+    (output_dir / PROVISIONAL_FILENAME).touch()
+
+    response = client.get(url)
+
+    assert response.headers['cache-control'] == 'no-cache'
+
+
+def test_mxl_download(client, job_outputs):
+    job_id, _ = job_outputs(**{'transcription.mxl': b'PK\x03\x04'})
+
+    response = client.get(f'/api/v1/download/{job_id}/mxl')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/vnd.recordare.musicxml'
+    assert f'transcription_{job_id}.mxl' in response.headers['content-disposition']
@@ -0,0 +1,45 @@
+import pytest
+
+from app.services.files import atomic_write
+
+
+def test_atomic_write_replaces_file(tmp_path):
+    path = tmp_path / 'out.txt'
+    path.write_text('old')
+
+    with atomic_write(path) as tmp:
+        with open(tmp, 'w') as f:
+            f.write('new')
+        assert path.read_text() == 'old'
+
+    assert path.read_text() == 'new'
+    assert [p.name for p in tmp_path.iterdir()] == ['out.txt']
+
+
+def test_atomic_write_failure_keeps_old_file(tmp_path):
+    path = tmp_path / 'out.txt'
+    path.write_text('old')
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as tmp:
+            with open(tmp, 'w') as f:
+                f.write('partial')
+            raise RuntimeError('disk full')
+
+    assert path.read_text() == 'old'
+    assert [p.name for p in tmp_path.iterdir()] == ['out.txt']
+
+
+def test_concurrent_writers_use_separate_temp_files(tmp_path):
+    path = tmp_path / 'out.txt'
+
+    with atomic_write(path) as first, atomic_write(path) as second:
+        assert first != second
+        with open(first, 'w') as f:
+            f.write('first')
+        with open(second, 'w') as f:
+            f.write('second')
+
+    # The writer that finishes last wins with its complete file
+    assert path.read_text() == 'first'
+    assert [p.name for p in tmp_path.iterdir()] == ['out.txt']
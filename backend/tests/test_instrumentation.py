@@ -0,0 +1,143 @@
+import time
+
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.instrumentation import StageRecorder, _current_rss, record_cache, record_job
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stage_records_summary_and_histograms():
+    recorder = StageRecorder()
+    before = sample('y2s_stage_duration_seconds_count', stage='test-sleep')
+
+    with recorder.stage('test-sleep'):
+        time.sleep(0.05)
+
+    entry = recorder.as_dict()['test-sleep']
+    assert entry['wall_seconds'] >= 0.05
+    assert entry['cpu_seconds'] < entry['wall_seconds']
+    assert sample('y2s_stage_duration_seconds_count', stage='test-sleep') == before + 1
+    assert recorder.elapsed >= entry['wall_seconds']
+
+
+def test_stage_measures_cpu_and_peak_memory():
+    recorder = StageRecorder()
+    baseline = _current_rss()
+
+    with recorder.stage('test-busy'):
+        buffer = np.ones(64 * 1024 * 1024 // 8)  # 64 MiB resident
+        deadline = time.process_time() + 0.1
+        while time.process_time() < deadline:
+            pass
+        del buffer
+
+    entry = recorder.as_dict()['test-busy']
+    assert entry['cpu_seconds'] >= 0.09
+    if baseline is not None:  # needs /proc
+        assert entry['peak_rss_bytes'] >= baseline + 48 * 1024 * 1024
+
+
+def test_stage_is_recorded_when_it_fails():
+    recorder = StageRecorder()
+
+    with pytest.raises(RuntimeError):
+        with recorder.stage('test-fail'):
+            raise RuntimeError('boom')
+
+    assert 'test-fail' in recorder.as_dict()
+
+
+def test_stage_notifies_profiler():
+    class Profiler:
+        def __init__(self):
+            self.events = []
+
+        def begin_stage(self, name):
+            self.events.append(('begin', name))
+
+        def end_stage(self, name):
+            self.events.append(('end', name))
+
+    profiler = Profiler()
+    recorder = StageRecorder(profiler)
+
+    with recorder.stage('download'):
+        pass
+    with recorder.stage('transcribe'):
+        pass
+
+    assert profiler.events == [('begin', 'download'), ('end', 'download'),
+                               ('begin', 'transcribe'), ('end', 'transcribe')]
+
+
+def test_as_dict_is_a_copy():
+    recorder = StageRecorder()
+    with recorder.stage('copy'):
+        pass
+
+    recorder.as_dict()['copy']['wall_seconds'] = -1
+
+    assert recorder.as_dict()['copy']['wall_seconds'] >= 0
+
+
+def test_record_job_throughput():
+    jobs = sample('y2s_jobs_total', status='completed')
+    audio = sample('y2s_audio_seconds_total')
+    factors = sample('y2s_job_realtime_factor_count')
+
+    record_job('completed', audio_seconds=120.0, elapsed=60.0)
+
+    assert sample('y2s_jobs_total', status='completed') == jobs + 1
+    assert sample('y2s_audio_seconds_total') == audio + 120.0
+    assert sample('y2s_job_realtime_factor_count') == factors + 1
+
+
+def test_record_failed_job_counts_only_the_job():
+    failed = sample('y2s_jobs_total', status='failed')
+    audio = sample('y2s_audio_seconds_total')
+
+    record_job('failed', audio_seconds=120.0, elapsed=60.0)
+
+    assert sample('y2s_jobs_total', status='failed') == failed + 1
+    assert sample('y2s_audio_seconds_total') == audio
+
+
+def test_record_cache():
+    hits = sample('y2s_cache_requests_total', cache='test', result='hit')
+    misses = sample('y2s_cache_requests_total', cache='test', result='miss')
+
+    record_cache('test', hit=True)
+    record_cache('test', hit=False)
+    record_cache('test', hit=False)
+
+    assert sample('y2s_cache_requests_total', cache='test', result='hit') == hits + 1
+    assert sample('y2s_cache_requests_total', cache='test', result='miss') == misses + 2
+
+
+def test_metrics_route(client):
+    with StageRecorder().stage('test-route'):
+        pass
+
+    response = client.get('/api/v1/metrics')
+
+    assert response.status_code == 200
+    assert 'y2s_stage_duration_seconds_count{stage="test-route"}' in response.text
+    assert 'y2s_queue_depth' in response.text
+
+
+def test_nested_and_repeated_stages():
+    stages = StageRecorder()
+
+    with stages.stage('outer'):
+        for _ in range(3):
+            with stages.stage('inner'):
+                time.sleep(0.01)
+
+    recorded = stages.as_dict()
+    assert recorded['inner']['wall_seconds'] >= 0.03
+    assert recorded['outer']['wall_seconds'] >= recorded['inner']['wall_seconds']
@@ -0,0 +1,292 @@
+import time
+
+from app.models.schemas import TranscriptionMode, TranscriptionStatus
+from app.services.job_manager import ACTIVE_INDEX, CREATED_INDEX, JOB_TTL, STATUS_INDEX
+
+URL = 'https://www.youtube.com/watch?v={}'
+
+
+def status_index(redis, status):
+    return redis.zrange(STATUS_INDEX.format(status=status.value), 0, -1)
+
+
+def test_create_job_indexes_job(job_manager, redis):
+    job_id = job_manager.create_job(URL.format('a'), tenant='t', mode=TranscriptionMode.PREVIEW)
+
+    result = job_manager.get_result(job_id)
+    assert result.status == TranscriptionStatus.PENDING
+    assert result.mode == TranscriptionMode.PREVIEW
+    assert 0 < redis.ttl(f'job:{job_id}') <= JOB_TTL
+    assert redis.zrange(CREATED_INDEX, 0, -1) == [job_id]
+    assert redis.zrange(ACTIVE_INDEX, 0, -1) == [job_id]
+    assert status_index(redis, TranscriptionStatus.PENDING) == [job_id]
+
+
+def test_status_changes_move_job_between_indexes(job_manager, redis):
+    job_id = job_manager.create_job(URL.format('a'))
+
+    job_manager.update_status(job_id, TranscriptionStatus.TRANSCRIBING, progress=50)
+    assert status_index(redis, TranscriptionStatus.PENDING) == []
+    assert status_index(redis, TranscriptionStatus.TRANSCRIBING) == [job_id]
+    assert redis.zrange(ACTIVE_INDEX, 0, -1) == [job_id]
+
+    job_manager.update_status(job_id, TranscriptionStatus.COMPLETED, progress=100)
+    assert status_index(redis, TranscriptionStatus.COMPLETED) == [job_id]
+    assert redis.zrange(ACTIVE_INDEX, 0, -1) == []
+    assert job_manager.get_result(job_id).completed_at is not None
+
+    # A completed preview running again becomes active again
+    job_manager.update_job(job_id, status=TranscriptionStatus.PENDING)
+    assert redis.zrange(ACTIVE_INDEX, 0, -1) == [job_id]
+    assert status_index(redis, TranscriptionStatus.COMPLETED) == []
+
+
+def test_update_without_status_change_keeps_indexes(job_manager, redis):
+    job_id = job_manager.create_job(URL.format('a'))
+
+    job_manager.update_job(job_id, progress=10)
+
+    assert job_manager.get_result(job_id).progress == 10
+    assert status_index(redis, TranscriptionStatus.PENDING) == [job_id]
+
+
+def test_set_error(job_manager, redis):
+    job_id = job_manager.create_job(URL.format('a'))
+
+    job_manager.set_error(job_id, 'boom')
+
+    result = job_manager.get_result(job_id)
+    assert (result.status, result.error) == (TranscriptionStatus.FAILED, 'boom')
+    assert redis.zrange(ACTIVE_INDEX, 0, -1) == []
+
+
+def test_update_missing_job_is_ignored(job_manager):
+    job_manager.update_job('missing', progress=10)
+
+    assert job_manager.get_result('missing') is None
+
+
+def test_update_reapplies_after_concurrent_change(job_manager, redis, monkeypatch):
+    job_id = job_manager.create_job(URL.format('a'))
+    create_pipeline = redis.pipeline
+    raced = []
+
+    def pipeline(*args, **kwargs):
+        pipe = create_pipeline(*args, **kwargs)
+        get = pipe.get
+
+        def get_then_race(key):
+            value = get(key)
+            if not raced:
+                # The API fails the job while the worker publishes progress
+                raced.append(True)
+                job_manager.set_error(job_id, 'cancelled')
+            return value
+
+        pipe.get = get_then_race
+        return pipe
+
+    monkeypatch.setattr(redis, 'pipeline', pipeline)
+
+    job_manager.update_job(job_id, transcribed_seconds=20.0)
+
+    # Neither write is lost and the indexes follow the final record
+    result = job_manager.get_result(job_id)
+    assert (result.status, result.error, result.transcribed_seconds) == \
+        (TranscriptionStatus.FAILED, 'cancelled', 20.0)
+    assert status_index(redis, TranscriptionStatus.FAILED) == [job_id]
+    assert status_index(redis, TranscriptionStatus.PENDING) == []
+    assert redis.zrange(ACTIVE_INDEX, 0, -1) == []
+
+
+def test_get_results_keeps_order_and_gaps(job_manager):
+    first = job_manager.create_job(URL.format('a'))
+    second = job_manager.create_job(URL.format('b'))
+
+    results = job_manager.get_results([second, 'missing', first])
+
+    assert [r.job_id if r else None for r in results] == [second, None, first]
+    assert job_manager.get_results([]) == []
+
+
+def test_list_jobs_newest_first_with_filters(job_manager):
+    job_ids = [job_manager.create_job(URL.format(i)) for i in range(5)]
+    job_manager.update_status(job_ids[1], TranscriptionStatus.COMPLETED)
+    job_manager.set_error(job_ids[3], 'boom')
+
+    total, page = job_manager.list_jobs(offset=1, limit=2)
+    assert total == 5
+    assert [r.job_id for r in page] == [job_ids[3], job_ids[2]]
+
+    total, active = job_manager.list_jobs('active')
+    assert total == 3
+    assert [r.job_id for r in active] == [job_ids[4], job_ids[2], job_ids[0]]
+
+    total, completed = job_manager.list_jobs('completed')
+    assert (total, [r.job_id for r in completed]) == (1, [job_ids[1]])
+
+
+def test_list_jobs_trims_expired_entries(job_manager, redis):
+    job_id = job_manager.create_job(URL.format('a'))
+    redis.zadd(CREATED_INDEX, {'expired': time.time() - JOB_TTL - 60})
+    redis.zadd(ACTIVE_INDEX, {'expired': time.time() - JOB_TTL - 60})
+
+    total, jobs = job_manager.list_jobs()
+
+    assert total == 1
+    assert [r.job_id for r in jobs] == [job_id]
+    assert redis.zrange(ACTIVE_INDEX, 0, -1) == [job_id]
+
+
+def test_list_jobs_skips_records_that_expired(job_manager, redis):
+    kept = job_manager.create_job(URL.format('a'))
+    gone = job_manager.create_job(URL.format('b'))
+    redis.delete(f'job:{gone}')
+
+    total, jobs = job_manager.list_jobs()
+
+    assert total == 2  # still in the index until its score ages out
+    assert [r.job_id for r in jobs] == [kept]
+
+
+def test_batch_status_aggregates_children(job_manager):
+    batch_id, job_ids = job_manager.create_batch([URL.format(i) for i in range(3)],
+                                                 tenant='t', source_url='playlist')
+    job_manager.update_status(job_ids[0], TranscriptionStatus.COMPLETED, progress=100)
+    job_manager.update_status(job_ids[1], TranscriptionStatus.TRANSCRIBING, progress=50)
+
+    status = job_manager.get_batch_status(batch_id)
+
+    assert status.status == TranscriptionStatus.PROCESSING
+    assert status.total == 3
+    assert status.progress == 50
+    assert status.counts == {'completed': 1, 'transcribing': 1, 'pending': 1}
+    assert status.source_url == 'playlist'
+    assert [job.result is not None for job in status.jobs] == [True, False, False]
+
+    job_manager.set_error(job_ids[1], 'boom')
+    job_manager.update_status(job_ids[2], TranscriptionStatus.COMPLETED, progress=100)
+    assert job_manager.get_batch_status(batch_id).status == TranscriptionStatus.COMPLETED
+    assert job_manager.get_batch_status('missing') is None
+
+
+
+def completed_preview(job_manager, isolate_piano=False):
+    job_id = job_manager.create_job(URL.format('p'), mode=TranscriptionMode.PREVIEW,
+                                    isolate_piano=isolate_piano)
+    job_manager.update_status(job_id, TranscriptionStatus.COMPLETED, progress=100)
+    return job_id
+
+
+def test_claim_upgrade_only_once(job_manager, redis):
+    job_id = completed_preview(job_manager)
+
+    assert job_manager.claim_upgrade(job_id)
+    assert not job_manager.claim_upgrade(job_id)
+
+    result = job_manager.get_result(job_id)
+    assert (result.mode, result.status, result.progress) == \
+        (TranscriptionMode.FULL, TranscriptionStatus.PENDING, 0)
+    assert status_index(redis, TranscriptionStatus.PENDING) == [job_id]
+    assert status_index(redis, TranscriptionStatus.COMPLETED) == []
+    assert redis.zrange(ACTIVE_INDEX, 0, -1) == [job_id]
+
+
+def test_claim_upgrade_requires_completed_preview(job_manager):
+    running = job_manager.create_job(URL.format('a'), mode=TranscriptionMode.PREVIEW)
+    full = job_manager.create_job(URL.format('b'))
+    job_manager.update_status(full, TranscriptionStatus.COMPLETED)
+
+    assert not job_manager.claim_upgrade(running)
+    assert not job_manager.claim_upgrade(full)
+    assert not job_manager.claim_upgrade('missing')
+    assert job_manager.get_result(running).mode == TranscriptionMode.PREVIEW
+
+
+def test_claim_upgrade_rechecks_after_concurrent_change(job_manager, redis, monkeypatch):
+    job_id = completed_preview(job_manager)
+    create_pipeline = redis.pipeline
+    raced = []
+
+    def pipeline(*args, **kwargs):
+        pipe = create_pipeline(*args, **kwargs)
+        get = pipe.get
+
+        def get_then_race(key):
+            value = get(key)
+            if not raced:
+                # Another API node claims the job between the check and the write
+                raced.append(True)
+                job_manager.update_job(job_id, status=TranscriptionStatus.PENDING)
+            return value
+
+        pipe.get = get_then_race
+        return pipe
+
+    monkeypatch.setattr(redis, 'pipeline', pipeline)
+
+    assert not job_manager.claim_upgrade(job_id)
+    assert job_manager.get_result(job_id).mode == TranscriptionMode.PREVIEW
+
+
+def test_upgrade_route_schedules_one_run(client, routes, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(routes.scheduler, 'submit', lambda *args: submitted.append(args))
+    job_id = completed_preview(routes.job_manager)
+
+    first = client.post(f'/api/v1/transcribe/{job_id}/upgrade')
+    second = client.post(f'/api/v1/transcribe/{job_id}/upgrade')
+
+    assert first.status_code == 200
+    assert (first.json()['status'], first.json()['mode']) == ('pending', 'full')
+    assert second.status_code == 409
+    assert [args[1:] for args in submitted] == [(routes._upgrade_job, job_id, False, False)]
+    assert client.post('/api/v1/transcribe/missing/upgrade').status_code == 404
+
+
+def test_upgrade_keeps_preview_isolate_piano(client, routes, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(routes.scheduler, 'submit', lambda *args: submitted.append(args))
+
+    response = client.post('/api/v1/transcribe', json={
+        'youtube_url': URL.format('p'), 'mode': 'preview', 'isolate_piano': True
+    })
+    preview = response.json()['job_id']
+    routes.job_manager.update_status(preview, TranscriptionStatus.COMPLETED, progress=100)
+    overridden = completed_preview(routes.job_manager, isolate_piano=True)
+
+    assert client.post(f'/api/v1/transcribe/{preview}/upgrade').status_code == 200
+    assert client.post(f'/api/v1/transcribe/{overridden}/upgrade',
+                       params={'isolate_piano': False}).status_code == 200
+
+    assert [args[1:] for args in submitted[1:]] == [
+        (routes._upgrade_job, preview, True, False),
+        (routes._upgrade_job, overridden, False, False),
+    ]
+
+def test_bulk_status_route(client, routes):
+    job_ids = [routes.job_manager.create_job(URL.format(i)) for i in range(3)]
+
+    response = client.post('/api/v1/status', json={'job_ids': [job_ids[2], 'missing', job_ids[0]]})
+
+    assert response.status_code == 200
+    assert [job['job_id'] for job in response.json()] == [job_ids[2], job_ids[0]]
+
+
+def test_bulk_status_route_limit(client, routes, monkeypatch):
+    monkeypatch.setattr(routes.settings, 'MAX_BULK_STATUS', 2)
+
+    response = client.post('/api/v1/status', json={'job_ids': ['a', 'b', 'c']})
+
+    assert response.status_code == 400
+
+
+def test_jobs_route(client, routes):
+    job_ids = [routes.job_manager.create_job(URL.format(i)) for i in range(3)]
+    routes.job_manager.update_status(job_ids[0], TranscriptionStatus.COMPLETED)
+
+    active = client.get('/api/v1/jobs', params={'status': 'active', 'limit': 1}).json()
+
+    assert (active['total'], active['limit']) == (2, 1)
+    assert [job['job_id'] for job in active['jobs']] == [job_ids[2]]
+    assert client.get('/api/v1/jobs', params={'status': 'bogus'}).status_code == 400
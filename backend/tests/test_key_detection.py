@@ -0,0 +1,159 @@
+import music21
+import numpy as np
+import pytest
+
+from app.services.key_detection import (
+    KeyEstimate,
+    estimate_key,
+    estimate_keys,
+    estimate_time_signature,
+)
+from app.services.note_store import NoteStore
+
+MAJOR_SCALE = [0, 2, 4, 5, 7, 9, 11]
+HARMONIC_MINOR_SCALE = [0, 2, 3, 5, 7, 8, 11]
+
+
+def scale(tonic, steps, repeats=4, start=0.0, note_length=0.5):
+    """Scale notes with the tonic and dominant held twice as long."""
+    pitch, onset, offset = [], [], []
+    time = start
+    for _ in range(repeats):
+        for step in steps + [0]:
+            length = note_length * (2 if step in (0, 7) else 1)
+            pitch.append(60 + tonic + step)
+            onset.append(time)
+            offset.append(time + length)
+            time += length
+    return pitch, onset, offset
+
+
+def beat_pattern(beats_per_bar, bars=16, beat=0.5):
+    """Loud downbeats with softer off-beats and a pickup eighth note."""
+    onset, velocity = [], []
+    for bar in range(bars):
+        for index in range(beats_per_bar):
+            time = (bar * beats_per_bar + index) * beat
+            onset.append(time)
+            velocity.append(120 if index == 0 else 40)
+        onset.append((bar + 1) * beats_per_bar * beat - beat / 2)
+        velocity.append(30)
+    return onset, velocity
+
+
+@pytest.mark.parametrize('tonic,steps,mode', [
+    (0, MAJOR_SCALE, 'major'),
+    (7, MAJOR_SCALE, 'major'),
+    (9, HARMONIC_MINOR_SCALE, 'minor'),
+    (2, HARMONIC_MINOR_SCALE, 'minor'),
+])
+def test_estimate_key_finds_scale(tonic, steps, mode):
+    key = estimate_key(*scale(tonic, steps))
+
+    assert (key.tonic, key.mode) == (tonic, mode)
+    assert key.correlation > 0.5
+
+
+def test_estimate_key_without_notes():
+    assert estimate_key([], [], []) is None
+
+
+@pytest.mark.parametrize('mode', ['major', 'minor'])
+@pytest.mark.parametrize('tonic', range(12))
+def test_tonic_name_agrees_with_key_signature(tonic, mode):
+    estimate = KeyEstimate(tonic, mode, 1.0)
+
+    key = music21.key.Key(estimate.tonic_name, mode)
+
+    assert key.sharps == estimate.fifths
+    assert key.tonic.pitchClass == tonic
+
+
+def test_tonic_six_is_spelled_as_flats():
+    estimate = KeyEstimate(6, 'major', 1.0)
+
+    assert estimate.fifths == -6
+    assert estimate.tonic_name == 'G-'
+
+
+def test_estimate_keys_detects_modulation():
+    first = scale(0, MAJOR_SCALE, repeats=8)
+    second = scale(2, MAJOR_SCALE, repeats=8, start=first[2][-1])
+    pitch, onset, offset = (a + b for a, b in zip(first, second))
+
+    regions = estimate_keys(pitch, onset, offset)
+
+    assert [(key.tonic, key.mode) for _, key in regions] == [(0, 'major'), (2, 'major')]
+    assert regions[0][0] == 0.0
+    assert abs(regions[1][0] - first[2][-1]) <= 8.0
+
+
+def test_estimate_keys_ignores_short_excursions():
+    # 16 s of G major is shorter than MIN_REGION_WINDOWS windows
+    first = scale(0, MAJOR_SCALE, repeats=8)
+    excursion = scale(7, MAJOR_SCALE, repeats=3, start=first[2][-1])
+    last = scale(0, MAJOR_SCALE, repeats=8, start=excursion[2][-1])
+    pitch, onset, offset = (a + b + c for a, b, c in zip(first, excursion, last))
+
+    regions = estimate_keys(pitch, onset, offset)
+
+    assert [(key.tonic, key.mode) for _, key in regions] == [(0, 'major')]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_estimate_keys_is_stable_on_random_notes_in_one_key(seed):
+    rng = np.random.default_rng(seed)
+    count = 3000
+    pitch = 60 + rng.choice(MAJOR_SCALE, count) + 12 * rng.integers(-1, 2, count)
+    onset = np.sort(rng.uniform(0, 600, count))
+    offset = onset + rng.uniform(0.1, 1.0, count)
+
+    regions = estimate_keys(pitch, onset, offset)
+
+    assert [key.fifths for _, key in regions] == [0]
+
+
+def test_estimate_keys_without_notes():
+    assert estimate_keys([], [], []) == []
+
+
+def test_estimate_time_signature_waltz():
+    onset, velocity = beat_pattern(3)
+
+    assert estimate_time_signature(onset, velocity) == (3, 4)
+
+
+def test_estimate_time_signature_common_time():
+    onset, velocity = beat_pattern(4)
+
+    assert estimate_time_signature(onset, velocity) == (4, 4)
+
+
+def test_estimate_time_signature_defaults_for_few_notes():
+    onset, velocity = beat_pattern(3, bars=3)
+
+    assert estimate_time_signature(onset, velocity) == (4, 4)
+
+
+def test_converter_writes_detected_meter_and_key_change(tmp_path):
+    from app.services.converter import MusicConverter
+
+    # Waltz rhythm over 32 bars of C major scales, then 32 bars of D major
+    onset, velocity = beat_pattern(3, bars=64)
+    half = len(onset) // 2
+    pitch = (scale(0, MAJOR_SCALE, repeats=half)[0][:half]
+             + scale(2, MAJOR_SCALE, repeats=half)[0][:len(onset) - half])
+    onset = np.array(onset)
+    notes = NoteStore(pitch, onset, onset + 0.25, velocity)
+    path = tmp_path / 'score.musicxml'
+
+    MusicConverter().notes_to_musicxml(notes, str(path), detect_modulations=True,
+                                       detect_meter=True)
+
+    part = music21.converter.parse(str(path)).parts[0]
+    measures = part.getElementsByClass('Measure')
+    assert measures[0].timeSignature.ratioString == '3/4'
+    signatures = [(m.number, ks.sharps) for m in measures
+                  for ks in m.getElementsByClass('KeySignature')]
+    assert signatures[0] == (1, 0)
+    assert signatures[-1][1] == 2
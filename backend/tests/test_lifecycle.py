@@ -0,0 +1,199 @@
+import os
+import time
+
+import pytest
+
+from app.models.schemas import TranscriptionMode, TranscriptionStatus
+from app.services.lifecycle import (
+    LifecycleManager,
+    directory_size,
+    metrics,
+    remove_intermediates,
+)
+
+HOUR = 3600
+
+
+def make_dir(root, name, size=1000, age=2 * HOUR):
+    path = root / name
+    path.mkdir(parents=True)
+    (path / 'data').write_bytes(b'x' * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def lifecycle(tmp_path, job_manager):
+    def create(quota_bytes=0, artifact_store=None):
+        return LifecycleManager(job_manager, str(tmp_path / 'uploads'), str(tmp_path / 'outputs'),
+                                quota_bytes=quota_bytes, interval=0, grace_period=HOUR,
+                                artifact_store=artifact_store)
+    return create
+
+
+def finished_job(job_manager, **fields):
+    job_id = job_manager.create_job('https://www.youtube.com/watch?v=x')
+    job_manager.update_status(job_id, TranscriptionStatus.COMPLETED, progress=100)
+    if fields:
+        job_manager.update_job(job_id, **fields)
+    return job_id
+
+
+def test_directory_size(tmp_path):
+    make_dir(tmp_path, 'a/b', size=300)
+    (tmp_path / 'a' / 'top').write_bytes(b'x' * 20)
+
+    assert directory_size(tmp_path) == 320
+    assert directory_size(tmp_path / 'missing') == 0
+
+
+def test_remove_intermediates_records_metrics(tmp_path):
+    make_dir(tmp_path, 'job', size=500)
+    before = metrics.snapshot()['reclaimed_bytes'].get('intermediates', 0)
+
+    assert remove_intermediates(str(tmp_path), 'job') == 500
+    assert remove_intermediates(str(tmp_path), 'job') == 0
+
+    assert not (tmp_path / 'job').exists()
+    assert metrics.snapshot()['reclaimed_bytes']['intermediates'] == before + 500
+
+
+def test_sweep_orphans(tmp_path, lifecycle, job_manager):
+    live = job_manager.create_job('https://www.youtube.com/watch?v=x')
+    make_dir(tmp_path / 'uploads', live)
+    make_dir(tmp_path / 'outputs', live)
+    make_dir(tmp_path / 'uploads', 'expired-job', size=700)
+    make_dir(tmp_path / 'outputs', 'expired-job', size=300)
+    make_dir(tmp_path / 'outputs', 'new-job', age=60)
+
+    assert lifecycle().sweep_orphans() == 1000
+
+    assert sorted(os.listdir(tmp_path / 'uploads')) == [live]
+    assert sorted(os.listdir(tmp_path / 'outputs')) == sorted([live, 'new-job'])
+
+
+def test_sweep_orphans_skips_directories_removed_while_listing(tmp_path, lifecycle, monkeypatch):
+    make_dir(tmp_path / 'outputs', 'expired-job')
+    manager = lifecycle()
+    listed = manager._job_dirs
+    monkeypatch.setattr(manager, '_job_dirs',
+                        lambda root: listed(root) + [root / 'removed-meanwhile'])
+
+    assert manager.sweep_orphans() == 1000
+
+
+def test_quota_disabled(tmp_path, lifecycle):
+    make_dir(tmp_path / 'outputs', 'job', size=10_000)
+
+    assert lifecycle(quota_bytes=0).enforce_quota() == 0
+
+
+def test_quota_evicts_least_recently_used_finished_jobs(tmp_path, lifecycle, job_manager):
+    oldest = finished_job(job_manager, midi_url='/midi')
+    running = job_manager.create_job('https://www.youtube.com/watch?v=y')
+    recent = finished_job(job_manager, midi_url='/midi')
+    make_dir(tmp_path / 'outputs', oldest, size=1000, age=3 * HOUR)
+    make_dir(tmp_path / 'uploads', oldest, size=500)
+    make_dir(tmp_path / 'outputs', running, size=1000, age=2 * HOUR)
+    make_dir(tmp_path / 'outputs', recent, size=1000, age=HOUR)
+
+    reclaimed = lifecycle(quota_bytes=2000).enforce_quota()
+
+    # The oldest job and its audio go; the running job is skipped even
+    # though it is older than the recent one, which is enough to fit
+    assert reclaimed == 1500
+    assert sorted(os.listdir(tmp_path / 'outputs')) == sorted([running, recent])
+    assert not (tmp_path / 'uploads' / oldest).exists()
+    assert job_manager.get_result(oldest).midi_url is None
+    assert job_manager.get_result(recent).midi_url == '/midi'
+
+
+def test_quota_with_remote_store_keeps_urls(tmp_path, lifecycle, job_manager):
+    class RemoteStore:
+        def local_dir(self, job_id):
+            return None
+
+    job_id = finished_job(job_manager, midi_url='/midi')
+    make_dir(tmp_path / 'outputs', job_id, size=1000)
+
+    assert lifecycle(quota_bytes=500, artifact_store=RemoteStore()).enforce_quota() == 1000
+
+    assert job_manager.get_result(job_id).midi_url == '/midi'
+
+
+def test_sweep_reports_both_reasons(tmp_path, lifecycle, job_manager):
+    make_dir(tmp_path / 'outputs', 'expired-job', size=100)
+    job_id = finished_job(job_manager)
+    make_dir(tmp_path / 'outputs', job_id, size=1000)
+
+    assert lifecycle(quota_bytes=500).sweep() == {'orphans': 100, 'quota': 1000}
+    assert metrics.snapshot()['last_sweep_at'] is not None
+
+
+def completed_preview(job_manager):
+    job_id = job_manager.create_job('https://www.youtube.com/watch?v=p',
+                                    mode=TranscriptionMode.PREVIEW)
+    job_manager.update_status(job_id, TranscriptionStatus.COMPLETED, progress=100)
+    return job_id
+
+
+def test_quota_counts_audio_without_local_outputs(tmp_path, lifecycle, job_manager):
+    # With a remote store finished jobs may only have audio left locally
+    old = finished_job(job_manager)
+    recent = finished_job(job_manager)
+    make_dir(tmp_path / 'uploads', old, size=1000, age=2 * HOUR)
+    make_dir(tmp_path / 'uploads', recent, size=1000, age=HOUR)
+
+    assert lifecycle(quota_bytes=1500).enforce_quota() == 1000
+
+    assert os.listdir(tmp_path / 'uploads') == [recent]
+
+
+def test_quota_ranks_jobs_by_most_recent_directory(tmp_path, lifecycle, job_manager):
+    downloaded = finished_job(job_manager)
+    untouched = finished_job(job_manager)
+    make_dir(tmp_path / 'uploads', downloaded, size=500, age=4 * HOUR)
+    make_dir(tmp_path / 'outputs', downloaded, size=500, age=HOUR)
+    make_dir(tmp_path / 'outputs', untouched, size=500, age=2 * HOUR)
+
+    assert lifecycle(quota_bytes=1000).enforce_quota() == 500
+
+    assert not (tmp_path / 'outputs' / untouched).exists()
+    assert (tmp_path / 'uploads' / downloaded).exists()
+
+
+def test_quota_keeps_preview_audio_when_possible(tmp_path, lifecycle, job_manager):
+    preview = completed_preview(job_manager)
+    full = finished_job(job_manager)
+    make_dir(tmp_path / 'outputs', preview, size=500, age=3 * HOUR)
+    make_dir(tmp_path / 'uploads', preview, size=1000, age=3 * HOUR)
+    make_dir(tmp_path / 'outputs', full, size=1000, age=2 * HOUR)
+
+    assert lifecycle(quota_bytes=1000).enforce_quota() == 1500
+
+    # The preview's outputs and the full job make enough room
+    assert os.listdir(tmp_path / 'uploads') == [preview]
+    assert os.listdir(tmp_path / 'outputs') == []
+
+
+def test_quota_evicts_preview_audio_as_last_resort(tmp_path, lifecycle, job_manager):
+    preview = completed_preview(job_manager)
+    full = finished_job(job_manager)
+    make_dir(tmp_path / 'uploads', preview, size=1000, age=3 * HOUR)
+    make_dir(tmp_path / 'outputs', full, size=1000, age=2 * HOUR)
+
+    assert lifecycle(quota_bytes=500).enforce_quota() == 2000
+
+    assert os.listdir(tmp_path / 'uploads') == []
+
+
+def test_storage_route_requires_admin(client, routes, monkeypatch):
+    monkeypatch.setattr(routes.settings, 'ADMIN_TOKEN', 'secret')
+
+    assert client.get('/api/v1/storage').status_code == 403
+    assert client.get('/api/v1/storage', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+
+    response = client.get('/api/v1/storage', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 200
+    assert set(response.json()['usage_bytes']) == {'uploads', 'outputs'}
@@ -0,0 +1,107 @@
+import stat
+import sys
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services import musescore
+from app.services.musescore import MuseScoreBatchRenderer, find_musescore
+
+# Stands in for the MuseScore CLI: logs its arguments, answers --version
+# and writes every output listed in a -j batch job file
+FAKE_MSCORE = textwrap.dedent('''\
+    #!{python}
+    import json, sys
+    with open({log!r}, 'a') as log:
+        log.write(' '.join(sys.argv[1:2]) + '\\n')
+    if sys.argv[1] == '-j':
+        for job in json.load(open(sys.argv[2])):
+            if 'fail' in job['in']:
+                sys.exit(1)
+            open(job['out'], 'w').write('%PDF')
+    elif sys.argv[1] != '--version':
+        open(sys.argv[3], 'w').write('%PDF')
+''')
+
+
+@pytest.fixture
+def fake_mscore(tmp_path, monkeypatch):
+    log = tmp_path / 'calls.log'
+    script = tmp_path / 'mscore'
+    script.write_text(FAKE_MSCORE.format(python=sys.executable, log=str(log)))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+    monkeypatch.setattr(musescore, 'MUSESCORE_CANDIDATES', ['not-a-musescore', str(script)])
+    find_musescore.cache_clear()
+    yield script, log
+    find_musescore.cache_clear()
+
+
+def calls(log):
+    return log.read_text().split('\n')[:-1] if log.exists() else []
+
+
+def test_find_musescore_probes_once(fake_mscore):
+    script, log = fake_mscore
+
+    assert find_musescore() == str(script)
+    assert find_musescore() == str(script)
+
+    # Missing candidates are skipped without a probe; the hit is cached
+    assert calls(log) == ['--version']
+
+
+def test_find_musescore_without_install(monkeypatch):
+    monkeypatch.setattr(musescore, 'MUSESCORE_CANDIDATES', ['not-a-musescore'])
+    monkeypatch.setattr(musescore.subprocess, 'run', pytest.fail)
+    find_musescore.cache_clear()
+    try:
+        assert find_musescore() is None
+    finally:
+        find_musescore.cache_clear()
+
+
+def test_batch_renderer_shares_one_run(fake_mscore, tmp_path):
+    script, log = fake_mscore
+    renderer = MuseScoreBatchRenderer(str(script), window=0.5, max_batch=8)
+    jobs = [(str(tmp_path / f'{i}.musicxml'), str(tmp_path / f'{i}.pdf')) for i in range(3)]
+
+    with ThreadPoolExecutor(len(jobs)) as pool:
+        results = list(pool.map(lambda job: renderer.render(*job), jobs))
+
+    assert results == [pdf for _, pdf in jobs]
+    assert calls(log) == ['-j']
+
+
+def test_batch_renderer_splits_at_max_batch(fake_mscore, tmp_path):
+    script, log = fake_mscore
+    renderer = MuseScoreBatchRenderer(str(script), window=0.5, max_batch=2)
+    jobs = [(str(tmp_path / f'{i}.musicxml'), str(tmp_path / f'{i}.pdf')) for i in range(4)]
+
+    with ThreadPoolExecutor(len(jobs)) as pool:
+        results = list(pool.map(lambda job: renderer.render(*job), jobs))
+
+    assert results == [pdf for _, pdf in jobs]
+    assert calls(log) == ['-j', '-j']
+
+
+def test_batch_renderer_reports_failed_batch(fake_mscore, tmp_path):
+    script, _ = fake_mscore
+    renderer = MuseScoreBatchRenderer(str(script), window=0.0, max_batch=8)
+
+    assert renderer.render(str(tmp_path / 'fail.musicxml'), str(tmp_path / 'fail.pdf')) is None
+
+
+def test_musicxml_to_pdf_uses_cached_lookup(fake_mscore, tmp_path, monkeypatch):
+    from app.services.converter import MusicConverter
+
+    script, log = fake_mscore
+    monkeypatch.setattr('app.services.converter.settings.MUSESCORE_BATCH_WINDOW', 0.0)
+    converter = MusicConverter()
+
+    for name in ('a', 'b'):
+        output = str(tmp_path / f'{name}.pdf')
+        assert converter.musicxml_to_pdf(str(tmp_path / f'{name}.musicxml'), output) == output
+
+    assert calls(log) == ['--version', str(tmp_path / 'a.musicxml'), str(tmp_path / 'b.musicxml')]
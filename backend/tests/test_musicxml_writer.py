@@ -0,0 +1,117 @@
+import pytest
+from music21 import converter
+
+from app.services.musicxml_writer import (
+    MAX_VOICES_PER_STAFF,
+    MusicXMLWriter,
+    UnsupportedNotesError,
+)
+from app.services.note_store import LEFT_HAND, RIGHT_HAND, NoteStore
+
+# At the fixed 120 BPM one second is two quarter notes
+
+
+def parse(notes, tmp_path, **kwargs):
+    path = tmp_path / 'score.musicxml'
+    MusicXMLWriter(**kwargs).write(notes, str(path))
+    assert [p.name for p in tmp_path.iterdir()] == ['score.musicxml']
+    return converter.parse(str(path))
+
+
+def assert_measures_full(score):
+    """Every voice of every measure must add up to the bar length."""
+    for part in score.parts:
+        for measure in part.getElementsByClass('Measure'):
+            bar = measure.barDuration.quarterLength
+            voices = list(measure.voices) or [measure]
+            for voice in voices:
+                assert voice.duration.quarterLength == bar, (part.id, measure.number)
+
+
+def sounding_onsets(score):
+    """(pitch, offset in quarters) of every note that is not a tie continuation."""
+    onsets = set()
+    for part in score.parts:
+        for note in part.flatten().notes:
+            if note.tie is not None and note.tie.type in ('stop', 'continue'):
+                continue
+            for pitch in note.pitches:
+                onsets.add((pitch.midi, float(note.getOffsetInHierarchy(part))))
+    return onsets
+
+
+def test_simple_two_hand_score(tmp_path):
+    notes = NoteStore([60, 64, 48], [0.0, 0.5, 0.0], [0.5, 1.0, 2.0], [80, 80, 80],
+                      [RIGHT_HAND, RIGHT_HAND, LEFT_HAND])
+
+    score = parse(notes, tmp_path)
+
+    assert len(score.parts) == 2
+    assert_measures_full(score)
+    assert sounding_onsets(score) == {(60, 0.0), (64, 1.0), (48, 0.0)}
+
+
+def test_overlapping_chords_beyond_voice_limit(tmp_path):
+    # Four right-hand chords that all still sound at 2 s would need more
+    # than MAX_VOICES_PER_STAFF voices; their ends are clipped instead
+    notes = NoteStore(
+        pitch=[60, 64, 67, 72, 76, 79, 84, 48],
+        onset=[0.0, 0.0, 0.25, 0.5, 0.5, 0.75, 1.0, 0.0],
+        offset=[3.0, 3.0, 2.5, 2.9, 1.0, 4.2, 3.5, 2.0],
+        velocity=[80] * 8,
+        hand=[RIGHT_HAND] * 7 + [LEFT_HAND],
+    )
+
+    score = parse(notes, tmp_path)
+
+    assert_measures_full(score)
+    treble = score.parts[0]
+    for measure in treble.getElementsByClass('Measure'):
+        assert len(list(measure.voices)) <= MAX_VOICES_PER_STAFF
+    # Clipping shortens notes but never drops or moves them
+    assert sounding_onsets(score) == {
+        (60, 0.0), (64, 0.0), (67, 0.5), (72, 1.0), (76, 1.0), (79, 1.5), (84, 2.0), (48, 0.0)
+    }
+
+
+def test_notes_crossing_barlines_are_tied(tmp_path):
+    notes = NoteStore([60], [1.5], [2.5], [80])  # quarters 3 to 5
+
+    score = parse(notes, tmp_path)
+
+    assert_measures_full(score)
+    tied = [note for note in score.parts[0].flatten().notes if note.tie is not None]
+    assert [note.tie.type for note in tied] == ['start', 'stop']
+
+
+def test_odd_meter_and_key_spelling(tmp_path):
+    notes = NoteStore([61, 70], [0.0, 2.0], [1.5, 3.0], [80, 80])
+
+    score = parse(notes, tmp_path, fifths=-5, mode='major', beats=3, beat_type=4)
+
+    assert_measures_full(score)
+    first = score.parts[0].getElementsByClass('Measure')[0]
+    assert first.timeSignature.ratioString == '3/4'
+    names = [p.name for note in score.parts[0].flatten().notes for p in note.pitches]
+    assert names[0] == 'D-' and 'B-' in names
+
+
+def test_key_change_switches_spelling(tmp_path):
+    notes = NoteStore([66, 66], [0.0, 2.0], [1.0, 3.0], [80, 80])
+
+    score = parse(notes, tmp_path, fifths=-6, key_changes={1: (6, 'major')})
+
+    names = [p.name for note in score.parts[0].flatten().notes for p in note.pitches]
+    assert names == ['G-', 'F#']
+
+
+def test_empty_store_writes_one_bar_of_rests(tmp_path):
+    score = parse(NoteStore.empty(), tmp_path)
+
+    assert_measures_full(score)
+    assert len(score.parts[0].getElementsByClass('Measure')) == 1
+
+
+def test_rejects_unsupported_time_signature():
+    with pytest.raises(UnsupportedNotesError):
+        MusicXMLWriter(beats=7, beat_type=3)
@@ -0,0 +1,171 @@
+import mido
+import numpy as np
+import pytest
+
+from app.services.note_store import LEFT_HAND, RIGHT_HAND, NoteStore
+
+
+def make_store():
+    return NoteStore(
+        pitch=[64, 60, 67, 48],
+        onset=[0.5, 0.5, 0.0, 1.0],
+        offset=[1.0, 1.5, 0.25, 2.0],
+        velocity=[80, 90, 100, 70],
+        hand=[RIGHT_HAND, RIGHT_HAND, RIGHT_HAND, LEFT_HAND],
+    )
+
+
+def test_sorted_by_onset_then_pitch():
+    store = make_store()
+
+    assert store.onset.tolist() == [0.0, 0.5, 0.5, 1.0]
+    assert store.pitch.tolist() == [67, 60, 64, 48]
+    # Other columns follow the same order
+    assert store.velocity.tolist() == [100, 90, 80, 70]
+    assert store.hand.tolist() == [RIGHT_HAND, RIGHT_HAND, RIGHT_HAND, LEFT_HAND]
+
+
+def test_save_load_round_trip(tmp_path):
+    store = make_store()
+    path = tmp_path / 'notes.npz'
+
+    store.save(path)
+    loaded = NoteStore.load(path)
+
+    for column in NoteStore.COLUMNS:
+        np.testing.assert_array_equal(getattr(loaded, column), getattr(store, column))
+    assert [p.name for p in tmp_path.iterdir()] == ['notes.npz']
+
+
+def test_from_note_events_clips_velocity():
+    events = [(0.0, 0.5, 60, 0.5, []), (0.1, 0.2, 62, 2.0, []), (0.2, 0.3, 64, 0.0, [])]
+
+    store = NoteStore.from_note_events(events)
+
+    assert store.pitch.tolist() == [60, 62, 64]
+    assert store.velocity.tolist() == [64, 127, 1]
+    assert len(NoteStore.from_note_events([])) == 0
+
+
+def test_select_shift_before_and_concatenate():
+    store = make_store()
+
+    assert len(store.before(0.5)) == 1
+    shifted = store.shifted(10.0)
+    np.testing.assert_allclose(shifted.onset, store.onset + 10.0)
+    np.testing.assert_allclose(shifted.offset, store.offset + 10.0)
+
+    merged = NoteStore.concatenate([shifted, store.select(store.hand == LEFT_HAND)])
+    assert len(merged) == 5
+    assert merged.onset[0] == 1.0  # re-sorted after merging
+    assert len(NoteStore.concatenate([])) == 0
+
+
+def test_duration():
+    assert make_store().duration == 2.0
+    assert NoteStore.empty().duration == 0.0
+
+
+def test_to_midi_writes_one_track_per_hand(tmp_path):
+    store = make_store()
+    path = tmp_path / 'out.mid'
+
+    store.to_midi(str(path))
+    midi = mido.MidiFile(str(path))
+
+    assert len(midi.tracks) == 2
+    right, left = midi.tracks
+    right_on = [m.note for m in right if m.type == 'note_on' and m.velocity > 0]
+    left_on = [m.note for m in left if m.type == 'note_on' and m.velocity > 0]
+    assert right_on == [67, 60, 64]
+    assert left_on == [48]
+
+    # Absolute times survive the tick conversion
+    notes = {}
+    for track in midi.tracks:
+        ticks = 0
+        for msg in track:
+            ticks += msg.time
+            if msg.type in ('note_on', 'note_off'):
+                seconds = mido.tick2second(ticks, midi.ticks_per_beat, 500000)
+                notes.setdefault(msg.note, []).append(round(seconds, 3))
+    assert notes[60] == [0.5, 1.5]
+    assert notes[48] == [1.0, 2.0]
+    assert [p.name for p in tmp_path.iterdir()] == ['out.mid']
+
+
+def test_quality_metrics():
+    metrics = make_store().quality_metrics(duration=4.0)
+
+    assert metrics['note_count'] == 4
+    assert metrics['duration'] == 4.0
+    assert metrics['polyphony_avg'] == 1.0  # notes per second
+    assert 0.3 <= metrics['confidence_score'] <= 0.95
+
+
+def detect(truth, start, end):
+    """Stand-in for inference on a chunk: the notes heard inside it."""
+    onset = np.maximum(truth.onset, start)
+    offset = np.minimum(truth.offset, end)
+    keep = offset > onset
+    return NoteStore(truth.pitch[keep], onset[keep], offset[keep], truth.velocity[keep])
+
+
+def transcribe_in_chunks(truth, total, first=20.0, length=30.0, context=1.0):
+    """Mirror PianoTranscriber._transcribe_chunked on `detect`."""
+    notes = NoteStore.empty()
+    start, chunk_length = 0.0, first
+    while start < total:
+        end = min(start + chunk_length, total)
+        chunk = detect(truth, max(0.0, start - context), min(total, end + context))
+        notes = notes.stitched(chunk, start, end)
+        start, chunk_length = end, length
+    return notes
+
+
+def sustained_piece(seed=0, total=120.0):
+    """Notes that never overlap on the same pitch, some held for a minute."""
+    rng = np.random.default_rng(seed)
+    pitch, onset, offset = [], [], []
+    for key in range(36, 96, 3):
+        time = rng.uniform(0, 5)
+        while time < total - 1:
+            length = rng.choice([rng.uniform(0.1, 2.0), rng.uniform(5.0, 60.0)], p=[0.8, 0.2])
+            pitch.append(key)
+            onset.append(time)
+            offset.append(min(time + length, total))
+            time += length + rng.uniform(0.05, 3.0)
+    return NoteStore(pitch, onset, offset, rng.integers(1, 128, len(pitch)))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_stitched_chunks_match_single_pass(seed):
+    truth = sustained_piece(seed)
+    single_pass = detect(truth, 0.0, 120.0)
+    assert np.any((truth.onset < 20.0) & (truth.offset > 21.0))  # crosses a chunk edge
+
+    stitched = transcribe_in_chunks(truth, 120.0)
+
+    for column in NoteStore.COLUMNS:
+        np.testing.assert_array_equal(getattr(stitched, column), getattr(single_pass, column))
+
+
+def test_stitched_extends_note_across_several_chunks():
+    held = NoteStore([60, 60], [5.0, 75.0], [70.0, 76.0], [80, 80])
+
+    stitched = transcribe_in_chunks(held, 80.0)
+
+    # Held through three chunk edges; the re-strike stays a separate note
+    assert stitched.onset.tolist() == [5.0, 75.0]
+    assert stitched.offset.tolist() == [70.0, 76.0]
+
+
+def test_stitched_extends_only_the_overlapping_repeat():
+    # The previous chunk (context up to 21 s) cut off the repeat at 19.75 s
+    notes = NoteStore([60, 60], [18.0, 19.75], [19.5, 21.0], [80, 80])
+    chunk = NoteStore([60, 60, 64], [19.0, 19.75, 25.0], [19.5, 23.0, 26.0], [80, 80, 80])
+
+    stitched = notes.stitched(chunk, 20.0, 50.0)
+
+    assert stitched.onset.tolist() == [18.0, 19.75, 25.0]
+    assert stitched.offset.tolist() == [19.5, 23.0, 26.0]
@@ -0,0 +1,102 @@
+import json
+import mido
+import numpy as np
+import pytest
+
+from app.services.note_store import NoteStore
+from app.services.piano_roll import PianoRoll
+
+
+def random_roll(count=200, seed=0):
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(0, 60, count)
+    end = start + rng.uniform(0.05, 8.0, count)
+    return PianoRoll(rng.integers(21, 109, count), start, end, rng.integers(1, 128, count))
+
+
+def brute_force(roll, start, end):
+    keep = np.ones(len(roll), bool)
+    if start is not None:
+        keep &= roll.end > start
+    if end is not None:
+        keep &= roll.start < end
+    return sorted(zip(roll.pitch[keep].tolist(), roll.start[keep].tolist()))
+
+
+@pytest.mark.parametrize('start,end', [
+    (None, None), (0.0, 5.0), (10.0, 12.5), (30.0, None), (None, 20.0), (59.0, 70.0), (80.0, 90.0),
+])
+def test_query_matches_brute_force(start, end):
+    roll = random_roll()
+
+    notes = roll.query(start, end)['notes']
+
+    found = sorted((note['pitch'], np.float32(note['start']).item()) for note in notes)
+    assert found == brute_force(roll, start, end)
+
+
+def test_query_includes_long_note_started_before_window():
+    roll = PianoRoll([60, 62], [0.0, 5.0], [20.0, 5.5], [80, 80])
+
+    notes = roll.query(10.0, 11.0)['notes']
+
+    assert [note['pitch'] for note in notes] == [60]
+    assert notes[0]['duration'] == pytest.approx(20.0)
+
+
+def test_save_load_round_trip(tmp_path):
+    roll = random_roll(20)
+    path = tmp_path / 'piano_roll.npz'
+
+    roll.save(path)
+    loaded = PianoRoll.load(path)
+
+    assert loaded.query() == roll.query()
+    assert [p.name for p in tmp_path.iterdir()] == ['piano_roll.npz']
+
+
+def test_from_notes():
+    notes = NoteStore([60, 64], [0.0, 1.0], [0.5, 2.0], [90, 100])
+
+    data = PianoRoll.from_notes(notes).query()
+
+    assert data['tempo'] == 120.0
+    assert data['duration'] == 2.0
+    assert [note['pitch'] for note in data['notes']] == [60, 64]
+
+
+def test_from_midi_uses_tempo_map(tmp_path):
+    midi = mido.MidiFile(type=1, ticks_per_beat=480)
+    track = mido.MidiTrack()
+    track.append(mido.MetaMessage('set_tempo', tempo=500000, time=0))  # 120 BPM
+    track.append(mido.Message('note_on', note=60, velocity=80, time=0))
+    track.append(mido.Message('note_off', note=60, velocity=0, time=960))  # 1.0 s
+    track.append(mido.MetaMessage('set_tempo', tempo=1000000, time=0))  # 60 BPM
+    track.append(mido.Message('note_on', note=62, velocity=90, time=0))
+    track.append(mido.Message('note_on', note=62, velocity=0, time=480))  # 1.0 s more
+    midi.tracks.append(track)
+    path = tmp_path / 'tempo.mid'
+    midi.save(str(path))
+
+    data = PianoRoll.from_midi(str(path)).query()
+
+    assert data['tempo'] == pytest.approx(120.0)
+    starts = {note['pitch']: (note['start'], note['end']) for note in data['notes']}
+    assert starts[60] == pytest.approx((0.0, 1.0))
+    assert starts[62] == pytest.approx((1.0, 2.0))
+
+
+def test_empty_roll():
+    roll = PianoRoll([], [], [], [])
+
+    assert roll.query(0.0, 10.0) == {'notes': [], 'tempo': 120.0, 'duration': 0.0}
+
+
+@pytest.mark.parametrize('count,chunk_notes', [(0, 4), (1, 4), (200, 7), (200, 1024)])
+def test_iter_json_matches_query(count, chunk_notes):
+    roll = random_roll(count) if count else PianoRoll([], [], [], [])
+
+    chunks = list(roll.iter_json(chunk_notes))
+
+    assert b''.join(chunks) == json.dumps(roll.query()).encode()
+    assert len(chunks) == 2 + -(-count // chunk_notes)
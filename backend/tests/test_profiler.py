@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from app.services.instrumentation import StageRecorder
+from app.services.profiler import PROFILE_FILENAME, PROFILE_STACKS_FILENAME, JobProfiler
+
+ADMIN_TOKEN = 'secret'
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def allocate():
+    return [bytearray(1024) for _ in range(2000)]
+
+
+@pytest.fixture
+def profiled():
+    profiler = JobProfiler(interval=0.002)
+    profiler.start()
+    yield StageRecorder(profiler=profiler), profiler
+    profiler.stop()
+
+
+def test_samples_are_attributed_to_stages(profiled):
+    stages, profiler = profiled
+
+    with stages.stage('busy'):
+        spin(0.2)
+    time.sleep(0.05)  # not in a stage: not sampled
+    profiler.stop()
+
+    summary = profiler.summary()
+    assert set(summary['stages']) == {'busy'}
+    busy = summary['stages']['busy']
+    assert busy['samples'] == summary['samples'] > 0
+    assert busy['top_self'][0][0].startswith('spin (test_profiler.py:')
+
+
+def test_concurrent_stages_on_pool_threads(profiled):
+    stages, profiler = profiled
+
+    def run(name):
+        with stages.stage(name):
+            spin(0.2)
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ('midi', 'piano_roll')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    profiler.stop()
+
+    summary = profiler.summary()['stages']
+    assert set(summary) == {'midi', 'piano_roll'}
+    assert all(entry['samples'] > 0 for entry in summary.values())
+
+
+def test_allocations_are_recorded_per_stage(profiled):
+    stages, profiler = profiled
+
+    with stages.stage('alloc'):
+        kept = allocate()
+        spin(0.05)  # make sure the stage is sampled
+    profiler.stop()
+
+    allocations = profiler.summary()['stages']['alloc']['top_allocations']
+    assert allocations[0]['size_bytes'] >= 2000 * 1024
+    assert any('test_profiler.py' in frame for frame in allocations[0]['traceback'])
+    assert len(kept) == 2000
+
+
+def test_tracemalloc_stops_with_last_profiler():
+    first, second = JobProfiler(), JobProfiler()
+    first.start()
+    second.start()
+
+    first.stop()
+    assert tracemalloc.is_tracing()
+    second.stop()
+    second.stop()  # idempotent
+
+    assert not tracemalloc.is_tracing()
+
+
+def test_save_writes_summary_and_folded_stacks(profiled, tmp_path):
+    stages, profiler = profiled
+    with stages.stage('busy'):
+        spin(0.1)
+    profiler.stop()
+
+    names = profiler.save(tmp_path / 'job')
+
+    assert names == [PROFILE_FILENAME, PROFILE_STACKS_FILENAME]
+    summary = json.loads((tmp_path / 'job' / PROFILE_FILENAME).read_text())
+    assert summary['stages']['busy']['estimated_seconds'] > 0
+    lines = (tmp_path / 'job' / PROFILE_STACKS_FILENAME).read_text().splitlines()
+    assert lines and all(line.startswith('busy;') for line in lines)
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == profiler.samples
+
+
+@pytest.fixture
+def profiled_job(job_outputs):
+    return job_outputs(**{PROFILE_FILENAME: b'{"samples": 3}',
+                          PROFILE_STACKS_FILENAME: b'busy;spin 3\n'})
+
+
+@pytest.mark.parametrize('token', [None, 'wrong'])
+@pytest.mark.parametrize('path', ['', '/stacks'])
+def test_admin_endpoints_require_token(client, routes, monkeypatch, profiled_job, token, path):
+    monkeypatch.setattr(routes.settings, 'ADMIN_TOKEN', ADMIN_TOKEN)
+    job_id, _ = profiled_job
+    headers = {'X-Admin-Token': token} if token else {}
+
+    response = client.get(f'/api/v1/admin/profile/{job_id}{path}', headers=headers)
+
+    assert response.status_code == 403
+
+
+def test_admin_endpoints_disabled_without_configured_token(client, routes, monkeypatch,
+                                                           profiled_job):
+    monkeypatch.setattr(routes.settings, 'ADMIN_TOKEN', None)
+    job_id, _ = profiled_job
+
+    response = client.get(f'/api/v1/admin/profile/{job_id}', headers={'X-Admin-Token': ''})
+
+    assert response.status_code == 403
+
+
+def test_admin_endpoints_serve_profile(client, routes, monkeypatch, profiled_job, job_outputs):
+    monkeypatch.setattr(routes.settings, 'ADMIN_TOKEN', ADMIN_TOKEN)
+    job_id, _ = profiled_job
+    headers = {'X-Admin-Token': ADMIN_TOKEN}
+
+    assert client.get(f'/api/v1/admin/profile/{job_id}', headers=headers).json() == {'samples': 3}
+    stacks = client.get(f'/api/v1/admin/profile/{job_id}/stacks', headers=headers)
+    assert stacks.text == 'busy;spin 3\n'
+    assert f'profile_{job_id}.folded' in stacks.headers['content-disposition']
+
+    unprofiled, _ = job_outputs()
+    assert client.get(f'/api/v1/admin/profile/{unprofiled}', headers=headers).status_code == 404
+
+
+def test_profiling_a_job_requires_admin(client, routes, monkeypatch):
+    monkeypatch.setattr(routes.settings, 'ADMIN_TOKEN', ADMIN_TOKEN)
+    body = {'youtube_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'profile': True}
+
+    assert client.post('/api/v1/transcribe', json=body).status_code == 403
+
+
+def test_nested_stage_samples_go_to_innermost_stage(profiled):
+    stages, profiler = profiled
+
+    with stages.stage('transcribe'):
+        with stages.stage('inference'):
+            spin(0.1)
+        spin(0.1)  # back in the enclosing stage
+    profiler.stop()
+
+    summary = profiler.summary()['stages']
+    assert summary['inference']['samples'] > 0
+    assert summary['transcribe']['samples'] > 0
@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+
+from app.services.scheduler import FairScheduler
+
+YOUTUBE_URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+def wait_until_idle(scheduler, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while scheduler.queue_depth or scheduler.running:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_round_robin_across_tenants():
+    scheduler = FairScheduler(max_workers=1)
+    gate, blocked = threading.Event(), threading.Event()
+    order = []
+    scheduler.submit('blocker', lambda: blocked.set() or gate.wait())
+    assert blocked.wait(5)
+
+    for task in ('a1', 'a2', 'a3'):
+        scheduler.submit('a', order.append, task)
+    for task in ('b1', 'b2'):
+        scheduler.submit('b', order.append, task)
+    scheduler.submit('c', order.append, 'c1')
+    assert scheduler.queue_depth == 6
+    assert scheduler.running == 1
+
+    gate.set()
+    wait_until_idle(scheduler)
+
+    # One playlist-sized tenant cannot hold back the others
+    assert order == ['a1', 'b1', 'c1', 'a2', 'b2', 'a3']
+    assert scheduler.queue_depth == 0
+
+
+def test_failed_task_does_not_stop_worker():
+    scheduler = FairScheduler(max_workers=1)
+    done = []
+
+    scheduler.submit('a', lambda: 1 / 0)
+    scheduler.submit('a', done.append, 'ok')
+    wait_until_idle(scheduler)
+
+    assert done == ['ok']
+    assert scheduler.running == 0
+
+
+def test_runs_up_to_max_workers_at_once():
+    scheduler = FairScheduler(max_workers=2)
+    gate = threading.Event()
+    started = threading.Semaphore(0)
+
+    def task():
+        started.release()
+        gate.wait()
+
+    for tenant in ('a', 'b', 'c'):
+        scheduler.submit(tenant, task)
+    assert started.acquire(timeout=5) and started.acquire(timeout=5)
+
+    assert scheduler.running == 2
+    assert scheduler.queue_depth == 1
+    gate.set()
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.tenants = []
+
+    def submit(self, tenant, func, *args):
+        self.tenants.append(tenant)
+
+
+def test_tenant_header_does_not_split_client(client, routes, monkeypatch):
+    recorder = RecordingScheduler()
+    monkeypatch.setattr(routes, 'scheduler', recorder)
+
+    job_ids = []
+    for label in ('team-a', 'team-b', None):
+        headers = {'X-Tenant-ID': label} if label else {}
+        response = client.post('/api/v1/transcribe', json={'youtube_url': YOUTUBE_URL},
+                               headers=headers)
+        assert response.status_code == 200
+        job_ids.append(response.json()['job_id'])
+
+    # All requests come from one address and share one scheduler queue
+    client_id = recorder.tenants[0]
+    assert recorder.tenants == [client_id] * 3
+    labels = [json.loads(routes.job_manager.redis.get(f'job:{job_id}'))['tenant']
+              for job_id in job_ids]
+    assert labels == [f'{client_id}/team-a', f'{client_id}/team-b', client_id]
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import main
+from benchmarks.bench_import import check_import, measure_api_import
+
+
+@pytest.fixture
+def preloads(monkeypatch):
+    """Run the startup hook and record whether it loaded the worker."""
+    loaded = threading.Event()
+    monkeypatch.setattr(main.lifecycle, 'start', lambda: None)
+    monkeypatch.setattr(main, 'get_worker', loaded.set)
+
+    def startup(enabled):
+        monkeypatch.setattr(main.settings, 'PRELOAD_WORKER', enabled)
+        asyncio.run(main.startup_event())
+        return loaded.wait(timeout=5 if enabled else 0.1)
+
+    return startup
+
+
+def test_worker_is_not_preloaded_by_default(preloads):
+    from app.core.config import Settings
+
+    assert Settings().PRELOAD_WORKER is False
+    assert not preloads(False)
+
+
+def test_worker_deployments_preload_in_background(preloads):
+    assert preloads(True)
+
+
+def test_api_import_loads_no_heavy_modules():
+    result = measure_api_import(repeat=1)
+
+    assert result['heavy_modules'] == []
+    assert check_import(result) == []
+
+
+def wait_for_status(client, job_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = client.get(f'/api/v1/status/{job_id}').json()
+        if result['status'] == status:
+            return result
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} never became {status}: {result}')
+
+
+def test_job_fails_when_worker_cannot_load(client, routes, monkeypatch):
+    def get_worker():
+        raise ImportError("No module named 'basic_pitch'")
+
+    monkeypatch.setattr(routes, 'get_worker', get_worker)
+
+    response = client.post('/api/v1/transcribe',
+                           json={'youtube_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'})
+
+    job_id = response.json()['job_id']
+    wait_for_status(client, job_id, 'failed')
+    assert 'basic_pitch' in client.get(f'/api/v1/result/{job_id}').json()['error']
+
+
+def test_upload_job_audio_is_removed_when_worker_cannot_load(routes, monkeypatch, tmp_path):
+    monkeypatch.setattr(routes, 'get_worker', lambda: 1 / 0)
+    monkeypatch.setattr(routes.settings, 'UPLOAD_DIR', str(tmp_path))
+    job_id = routes.job_manager.create_job(None)
+    (tmp_path / job_id).mkdir()
+    (tmp_path / job_id / 'audio.wav').write_bytes(b'RIFF')
+
+    routes._process_upload(job_id, str(tmp_path / job_id / 'audio.wav'), False, False)
+
+    assert routes.job_manager.get_result(job_id).status == 'failed'
+    assert not (tmp_path / job_id / 'audio.wav').exists()
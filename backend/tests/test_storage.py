@@ -0,0 +1,281 @@
+import hashlib
+
+import pytest
+
+from app.services.artifacts import MANIFEST_FILENAME, PROVISIONAL_FILENAME
+from app.services.storage import (
+    ArtifactCache,
+    ArtifactStore,
+    LocalArtifactStore,
+    S3ArtifactStore,
+    StoredObject,
+)
+
+
+class ClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+        self.closed = False
+
+    def iter_chunks(self, size):
+        for start in range(0, len(self.data), size):
+            yield self.data[start:start + size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeS3Client:
+    """The subset of the boto3 S3 client used by S3ArtifactStore."""
+
+    class exceptions:
+        ClientError = ClientError
+
+    def __init__(self, page_size=2):
+        self.objects = {}
+        self.page_size = page_size
+        self.calls = []
+
+    def _object(self, Bucket, Key):
+        try:
+            return self.objects[(Bucket, Key)]
+        except KeyError:
+            raise ClientError('404') from None
+
+    def upload_file(self, filename, bucket, key):
+        with open(filename, 'rb') as f:
+            self.objects[(bucket, key)] = f.read()
+
+    def head_object(self, Bucket, Key):
+        self.calls.append(('head', Key))
+        data = self._object(Bucket, Key)
+        return {'ContentLength': len(data), 'ETag': f'"{hashlib.md5(data).hexdigest()}"'}
+
+    def get_object(self, Bucket, Key, Range=None):
+        self.calls.append(('get', Key, Range))
+        data = self._object(Bucket, Key)
+        if Range is not None:
+            start, end = Range[len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1 if end else None]
+        return {'Body': FakeBody(data)}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def get_paginator(self, operation):
+        assert operation == 'list_objects_v2'
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        keys = sorted(key for bucket, key in self.objects if bucket == Bucket
+                      and key.startswith(Prefix))
+        for start in range(0, len(keys), self.page_size):
+            yield {'Contents': [
+                {'Key': key, 'Size': len(self.objects[(Bucket, key)]),
+                 'ETag': f'"{hashlib.md5(self.objects[(Bucket, key)]).hexdigest()}"'}
+                for key in keys[start:start + self.page_size]
+            ]}
+
+
+@pytest.fixture
+def s3():
+    return FakeS3Client()
+
+
+@pytest.fixture
+def s3_store(s3):
+    return S3ArtifactStore('bucket', prefix='/jobs/', client=s3)
+
+
+def write(directory, **files):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, data in files.items():
+        (directory / name).write_bytes(data)
+    return directory
+
+
+def test_artifact_store_is_abstract():
+    with pytest.raises(TypeError):
+        ArtifactStore()
+
+
+def test_local_store_round_trip(tmp_path):
+    store = LocalArtifactStore(tmp_path / 'store')
+    source = write(tmp_path / 'out', **{'a.mid': b'0123456789'})
+
+    store.put('job', 'a.mid', source / 'a.mid')
+
+    assert store.stat('job', 'a.mid').size == 10
+    assert store.stat('job', 'missing') is None
+    assert set(store.list('job')) == {'a.mid'}
+    assert b''.join(store.iter_object('job', 'a.mid', start=2, length=3)) == b'234'
+    store.delete('job', 'a.mid')
+    assert store.list('job') == {}
+
+
+def test_s3_store_stat_put_get(s3, s3_store, tmp_path):
+    source = write(tmp_path / 'out', **{'a.mid': b'0123456789'})
+
+    assert s3_store.stat('job', 'a.mid') is None
+    s3_store.put('job', 'a.mid', source / 'a.mid')
+
+    assert ('bucket', 'jobs/job/a.mid') in s3.objects
+    assert s3_store.stat('job', 'a.mid') == StoredObject(10, hashlib.md5(b'0123456789').hexdigest())
+    assert b''.join(s3_store.iter_object('job', 'a.mid')) == b'0123456789'
+    assert b''.join(s3_store.iter_object('job', 'a.mid', start=4)) == b'456789'
+    assert b''.join(s3_store.iter_object('job', 'a.mid', start=2, length=3)) == b'234'
+    assert [call[2] for call in s3.calls if call[0] == 'get'] == [None, 'bytes=4-', 'bytes=2-4']
+
+    s3_store.download('job', 'a.mid', tmp_path / 'copy.mid')
+    assert (tmp_path / 'copy.mid').read_bytes() == b'0123456789'
+
+
+def test_s3_store_other_errors_propagate(s3, s3_store):
+    def head_object(**kwargs):
+        raise ClientError('403')
+
+    s3.head_object = head_object
+
+    with pytest.raises(ClientError):
+        s3_store.stat('job', 'a.mid')
+
+
+def test_s3_store_list_pages_and_skips_nested_keys(s3, s3_store, tmp_path):
+    source = write(tmp_path / 'out', **{f'{i}.bin': b'x' * i for i in range(1, 6)})
+    for path in source.iterdir():
+        s3_store.put('job', path.name, path)
+    s3.objects[('bucket', 'jobs/job/nested/key')] = b'n'
+    s3.objects[('bucket', 'jobs/job-2/1.bin')] = b'other job'
+
+    objects = s3_store.list('job')
+
+    assert {name: stored.size for name, stored in objects.items()} == \
+        {f'{i}.bin': i for i in range(1, 6)}
+
+
+def test_sync_publishes_in_order_and_deletes_removed_files(s3, s3_store, tmp_path):
+    out = write(tmp_path / 'out', **{MANIFEST_FILENAME: b'{}', PROVISIONAL_FILENAME: b'',
+                                     'a.mid': b'a', 'b.pdf': b'b'})
+    order = []
+    upload_file = s3.upload_file
+    s3.upload_file = lambda path, bucket, key: (order.append(key), upload_file(path, bucket, key))
+
+    s3_store.sync('job', out)
+
+    assert order[0].endswith(PROVISIONAL_FILENAME) and order[-1].endswith(MANIFEST_FILENAME)
+
+    (out / PROVISIONAL_FILENAME).unlink()
+    (out / 'b.pdf').unlink()
+    s3_store.sync('job', out)
+    assert set(s3_store.list('job')) == {MANIFEST_FILENAME, 'a.mid'}
+
+
+@pytest.fixture
+def cache(s3_store, tmp_path):
+    def create(max_bytes=1000, revalidate_after=60.0):
+        return ArtifactCache(s3_store, tmp_path / 'cache', max_bytes=max_bytes,
+                             revalidate_after=revalidate_after)
+
+    return create
+
+
+def publish(store, tmp_path, job_id, **files):
+    out = write(tmp_path / 'out' / job_id, **files)
+    for name in files:
+        store.put(job_id, name, out / name)
+
+
+def gets(s3):
+    return [call[1] for call in s3.calls if call[0] == 'get']
+
+
+def test_cache_downloads_once_within_window(cache, s3, s3_store, tmp_path):
+    publish(s3_store, tmp_path, 'job', **{'a.mid': b'aaa'})
+    artifacts = cache()
+
+    job_dir = artifacts.fetch('job', ['a.mid', 'missing.pdf'])
+    artifacts.fetch('job', ['a.mid', 'missing.pdf'])
+
+    assert (job_dir / 'a.mid').read_bytes() == b'aaa'
+    assert not (job_dir / 'missing.pdf').exists()
+    assert gets(s3) == ['jobs/job/a.mid']
+    assert len([call for call in s3.calls if call[0] == 'head']) == 2
+
+
+def test_cache_revalidates_changed_and_deleted_objects(cache, s3, s3_store, tmp_path):
+    publish(s3_store, tmp_path, 'job', **{'a.mid': b'aaa', 'b.pdf': b'b'})
+    artifacts = cache(revalidate_after=0.0)
+    job_dir = artifacts.fetch('job', ['a.mid', 'b.pdf'])
+
+    artifacts.fetch('job', ['a.mid'])
+    assert gets(s3) == ['jobs/job/a.mid', 'jobs/job/b.pdf']  # unchanged: no download
+
+    publish(s3_store, tmp_path, 'job', **{'a.mid': b'new'})
+    s3_store.delete('job', 'b.pdf')
+    artifacts.fetch('job', ['a.mid', 'b.pdf'])
+
+    assert (job_dir / 'a.mid').read_bytes() == b'new'
+    assert not (job_dir / 'b.pdf').exists()
+
+
+def test_cache_evicts_least_recently_used(cache, s3_store, tmp_path, monkeypatch):
+    for job_id in ('old', 'hot', 'new'):
+        publish(s3_store, tmp_path, job_id, **{'a.bin': b'x' * 400})
+    clock = iter(range(100))
+    monkeypatch.setattr('app.services.storage.time.monotonic', lambda: next(clock))
+    artifacts = cache(max_bytes=1000)
+
+    artifacts.fetch('old', ['a.bin'])
+    artifacts.fetch('hot', ['a.bin'])
+    artifacts.fetch('old', ['a.bin'])  # cache hit refreshes its use
+    artifacts.fetch('new', ['a.bin'])
+
+    cache_dir = tmp_path / 'cache'
+    assert sorted(path.name for path in cache_dir.iterdir()) == ['new', 'old']
+    assert set(artifacts._validated) == {'old', 'new'}
+
+
+def test_eviction_removes_files_written_by_the_api(cache, s3_store, tmp_path):
+    publish(s3_store, tmp_path, 'job', **{'a.bin': b'x' * 600})
+    publish(s3_store, tmp_path, 'next', **{'a.bin': b'x' * 600})
+    artifacts = cache(max_bytes=1000)
+    job_dir = artifacts.fetch('job', ['a.bin', MANIFEST_FILENAME])
+    (job_dir / MANIFEST_FILENAME).write_text('{}')  # as register_artifacts does
+    (job_dir / '.a.bin.download').write_text('')  # a download in progress
+
+    artifacts.fetch('next', ['a.bin'])
+
+    assert not (job_dir / 'a.bin').exists()
+    assert not (job_dir / MANIFEST_FILENAME).exists()
+    assert [path.name for path in job_dir.iterdir()] == ['.a.bin.download']
+
+
+def test_job_deleted_from_store_leaves_nothing_behind(cache, s3_store, tmp_path):
+    publish(s3_store, tmp_path, 'job', **{'a.bin': b'x'})
+    artifacts = cache(revalidate_after=0.0)
+    job_dir = artifacts.fetch('job', ['a.bin'])
+    (job_dir / MANIFEST_FILENAME).write_text('{}')
+
+    s3_store.delete('job', 'a.bin')
+    artifacts.fetch('job', ['a.bin'])
+
+    assert not job_dir.exists()
+    assert artifacts._files == {}
+
+
+def test_validation_windows_do_not_accumulate(cache, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('app.services.storage.time.monotonic', lambda: now[0])
+    artifacts = cache(revalidate_after=5.0)
+
+    for i in range(100):
+        now[0] = i
+        artifacts.fetch(f'missing-{i}', ['a.mid'])
+
+    assert len(artifacts._validated) <= 10  # fetches of the last two windows at most
@@ -0,0 +1,161 @@
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services import transcriber as transcriber_module
+from app.services.instrumentation import StageRecorder
+from app.services.transcriber import CHUNK_CONTEXT, PianoTranscriber
+
+SAMPLE_RATE = 100
+
+# (onset, offset, pitch) of the notes in the simulated recording
+RECORDING = [
+    (1.0, 2.0, 60),
+    (19.5, 23.0, 64),  # sounds across the edge of the first chunk
+    (20.5, 21.5, 62),  # inside the first chunk's trailing context
+    (49.0, 49.5, 67),
+]
+
+
+class FakeBasicPitch:
+    """Stand-in for Basic Pitch that "hears" RECORDING in each audio window.
+
+    soundfile.write records the window of the recording a chunk holds (the
+    samples are their own timestamps), inference passes it on and note
+    creation returns the notes sounding in it, cut at its edges and in
+    chunk time, like the model would.
+    """
+
+    def __init__(self, duration):
+        self.duration = duration
+        self.windows = []
+        self.note_calls = []
+
+    def load(self, path, sr=None, mono=True):
+        return np.arange(int(self.duration * SAMPLE_RATE)) / SAMPLE_RATE, SAMPLE_RATE
+
+    def write(self, path, data, sr):
+        self.windows.append((float(data[0]), float(data[0]) + len(data) / sr))
+
+    def run_inference(self, path, model):
+        return {'window': self.windows[-1] if self.windows else (0.0, self.duration)}
+
+    def model_output_to_notes(self, model_output, **kwargs):
+        self.note_calls.append(kwargs)
+        start, end = model_output['window']
+        return None, [(max(onset, start) - start, min(offset, end) - start, pitch, 0.8, None)
+                      for onset, offset, pitch in RECORDING
+                      if onset < end and offset > start]
+
+
+@pytest.fixture
+def basic_pitch(monkeypatch):
+    """Install FakeBasicPitch in place of basic_pitch, librosa and soundfile."""
+    fake = FakeBasicPitch(duration=70.0)
+    modules = {
+        'basic_pitch': SimpleNamespace(ICASSP_2022_MODEL_PATH='model'),
+        'basic_pitch.inference': SimpleNamespace(run_inference=fake.run_inference,
+                                                 Model=lambda path: None),
+        'basic_pitch.note_creation': SimpleNamespace(
+            model_output_to_notes=fake.model_output_to_notes),
+        'basic_pitch.constants': SimpleNamespace(AUDIO_SAMPLE_RATE=22050, FFT_HOP=256),
+        'librosa': SimpleNamespace(load=fake.load,
+                                   get_duration=lambda path: fake.duration),
+        'soundfile': SimpleNamespace(write=fake.write),
+    }
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    return fake
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the transcriber's monotonic clock with a list of readings."""
+    readings = []
+    monkeypatch.setattr(transcriber_module, 'time',
+                        SimpleNamespace(monotonic=lambda: readings.pop(0)))
+    return readings
+
+
+def transcribe_chunked(output_dir, partial_interval=0.0):
+    partials = []
+    notes, metrics = PianoTranscriber().transcribe(
+        'audio.wav', str(output_dir), on_partial=lambda *args: partials.append(args),
+        first_chunk_seconds=20.0, chunk_seconds=30.0,
+        partial_interval=partial_interval
+    )
+    return notes, metrics, partials
+
+
+def test_preview_uses_cheaper_note_settings(basic_pitch, tmp_path):
+    PianoTranscriber().transcribe('audio.wav', str(tmp_path), fast=True)
+    PianoTranscriber().transcribe('audio.wav', str(tmp_path))
+
+    fast, full = basic_pitch.note_calls
+    assert fast['onset_thresh'] > full['onset_thresh']
+    assert fast['frame_thresh'] > full['frame_thresh']
+    assert fast['min_note_len'] > full['min_note_len']
+    assert (fast['melodia_trick'], full['melodia_trick']) == (False, True)
+
+
+def test_preview_ignores_partial_callback(basic_pitch, tmp_path):
+    partials = []
+
+    notes, _ = PianoTranscriber().transcribe('audio.wav', str(tmp_path),
+                                             on_partial=lambda *args: partials.append(args),
+                                             fast=True)
+
+    assert len(notes) == len(RECORDING) and len(basic_pitch.note_calls) == 1
+    assert basic_pitch.windows == []
+    assert partials == []
+
+
+def test_inference_and_note_creation_are_timed(basic_pitch, tmp_path):
+    stages = StageRecorder()
+
+    PianoTranscriber().transcribe('audio.wav', str(tmp_path), stages=stages)
+
+    assert set(stages.as_dict()) == {'inference', 'note_creation'}
+
+
+def test_chunks_are_padded_with_context(basic_pitch, tmp_path):
+    transcribe_chunked(tmp_path)
+
+    assert basic_pitch.windows == [
+        (0.0, 20.0 + CHUNK_CONTEXT),
+        (20.0 - CHUNK_CONTEXT, 50.0 + CHUNK_CONTEXT),
+        (50.0 - CHUNK_CONTEXT, 70.0),
+    ]
+
+
+def test_chunked_notes_match_the_recording(basic_pitch, tmp_path):
+    notes, metrics, _ = transcribe_chunked(tmp_path)
+
+    # Each note is reported once, by the chunk its onset falls in, and
+    # the note cut off at the first chunk's edge is extended by the tail
+    # the second chunk saw in its leading context
+    assert sorted(zip(notes.onset.tolist(), notes.offset.tolist(), notes.pitch.tolist())) == \
+        pytest.approx(sorted(RECORDING))
+    assert metrics['note_count'] == len(RECORDING)
+
+
+def test_partials_report_notes_after_each_chunk(basic_pitch, tmp_path):
+    _, _, partials = transcribe_chunked(tmp_path)
+
+    assert [(seconds, total) for _, seconds, total in partials] == \
+        [(20.0, 70.0), (50.0, 70.0), (70.0, 70.0)]
+    assert [len(notes) for notes, _, _ in partials] == [2, 4, 4]
+    # The first partial only saw the edge note up to its trailing context
+    first = partials[0][0]
+    assert first.offset[first.pitch == 64].tolist() == [20.0 + CHUNK_CONTEXT]
+
+
+def test_partials_are_throttled(basic_pitch, clock, tmp_path):
+    clock.extend([0.0, 5.0, 12.0])
+
+    _, _, partials = transcribe_chunked(tmp_path, partial_interval=10.0)
+
+    # The first chunk always publishes; the second comes too soon after it
+    assert [seconds for _, seconds, _ in partials] == [20.0, 70.0]
@@ -0,0 +1,121 @@
+import asyncio
+import io
+import json
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+from app.services.upload import UPLOAD_SAMPLE_RATE, AudioUpload, UploadError, UploadLimitError
+
+BOUNDARY = 'test-boundary'
+CONTENT_TYPE = f'multipart/form-data; boundary={BOUNDARY}'
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='ffmpeg not installed')
+
+
+def wav_bytes(seconds, rate=44100):
+    samples = (np.sin(np.arange(int(seconds * rate)) * 2 * np.pi * 440 / rate) * 8000)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.repeat(samples.astype('<i2'), 2).tobytes())
+    return buffer.getvalue()
+
+
+def multipart(files=(), **fields):
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                     f'{value}\r\n'.encode())
+    for name, filename, content in files:
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; '
+                     f'filename="{filename}"\r\nContent-Type: audio/wav\r\n\r\n'.encode()
+                     + content + b'\r\n')
+    return b''.join(parts) + f'--{BOUNDARY}--\r\n'.encode()
+
+
+async def chunked(body, size=8192):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def receive(tmp_path, body, content_type=CONTENT_TYPE, max_bytes=10 ** 8, max_seconds=600):
+    upload = AudioUpload(tmp_path / 'audio.wav', tmp_path / 'upload', max_bytes, max_seconds)
+    asyncio.run(upload.receive(content_type, chunked(body)))
+    return upload
+
+
+def test_rejects_non_multipart_request(tmp_path):
+    with pytest.raises(UploadError, match='multipart/form-data'):
+        receive(tmp_path, b'{}', content_type='application/json')
+
+
+@needs_ffmpeg
+def test_decodes_upload_to_mono_16k(tmp_path):
+    audio = wav_bytes(2.0)
+
+    upload = receive(tmp_path, multipart([('file', 'song.wav', audio)], isolate_piano='true'))
+
+    assert upload.filename == 'song.wav'
+    assert upload.fields == {'isolate_piano': 'true'}
+    assert upload.received_bytes == len(audio)
+    assert (tmp_path / 'upload').read_bytes() == audio
+    assert upload.decoded_seconds == pytest.approx(2.0, abs=0.05)
+    with wave.open(str(tmp_path / 'audio.wav')) as wav:
+        assert (wav.getnchannels(), wav.getframerate()) == (1, UPLOAD_SAMPLE_RATE)
+
+
+@needs_ffmpeg
+def test_size_limit_aborts_and_removes_files(tmp_path):
+    body = multipart([('file', 'song.wav', wav_bytes(2.0))])
+
+    with pytest.raises(UploadLimitError, match='MB limit'):
+        receive(tmp_path, body, max_bytes=100_000)
+
+    assert not (tmp_path / 'upload').exists()
+    assert not (tmp_path / 'audio.wav').exists()
+
+
+@needs_ffmpeg
+def test_duration_limit(tmp_path):
+    body = multipart([('file', 'song.wav', wav_bytes(3.0))])
+
+    with pytest.raises(UploadLimitError, match='longer than'):
+        receive(tmp_path, body, max_seconds=1)
+
+    assert not (tmp_path / 'audio.wav').exists()
+
+
+@needs_ffmpeg
+def test_missing_file_field(tmp_path):
+    with pytest.raises(UploadError, match="No 'file'"):
+        receive(tmp_path, multipart(isolate_piano='true'))
+
+
+@needs_ffmpeg
+def test_rejects_second_file(tmp_path):
+    audio = wav_bytes(0.5)
+
+    with pytest.raises(UploadError, match='Only one'):
+        receive(tmp_path, multipart([('file', 'a.wav', audio), ('file', 'b.wav', audio)]))
+
+
+@needs_ffmpeg
+def test_undecodable_file(tmp_path):
+    with pytest.raises(UploadError, match='decode'):
+        receive(tmp_path, multipart([('file', 'song.wav', b'not audio' * 100)]))
+
+
+def test_upload_route_rejects_bad_request(client, routes):
+    response = client.post('/api/v1/transcribe/upload', content=b'{}',
+                           headers={'Content-Type': 'application/json'})
+
+    assert response.status_code == 400
+    # The job created for the upload records why it failed
+    job_ids = routes.job_manager.redis.zrange('jobs:created', 0, -1)
+    job = json.loads(routes.job_manager.redis.get(f'job:{job_ids[-1]}'))
+    assert job['status'] == 'failed'
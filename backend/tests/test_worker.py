@@ -0,0 +1,117 @@
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.models.schemas import TranscriptionStatus
+from app.services.artifacts import MANIFEST_FILENAME
+from app.services.note_store import (
+    NoteStore,
+    PARTIAL_NOTES_FILENAME,
+    PREVIEW_MIDI_FILENAME,
+)
+from app.services.worker import TranscriptionWorker
+
+TOTAL_SECONDS = 80.0
+
+
+@pytest.fixture
+def worker(job_manager, monkeypatch):
+    """Worker on fake Redis; the transcriber only needs Basic Pitch's model path."""
+    monkeypatch.setitem(sys.modules, 'basic_pitch',
+                        SimpleNamespace(ICASSP_2022_MODEL_PATH='model'))
+    worker = TranscriptionWorker()
+    worker.job_manager = job_manager
+    return worker
+
+
+@pytest.fixture
+def transcribing_job(job_manager):
+    """A job in the TRANSCRIBING stage with an empty output directory."""
+    job_id = job_manager.create_job('https://www.youtube.com/watch?v=abc')
+    job_manager.update_status(job_id, TranscriptionStatus.TRANSCRIBING, progress=50)
+    output_dir = Path(settings.OUTPUT_DIR) / job_id
+    output_dir.mkdir()
+    return job_id, output_dir
+
+
+def notes_until(seconds):
+    """One short note per second, up to `seconds`."""
+    return NoteStore.from_note_events([(float(t), t + 0.5, 60 + t % 12, 0.8, None)
+                                       for t in range(int(seconds))])
+
+
+def test_partial_before_preview_length_saves_notes_only(worker, transcribing_job, job_manager):
+    job_id, output_dir = transcribing_job
+
+    worker._publish_partial(job_id, output_dir, notes_until(10), 10.0, TOTAL_SECONDS)
+
+    assert len(NoteStore.load(output_dir / PARTIAL_NOTES_FILENAME)) == 10
+    assert not (output_dir / PREVIEW_MIDI_FILENAME).exists()
+    job = job_manager.get_job(job_id)
+    assert (job['transcribed_seconds'], job['progress']) == (10.0, 53)
+    assert job.get('preview_midi_url') is None
+
+
+def test_partial_publishes_preview_midi_once(worker, transcribing_job, job_manager, monkeypatch):
+    job_id, output_dir = transcribing_job
+    preview_seconds = settings.PREVIEW_SECONDS
+
+    worker._publish_partial(job_id, output_dir, notes_until(preview_seconds + 10),
+                            preview_seconds, TOTAL_SECONDS)
+
+    preview = output_dir / PREVIEW_MIDI_FILENAME
+    assert preview.exists()
+    assert 'preview' in json.loads((output_dir / MANIFEST_FILENAME).read_text())
+    job = job_manager.get_job(job_id)
+    assert job['preview_midi_url'] == f'/api/v1/download/{job_id}/preview'
+
+    # Later chunks extend the partial notes but keep the first preview
+    written = preview.stat().st_mtime_ns
+    monkeypatch.setattr(NoteStore, 'to_midi', lambda self, path: pytest.fail('preview rewritten'))
+    worker._publish_partial(job_id, output_dir, notes_until(TOTAL_SECONDS),
+                            TOTAL_SECONDS, TOTAL_SECONDS)
+
+    assert preview.stat().st_mtime_ns == written
+    assert len(NoteStore.load(output_dir / PARTIAL_NOTES_FILENAME)) == TOTAL_SECONDS
+
+
+def test_partial_progress_spans_transcribing_stage(worker, transcribing_job, job_manager):
+    job_id, output_dir = transcribing_job
+    progress = []
+
+    for seconds in (20.0, 50.0, TOTAL_SECONDS):
+        worker._publish_partial(job_id, output_dir, notes_until(seconds), seconds, TOTAL_SECONDS)
+        progress.append(job_manager.get_job(job_id)['progress'])
+
+    assert progress == [56, 65, 75]
+
+
+def test_partial_failure_does_not_fail_job(worker, transcribing_job, job_manager, monkeypatch):
+    job_id, output_dir = transcribing_job
+    monkeypatch.setattr(NoteStore, 'save', lambda self, path: 1 / 0)
+
+    worker._publish_partial(job_id, output_dir, notes_until(10), 10.0, TOTAL_SECONDS)
+
+    job = job_manager.get_job(job_id)
+    assert (job['status'], job['progress']) == ('transcribing', 50)
+
+
+def test_status_includes_partial_result(worker, transcribing_job, client):
+    job_id, output_dir = transcribing_job
+
+    before = client.get(f'/api/v1/status/{job_id}').json()
+    worker._publish_partial(job_id, output_dir, notes_until(settings.PREVIEW_SECONDS),
+                            settings.PREVIEW_SECONDS, TOTAL_SECONDS)
+    after = client.get(f'/api/v1/status/{job_id}').json()
+
+    assert before['result'] is None
+    assert (after['status'], after['progress']) == ('transcribing', 56)
+    assert after['result']['transcribed_seconds'] == settings.PREVIEW_SECONDS
+    assert after['result']['preview_midi_url'] == f'/api/v1/download/{job_id}/preview'
+    preview = client.get(after['result']['preview_midi_url'])
+    assert preview.status_code == 200
+    assert preview.content == (output_dir / PREVIEW_MIDI_FILENAME).read_bytes()